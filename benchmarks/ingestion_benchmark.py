@@ -0,0 +1,101 @@
+"""
+Benchmark the python and DuckDB-native reservation ingestion modes
+
+Usage:
+    python benchmarks/ingestion_benchmark.py --reservations 20000 [--batch-size 5000]
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import duckdb
+
+from rpg.db_engine.duckdb_engine import DuckDBEngine
+from rpg.extract.local_extract_engine import LocalExtractEngine
+from validation_benchmark import generate_reservations
+
+TABLES = ["reservation_imports", "reservation_stay_dates", "rejected_imports", "current_reservations", "current_stay_dates",
+          "reservation_nights", "kpi_daily"]
+
+
+def table_counts(db_path: str) -> dict:
+    with duckdb.connect(db_path, read_only=True) as conn:
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES}
+
+
+def run_python(work_path: Path, filepath: Path, batch_size: Optional[int]) -> float:
+    """
+    Validate and convert with pandas, write with bulk_insert and ingest_reservations
+    """
+    db_engine = DuckDBEngine(database_configuration=dict(db_path=str(work_path / "python.db")))
+    db_engine.initialize_database()
+    engine = LocalExtractEngine(configuration=dict(source_config=dict()))
+
+    started_at = time.perf_counter()
+    for valid_rows, invalid_rows, _ in engine.iter_validated_reservations(filepath=filepath, batch_size=batch_size):
+        df_imports, df_stay_dates, df_rejected = engine.reservations_to_dataframe([dict(filename=filepath.name,
+                                                                                        valid_rows=valid_rows,
+                                                                                        invalid_rows=invalid_rows,
+                                                                                        error=None)])
+        db_engine.bulk_insert(table_name="rejected_imports", data=df_rejected)
+        db_engine.ingest_reservations(reservations=df_imports, stay_dates=df_stay_dates)
+    return time.perf_counter() - started_at
+
+
+def run_native(work_path: Path, filepath: Path, batch_size: Optional[int]) -> float:
+    """
+    Split the file into JSON array chunks like the pipeline, load and validate every chunk inside DuckDB
+    """
+    db_engine = DuckDBEngine(database_configuration=dict(db_path=str(work_path / "native.db")))
+    db_engine.initialize_database()
+    engine = LocalExtractEngine(configuration=dict(source_config=dict(), archive_path=str(work_path / "archive")))
+
+    started_at = time.perf_counter()
+    for chunk_filepath in engine.iter_reservation_chunks(filepath=filepath, batch_size=batch_size):
+        db_engine.ingest_reservation_file(filepath=str(chunk_filepath), source_filename=filepath.name, is_safe=False)
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Python vs DuckDB-native reservation ingestion benchmark")
+    parser.add_argument("--reservations", type=int, default=20000, help="Number of reservations")
+    parser.add_argument("--max-stay-dates", type=int, default=5, help="Maximum stay dates per reservation")
+    parser.add_argument("--invalid-ratio", type=float, default=0.05, help="Ratio of reservations with invalid values")
+    parser.add_argument("--batch-size", type=int, default=None, help="Reservations per batch (whole file if not set)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    work_path = Path(tempfile.mkdtemp(prefix="rpg_ingestion_benchmark_"))
+    try:
+        reservations = generate_reservations(reservation_count=args.reservations,
+                                             max_stay_dates=args.max_stay_dates,
+                                             invalid_ratio=args.invalid_ratio,
+                                             seed=args.seed)
+        filepath = work_path / "reservations.json"
+        filepath.write_text(json.dumps(dict(data=reservations)), encoding="utf-8")
+        stay_date_count = sum(len(r["stay_dates"]) for r in reservations)
+        print(f"{len(reservations)} reservations, {stay_date_count} stay dates")
+
+        python_duration = run_python(work_path=work_path, filepath=filepath, batch_size=args.batch_size)
+        native_duration = run_native(work_path=work_path, filepath=filepath, batch_size=args.batch_size)
+
+        python_counts = table_counts(str(work_path / "python.db"))
+        native_counts = table_counts(str(work_path / "native.db"))
+        if python_counts != native_counts:
+            raise AssertionError(f"Row counts are different! python={python_counts} native={native_counts}")
+
+        print(f"rows written: {python_counts} (identical for both modes)")
+        print(f"{'mode':<10} {'seconds':>10} {'stay dates/s':>15}")
+        for name, duration in [("python", python_duration), ("native", native_duration)]:
+            print(f"{name:<10} {duration:>10.3f} {stay_date_count / duration:>15,.0f}")
+        print(f"speed-up: {python_duration / native_duration:.2f}x")
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
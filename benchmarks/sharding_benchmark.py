@@ -0,0 +1,96 @@
+"""
+Benchmark the reservation write throughput of ShardedEngine by shard count
+
+Usage:
+    python benchmarks/sharding_benchmark.py --reservations 50000 --shards 1 2 4
+"""
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+from rpg.db_engine.sharded_engine import ShardedEngine
+from rpg.extract.local_extract_engine import LocalExtractEngine
+from validation_benchmark import generate_reservations
+
+TABLES = ["reservation_imports", "reservation_stay_dates", "current_reservations", "current_stay_dates",
+          "reservation_nights", "kpi_daily"]
+
+
+def run_sharded(work_path: Path, shard_count: int, batches: list) -> tuple:
+    """
+    Write the batches with ingest_reservations, returns the duration and the row counts of the tables
+    """
+    db_engine = ShardedEngine(database_configuration=dict(db_path=str(work_path / f"shards_{shard_count}" / "rpg.db"),
+                                                          shard_count=shard_count))
+    try:
+        db_engine.initialize_database()
+
+        started_at = time.perf_counter()
+        for df_imports, df_stay_dates in batches:
+            db_engine.ingest_reservations(reservations=df_imports, stay_dates=df_stay_dates, is_safe=False)
+        duration = time.perf_counter() - started_at
+
+        counts = {t: int(db_engine.execute(query=f"SELECT COUNT(*) AS c FROM {t}")["c"].sum()) for t in TABLES}
+        return duration, counts
+    finally:
+        db_engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShardedEngine write throughput by shard count")
+    parser.add_argument("--reservations", type=int, default=50000, help="Number of reservations")
+    parser.add_argument("--hotels", type=int, default=16, help="Number of hotels")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Reservations per ingestion batch")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Shard counts to compare")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    work_path = Path(tempfile.mkdtemp(prefix="rpg_sharding_benchmark_"))
+    try:
+        reservations = generate_reservations(reservation_count=args.reservations,
+                                             max_stay_dates=5,
+                                             invalid_ratio=0.0,
+                                             seed=args.seed)
+        # Spread the reservations over the hotels
+        for i, reservation in enumerate(reservations):
+            reservation["hotel_id"] = str(1000 + i % args.hotels)
+
+        # region Validate and convert the batches once, only the writes are measured
+        filepath = work_path / "reservations.json"
+        filepath.write_text(json.dumps(dict(data=reservations)), encoding="utf-8")
+        engine = LocalExtractEngine(configuration=dict(source_config=dict()))
+        batches = []
+        for valid_rows, invalid_rows, _ in engine.iter_validated_reservations(filepath=filepath,
+                                                                                 batch_size=args.batch_size):
+            df_imports, df_stay_dates, _ = engine.reservations_to_dataframe([dict(filename=filepath.name,
+                                                                                  valid_rows=valid_rows,
+                                                                                  invalid_rows=invalid_rows,
+                                                                                  error=None)])
+            batches.append((df_imports, df_stay_dates))
+        stay_date_count = sum(len(df_stay_dates) for _, df_stay_dates in batches)
+        print(f"{len(reservations)} reservations, {stay_date_count} stay dates, {args.hotels} hotels, "
+              f"{len(batches)} batches")
+        # endregion
+
+        results = {shard_count: run_sharded(work_path=work_path, shard_count=shard_count, batches=batches)
+                   for shard_count in args.shards}
+
+        counts = {shard_count: result[1] for shard_count, result in results.items()}
+        if len({json.dumps(c, sort_keys=True) for c in counts.values()}) != 1:
+            raise AssertionError(f"Row counts are different! {counts}")
+
+        print(f"rows written: {counts[args.shards[0]]} (identical for all shard counts)")
+        print(f"{'shards':<10} {'seconds':>10} {'stay dates/s':>15} {'speed-up':>10}")
+        base_duration = results[args.shards[0]][0]
+        for shard_count, (duration, _) in results.items():
+            print(f"{shard_count:<10} {duration:>10.3f} {stay_date_count / duration:>15,.0f} "
+                  f"{base_duration / duration:>9.2f}x")
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the row-wise and columnar reservation validation engines
+
+Usage:
+    python benchmarks/validation_benchmark.py --reservations 50000 --repeat 3
+"""
+import gc
+import copy
+import time
+import random
+import argparse
+from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+
+from rpg.extract.local_extract_engine import LocalExtractEngine
+from rpg.utils.datetime_util import parse_date, parse_datetime
+
+STATUSES = ["provisional", "waiting_list", "confirmed", "cancelled", "no_show", "checked_in", "checked_out"]
+
+
+def generate_reservations(reservation_count: int,
+                          max_stay_dates: int,
+                          invalid_ratio: float,
+                          seed: int) -> List[Dict[str, Any]]:
+    """
+    Generate synthetic reservations with a share of invalid values
+    """
+    rnd = random.Random(seed)
+    reservations = []
+
+    for index in range(reservation_count):
+        arrival_date = date(2026, 1, 1) + timedelta(days=rnd.randint(0, 365))
+        nights = rnd.randint(1, max_stay_dates)
+        created_at = datetime(2025, 12, 1) + timedelta(minutes=rnd.randint(0, 100000))
+        reservation = dict(
+            hotel_id=str(rnd.choice([1035, 1036, 1037])),
+            reservation_id=f"R{index}",
+            status=rnd.choice(STATUSES),
+            arrival_date=arrival_date.isoformat(),
+            departure_date=(arrival_date + timedelta(days=nights)).isoformat(),
+            created_at=created_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            updated_at=(created_at + timedelta(minutes=rnd.randint(0, 1000))).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            source_name="Booking",
+            source_id="B1",
+            stay_dates=[
+                dict(
+                    start_date=(arrival_date + timedelta(days=night)).isoformat(),
+                    end_date=(arrival_date + timedelta(days=night)).isoformat(),
+                    room_type_id=rnd.choice(["DBL", "SGL", "STE"]),
+                    room_type_name="Room",
+                    number_of_adults=rnd.randint(1, 3),
+                    number_of_children=rnd.randint(0, 2),
+                    room_revenue_gross_amount=round(rnd.uniform(50, 200), 2),
+                    room_revenue_net_amount=round(rnd.uniform(40, 180), 2),
+                    fnb_gross_amount=12.5,
+                    fnb_net_amount=10.0
+                )
+                for night in range(nights)
+            ]
+        )
+
+        # region Inject invalid values
+        if rnd.random() < invalid_ratio:
+            rnd.choice([
+                lambda r: r.update(status="unknown"),
+                lambda r: r.update(arrival_date="2026-13-01"),
+                lambda r: r.pop("hotel_id"),
+                lambda r: r.update(departure_date=r["arrival_date"]),
+                lambda r: r["stay_dates"][0].update(number_of_adults=0),
+                lambda r: r["stay_dates"][0].update(room_revenue_net_amount="n/a"),
+                lambda r: r["stay_dates"][0].update(start_date="2020-01-01"),
+            ])(reservation)
+        # endregion
+
+        reservations.append(reservation)
+
+    return reservations
+
+
+def run_engine(validation_engine: str, reservations: List[Dict[str, Any]], repeat: int):
+    """
+    Run the validation engine `repeat` times and return the best duration and the result of the last run
+    """
+    engine = LocalExtractEngine(configuration=dict(source_config=dict(validation_engine=validation_engine)))
+    durations = []
+    result = None
+    for _ in range(repeat):
+        # Validation replaces stay_dates of invalid reservations, so every run gets its own copy
+        rows = copy.deepcopy(reservations)
+        # Every run starts with cold date parsing caches
+        parse_date.cache_clear()
+        parse_datetime.cache_clear()
+        # The copy is collected before the run, so neither engine pays for the first full collection of the input
+        gc.collect()
+        started_at = time.perf_counter()
+        result = engine.validate_reservation_rows(reservations=rows)
+        durations.append(time.perf_counter() - started_at)
+    return min(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row-wise vs columnar reservation validation benchmark")
+    parser.add_argument("--reservations", type=int, default=20000, help="Number of reservations")
+    parser.add_argument("--max-stay-dates", type=int, default=5, help="Maximum stay dates per reservation")
+    parser.add_argument("--invalid-ratio", type=float, default=0.05, help="Ratio of reservations with invalid values")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per engine, best run is reported")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    reservations = generate_reservations(reservation_count=args.reservations,
+                                         max_stay_dates=args.max_stay_dates,
+                                         invalid_ratio=args.invalid_ratio,
+                                         seed=args.seed)
+    stay_date_count = sum(len(r["stay_dates"]) for r in reservations)
+    print(f"{len(reservations)} reservations, {stay_date_count} stay dates")
+
+    row_duration, row_result = run_engine(validation_engine="row", reservations=reservations, repeat=args.repeat)
+    columnar_duration, columnar_result = run_engine(validation_engine="columnar",
+                                                    reservations=reservations,
+                                                    repeat=args.repeat)
+
+    if row_result != columnar_result:
+        raise AssertionError("Row-wise and columnar validation results are different!")
+
+    valid_rows, invalid_rows = row_result
+    print(f"{len(valid_rows)} valid rows, {len(invalid_rows)} invalid rows (identical for both engines)")
+    print(f"{'engine':<10} {'seconds':>10} {'stay dates/s':>15}")
+    for name, duration in [("row", row_duration), ("columnar", columnar_duration)]:
+        print(f"{name:<10} {duration:>10.3f} {stay_date_count / duration:>15,.0f}")
+    print(f"speed-up: {row_duration / columnar_duration:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
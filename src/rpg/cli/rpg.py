@@ -34,6 +34,22 @@ def run_scheduler(config_path: str, interval_minutes: int):
     Pipeline(config_path=config_path,
              schedule_minutes=interval_minutes)
 
+def run_maintenance(config_path: str, retention_days: Optional[int] = None, compact: Optional[bool] = False):
+    """
+    Instantiate the pipeline and archive superseded reservation versions
+    """
+    Pipeline(config_path=config_path,
+             maintain=True,
+             retention_days=retention_days,
+             compact=compact)
+
+def run_fingerprint_audit(config_path: str):
+    """
+    Instantiate the pipeline and audit the fingerprints of the ingested reservation files
+    """
+    Pipeline(config_path=config_path,
+             audit_fingerprints=True)
+
 def calculate_kpi(config_filepath: str,
                   start_date: date,
                   end_date: date,
@@ -133,6 +149,36 @@ def init_parser():
                                                                       interval_minutes=args.interval_minutes))
     # endregion
 
+    # region maintain parser
+    maintain_parser = subparsers.add_parser(
+        name="maintain",
+        help="Archive superseded reservation versions and reclaim database space"
+    )
+    maintain_parser.add_argument(
+        "--retention-days",
+        type=int,
+        required=False,
+        help="Archive versions superseded and ingested more than this many days ago. Default: retention_days "
+             "in db_config or 30"
+    )
+    maintain_parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Rewrite the database file to release its free space"
+    )
+    maintain_parser.set_defaults(func=lambda args: run_maintenance(config_path=args.config_path,
+                                                                   retention_days=args.retention_days,
+                                                                   compact=args.compact))
+    # endregion
+
+    # region audit-fingerprints parser
+    audit_fingerprints_parser = subparsers.add_parser(
+        name="audit-fingerprints",
+        help="Report 64-bit fingerprint collisions of the ingested reservation files"
+    )
+    audit_fingerprints_parser.set_defaults(func=lambda args: run_fingerprint_audit(config_path=args.config_path))
+    # endregion
+
     # region KPI parser
     kpi_parser = subparsers.add_parser(
         name="kpi",
@@ -1,14 +1,25 @@
 from abc import ABC, abstractmethod
-from typing import Union, Optional, Any, Dict, List
+from datetime import date
+from contextlib import contextmanager
+from typing import Union, Optional, Any, Dict, List, Sequence, Iterator
 
 import pandas as pd
 
 
 class DBEngineBase(ABC):
 
-    def __init__(self, database_configuration: Dict[Any, Any]):
+    def __init__(self, database_configuration: Dict[Any, Any], read_only: Optional[bool] = False):
         self._engine_name = "Not defined"
         self._database_configuration = database_configuration
+        self._read_only = read_only
+        # Tags of the statements recorded by the query profiler (if enabled)
+        self._profiling_tags = dict(run_id=None, stage=None)
+
+    def __enter__(self) -> "DBEngineBase":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
 
     @property
     def engine_name(self) -> str:
@@ -18,6 +29,29 @@ class DBEngineBase(ABC):
     def database_configuration(self) -> Dict[Any, Any]:
         return self._database_configuration
 
+    @property
+    def read_only(self) -> bool:
+        return self._read_only
+
+    @contextmanager
+    def profiling_stage(self, stage: str, run_id: Optional[str] = None) -> Iterator[None]:
+        """
+        Tag the statements run inside the block with the stage (and the run) in the query profile
+        Nested stages keep the run of the outer stage
+        """
+        previous_tags = dict(self._profiling_tags)
+        self._profiling_tags.update(stage=stage, run_id=run_id or previous_tags["run_id"])
+        try:
+            yield
+        finally:
+            self._profiling_tags.update(previous_tags)
+
+    def close(self):
+        """
+        Release the database connection(s) held by the engine. The engine reconnects on the next call
+        """
+        pass
+
     @abstractmethod
     def validate_connection(self) -> bool:
         """
@@ -26,9 +60,13 @@ class DBEngineBase(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def execute(self, query: str, is_safe: Optional[bool] = True) -> Optional[Union[bool, int, pd.DataFrame]]:
+    def execute(self,
+                query: str,
+                parameters: Optional[Sequence[Any]] = None,
+                is_safe: Optional[bool] = True) -> Optional[Union[bool, int, pd.DataFrame]]:
         """
         Execute query (SELECT, DML, DDL) and return Pandas DataFrame for SELECT execution
+        Values of the positional `?` placeholders are bound from parameters
         """
         raise NotImplementedError
 
@@ -46,6 +84,113 @@ class DBEngineBase(ABC):
         """
         raise NotImplementedError
 
+    def bulk_insert(self,
+                    table_name: str,
+                    data: pd.DataFrame,
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True
+                    ) -> int:
+        """
+        Insert DataFrame into database table, with the same semantics as insert_rows
+        Engines should override it with a bulk load, the default implementation falls back to insert_rows
+        """
+        return self.insert_rows(table_name=table_name,
+                                rows=data.to_dict(orient="records"),
+                                pre_query=pre_query,
+                                post_query=post_query,
+                                overwrite=overwrite,
+                                is_safe=is_safe)
+
+    @abstractmethod
+    def ingest_reservations(self,
+                            reservations: pd.DataFrame,
+                            stay_dates: pd.DataFrame,
+                            is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        Write a batch of valid reservations and stay dates into reservation_imports and reservation_stay_dates,
+        skipping already ingested rows, and apply the new versions to the derived tables (current reservations,
+        reservation nights)
+        Returns inserted row counts per table, or None on error
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def ingest_inventory(self,
+                         inventory: pd.DataFrame,
+                         is_safe: Optional[bool] = True) -> int:
+        """
+        Write an inventory file as the active inventory of the hotels, previous inventory becomes inactive
+        Returns inserted row count
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_kpi(self,
+                 hotel_id: int,
+                 start_date: date,
+                 end_date: date,
+                 is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        Load the KPI (HOTEL_ID, NIGHT_OF_STAY, OCCUPANCY_PERCENTAGE, TOTAL_NET_REVENUE, ADR) of a hotel
+        between start_date and end_date, newest night first
+        """
+        raise NotImplementedError
+
+    def publish_snapshot(self, is_safe: Optional[bool] = True) -> bool:
+        """
+        Publish a consistent read only copy of the data for the readers (read_only engines), after an ingestion run
+        Returns True if a snapshot is published, engines without read snapshots return False
+        """
+        return False
+
+    def maintain(self,
+                 archive_path: str,
+                 retention_days: Optional[int] = 30,
+                 compact: Optional[bool] = False,
+                 cluster: Optional[bool] = False,
+                 is_safe: Optional[bool] = True) -> Optional[Dict[str, Any]]:
+        """
+        Move the reservation versions superseded before the retention window (and their stay dates) out of the
+        history tables into archive_path and reclaim their space. If cluster, the fact tables are rewritten in
+        (hotel, date) order. If compact, the storage is rewritten
+        Returns archived row counts per table, the storage size before and after (size_before, size_after) and the
+        scan statistics of the clustered tables (clustering), or None on error
+        """
+        raise NotImplementedError
+
+    @property
+    def supports_maintenance(self) -> bool:
+        """
+        Engine can archive superseded reservation versions and reclaim their space (maintain)
+        """
+        return False
+
+    @property
+    def supports_native_ingestion(self) -> bool:
+        """
+        Engine can load and validate reservation files itself (ingest_reservation_file)
+        """
+        return False
+
+    def ingest_reservation_file(self,
+                                filepath: str,
+                                source_filename: str,
+                                is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        Load, validate and write a reservations JSON file inside the database
+        Returns inserted row counts per table, or None on error
+        """
+        raise NotImplementedError
+
+    def check_ingestion_mode(self, ingestion_mode: str, is_safe: Optional[bool] = True) -> bool:
+        """
+        Record the ingestion mode of the database, returns False if the database holds reservations ingested
+        with another mode (fingerprints of the modes are not compatible)
+        """
+        return True
+
     @abstractmethod
     def initialize_database(self):
         """
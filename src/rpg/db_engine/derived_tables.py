@@ -0,0 +1,362 @@
+from typing import List, Dict, Iterable, Optional
+
+# Temporary tables holding the rows of the batch that are not ingested yet (rows inserted into the history)
+BATCH_RESERVATIONS_TABLE = "batch_reservation_imports"
+BATCH_STAY_DATES_TABLE = "batch_reservation_stay_dates"
+# Temporary table holding the fingerprints of the batch that are already ingested or archived
+BATCH_EXISTING_HASHES_TABLE = "batch_existing_hashes"
+# Temporary table holding the (hotel_id, stay_night) pairs whose reservation_nights are changed by the batch
+BATCH_NIGHTS_TABLE = "batch_changed_nights"
+# Fingerprints of the reservation versions moved out of the history tables by maintain
+ARCHIVED_HASHES_TABLE = "archived_reservation_hashes"
+
+# Keys per IN list of the key probes. DuckDB looks up to 2048 keys (index_scan_max_count) in the index,
+# longer lists scan the table
+_KEY_PROBE_SIZE = 2048
+
+_RESERVATION_KEY = ["hotel_id", "reservation_id"]
+# Columns of current_reservations replaced by a newer version. Source names are stored in the source_names lookup table
+_RESERVATION_COLUMNS = ["status", "arrival_date", "departure_date", "source_name_id", "source_id", "created_at",
+                        "updated_at", "source_filename", "ingested_at", "reservation_hash"]
+
+
+def build_existing_hashes_queries(reservation_hashes: Iterable[int],
+                                  archived_hashes_table: Optional[str] = ARCHIVED_HASHES_TABLE) -> List[str]:
+    """
+    Generate the queries that load the fingerprints of the batch that are already ingested into
+    BATCH_EXISTING_HASHES_TABLE. reservation_hashes are the distinct fingerprints of the batch
+    Fingerprints are looked up by key in the unique index of reservation_imports (and the index of
+    archived_hashes_table, None if the engine does not archive), so the cost follows the batch size, not the history
+    """
+    existing_hashes_query = f"""
+    CREATE OR REPLACE TEMP TABLE {BATCH_EXISTING_HASHES_TABLE} AS
+    SELECT reservation_hash FROM reservation_imports LIMIT 0
+    """
+
+    # region Key probes, one IN list per chunk of hashes
+    table_names = ["reservation_imports"] + ([archived_hashes_table] if archived_hashes_table else [])
+    reservation_hashes = list(reservation_hashes)
+    probe_queries = []
+    for offset in range(0, len(reservation_hashes), _KEY_PROBE_SIZE):
+        hashes = ", ".join(str(int(h)) for h in reservation_hashes[offset:offset + _KEY_PROBE_SIZE])
+        probe_queries.append(f"INSERT INTO {BATCH_EXISTING_HASHES_TABLE}\n" + "\nUNION ALL\n".join(
+            f"SELECT reservation_hash FROM {table_name} WHERE reservation_hash IN ({hashes})"
+            for table_name in table_names))
+    # endregion
+
+    return [existing_hashes_query] + probe_queries
+
+
+def _build_new_rows_selects(reservations_source: str, stay_dates_source: str) -> Dict[str, str]:
+    """
+    Rows of the sources that are not ingested yet (also duplicates inside the batch are skipped), by table name
+    Stay dates are written in the transaction of their reservation version, the stay dates of a new version are new
+    """
+    return dict(reservation_imports=f"""
+    SELECT src.*
+    FROM {reservations_source} AS src
+    ANTI JOIN {BATCH_EXISTING_HASHES_TABLE} AS tbl
+    ON tbl.reservation_hash = src.reservation_hash
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY src.reservation_hash) = 1
+    """, reservation_stay_dates=f"""
+    SELECT src.*
+    FROM {stay_dates_source} AS src
+    ANTI JOIN {BATCH_EXISTING_HASHES_TABLE} AS tbl
+    ON tbl.reservation_hash = src.reservation_hash
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY src.reservation_hash, src.stay_date_hash) = 1
+    """)
+
+
+def build_reservation_batch_queries(reservations_source: str,
+                                    stay_dates_source: str,
+                                    reservation_hashes: Iterable[int],
+                                    archived_hashes_table: Optional[str] = ARCHIVED_HASHES_TABLE) -> List[str]:
+    """
+    Generate the queries that load the not yet ingested rows of a batch into the batch tables, for engines that
+    write the history from the batch tables. Sources are relations with the columns of reservation_imports and
+    reservation_stay_dates
+    """
+    new_rows_selects = _build_new_rows_selects(reservations_source=reservations_source,
+                                               stay_dates_source=stay_dates_source)
+    return build_existing_hashes_queries(reservation_hashes=reservation_hashes,
+                                         archived_hashes_table=archived_hashes_table) + [f"""
+    CREATE OR REPLACE TEMP TABLE {batch_table} AS FROM {table_name} LIMIT 0;
+    INSERT INTO {batch_table} BY NAME
+    {new_rows_selects[table_name]}
+    """ for table_name, batch_table in [("reservation_imports", BATCH_RESERVATIONS_TABLE),
+                                        ("reservation_stay_dates", BATCH_STAY_DATES_TABLE)]]
+
+
+def build_reservation_history_insert_queries(reservations_source: str, stay_dates_source: str) -> Dict[str, str]:
+    """
+    Generate the queries that append the not yet ingested rows of the sources to the history tables, by table name
+    Runs after build_existing_hashes_queries, the unique keys reject any other duplicate. Queries return the keys of
+    the inserted rows, the batch tables are loaded from them (build_inserted_batch_queries)
+    """
+    new_rows_selects = _build_new_rows_selects(reservations_source=reservations_source,
+                                               stay_dates_source=stay_dates_source)
+    return dict(reservation_imports=f"""
+    INSERT INTO reservation_imports BY NAME
+    {new_rows_selects["reservation_imports"]}
+    RETURNING reservation_hash
+    """, reservation_stay_dates=f"""
+    INSERT INTO reservation_stay_dates BY NAME
+    {new_rows_selects["reservation_stay_dates"]}
+    RETURNING reservation_hash, stay_date_hash
+    """)
+
+
+def build_inserted_batch_queries(reservations_source: str,
+                                 stay_dates_source: str,
+                                 inserted_reservations_source: str,
+                                 inserted_stay_dates_source: str) -> List[str]:
+    """
+    Generate the queries that load the rows inserted into the history tables into the batch tables, they drive the
+    updates of the derived tables. Inserted sources are relations with the keys returned by
+    build_reservation_history_insert_queries. Duplicates inside the batch are the same row
+    """
+    reservations_query = f"""
+    CREATE OR REPLACE TEMP TABLE {BATCH_RESERVATIONS_TABLE} AS FROM reservation_imports LIMIT 0;
+    INSERT INTO {BATCH_RESERVATIONS_TABLE} BY NAME
+    SELECT src.*
+    FROM {reservations_source} AS src
+    SEMI JOIN {inserted_reservations_source} AS ins
+    ON ins.reservation_hash = src.reservation_hash
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY src.reservation_hash) = 1
+    """
+
+    stay_dates_query = f"""
+    CREATE OR REPLACE TEMP TABLE {BATCH_STAY_DATES_TABLE} AS FROM reservation_stay_dates LIMIT 0;
+    INSERT INTO {BATCH_STAY_DATES_TABLE} BY NAME
+    SELECT src.*
+    FROM {stay_dates_source} AS src
+    SEMI JOIN {inserted_stay_dates_source} AS ins
+    ON ins.reservation_hash = src.reservation_hash
+    AND ins.stay_date_hash = src.stay_date_hash
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY src.reservation_hash, src.stay_date_hash) = 1
+    """
+
+    return [reservations_query, stay_dates_query]
+
+
+def build_current_reservations_queries() -> List[str]:
+    """
+    Generate the queries that apply the batch tables to current_reservations and current_stay_dates
+    A reservation version replaces the current one if it has a newer updated_at (ingested_at on ties), stay dates
+    of the replaced version are replaced with the stay dates of the new version
+    Source and room type names are stored as ids of the source_names and room_type_names lookup tables, new names
+    of the batch are added to the lookup tables
+    """
+    update_columns = ",\n        ".join(f"{column} = EXCLUDED.{column}" for column in _RESERVATION_COLUMNS)
+
+    source_names_query = f"""
+    INSERT INTO source_names (source_name)
+    SELECT DISTINCT b.source_name
+    FROM {BATCH_RESERVATIONS_TABLE} AS b
+    ANTI JOIN source_names AS n
+    ON n.source_name = b.source_name
+    WHERE b.source_name IS NOT NULL
+    ORDER BY b.source_name
+    """
+
+    reservations_query = f"""
+    INSERT INTO current_reservations BY NAME
+    SELECT b.* EXCLUDE (source_name), n.source_name_id
+    FROM (
+        SELECT *
+        FROM {BATCH_RESERVATIONS_TABLE}
+        QUALIFY ROW_NUMBER() OVER(PARTITION BY hotel_id, reservation_id ORDER BY updated_at DESC, ingested_at DESC) = 1
+    ) AS b
+    LEFT JOIN source_names AS n
+    ON n.source_name = b.source_name
+    ON CONFLICT ({", ".join(_RESERVATION_KEY)}) DO UPDATE SET
+        {update_columns}
+    WHERE EXCLUDED.updated_at > current_reservations.updated_at
+    OR (EXCLUDED.updated_at = current_reservations.updated_at
+        AND EXCLUDED.ingested_at >= current_reservations.ingested_at)
+    """
+
+    # Stay dates of the versions replaced by the batch
+    delete_stay_dates_query = f"""
+    DELETE FROM current_stay_dates
+    USING (
+        SELECT r.hotel_id, r.reservation_id, r.reservation_hash
+        FROM current_reservations AS r
+        SEMI JOIN {BATCH_RESERVATIONS_TABLE} AS b
+        ON b.reservation_hash = r.reservation_hash
+    ) AS r
+    WHERE r.hotel_id = current_stay_dates.hotel_id
+    AND r.reservation_id = current_stay_dates.reservation_id
+    AND r.reservation_hash <> current_stay_dates.reservation_hash
+    """
+
+    room_type_names_query = f"""
+    INSERT INTO room_type_names (room_type_name)
+    SELECT DISTINCT d.room_type_name
+    FROM {BATCH_STAY_DATES_TABLE} AS d
+    ANTI JOIN room_type_names AS n
+    ON n.room_type_name = d.room_type_name
+    WHERE d.room_type_name IS NOT NULL
+    ORDER BY d.room_type_name
+    """
+
+    insert_stay_dates_query = f"""
+    INSERT INTO current_stay_dates BY NAME
+    SELECT d.* EXCLUDE (room_type_name), n.room_type_name_id
+    FROM {BATCH_STAY_DATES_TABLE} AS d
+    SEMI JOIN current_reservations AS r
+    ON r.reservation_hash = d.reservation_hash
+    AND r.hotel_id = d.hotel_id
+    AND r.reservation_id = d.reservation_id
+    LEFT JOIN room_type_names AS n
+    ON n.room_type_name = d.room_type_name
+    """
+
+    return [source_names_query, reservations_query, delete_stay_dates_query, room_type_names_query,
+            insert_stay_dates_query]
+
+
+def build_reservation_nights_queries() -> List[str]:
+    """
+    Generate the queries that rebuild the reservation_nights of the reservations whose current version
+    is replaced by the batch. A night is covered by one stay date, otherwise the reservation is flagged as overlapped
+    """
+    touched_reservations = f"""
+        SELECT r.hotel_id, r.reservation_id
+        FROM current_reservations AS r
+        SEMI JOIN {BATCH_RESERVATIONS_TABLE} AS b
+        ON b.reservation_hash = r.reservation_hash
+    """
+
+    # Nights before the batch, nights after the batch are appended after the insert
+    changed_nights_query = f"""
+    CREATE OR REPLACE TEMP TABLE {BATCH_NIGHTS_TABLE} AS
+    SELECT DISTINCT n.hotel_id, n.stay_night
+    FROM reservation_nights AS n
+    SEMI JOIN ({touched_reservations}) AS t
+    ON t.hotel_id = n.hotel_id
+    AND t.reservation_id = n.reservation_id
+    """
+
+    delete_query = f"""
+    DELETE FROM reservation_nights
+    USING ({touched_reservations}) AS t
+    WHERE t.hotel_id = reservation_nights.hotel_id
+    AND t.reservation_id = reservation_nights.reservation_id
+    """
+
+    insert_query = f"""
+    INSERT INTO reservation_nights
+    SELECT
+        hotel_id,
+        reservation_id,
+        stay_night,
+        reservation_hash,
+        stay_date_hash,
+        room_type_id,
+        revenue_net_amount,
+        is_cancelled,
+        MAX(night_count) OVER(PARTITION BY hotel_id, reservation_id) > 1 AS is_overlapped
+    FROM (
+        SELECT
+            r.hotel_id,
+            r.reservation_id,
+            CAST(ds.stay_night AS DATE) AS stay_night,
+            r.reservation_hash,
+            d.stay_date_hash,
+            d.room_type_id,
+            d.revenue_net_amount,
+            IF(r.status = 'cancelled', TRUE, FALSE) AS is_cancelled,
+            COUNT(1) OVER(PARTITION BY r.hotel_id, r.reservation_id, ds.stay_night) AS night_count
+        FROM current_reservations AS r
+        SEMI JOIN {BATCH_RESERVATIONS_TABLE} AS b
+        ON b.reservation_hash = r.reservation_hash
+        INNER JOIN current_stay_dates AS d
+        ON d.reservation_hash = r.reservation_hash
+        CROSS JOIN GENERATE_SERIES(d.start_date, d.end_date, INTERVAL 1 DAY) AS ds(stay_night)
+    )
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY hotel_id, reservation_id, stay_night ORDER BY stay_date_hash) = 1
+    """
+
+    append_changed_nights_query = f"""
+    INSERT INTO {BATCH_NIGHTS_TABLE}
+    SELECT DISTINCT n.hotel_id, n.stay_night
+    FROM reservation_nights AS n
+    SEMI JOIN ({touched_reservations}) AS t
+    ON t.hotel_id = n.hotel_id
+    AND t.reservation_id = n.reservation_id
+    ANTI JOIN {BATCH_NIGHTS_TABLE} AS c
+    ON c.hotel_id = n.hotel_id
+    AND c.stay_night = n.stay_night
+    """
+
+    return [changed_nights_query, delete_query, insert_query, append_changed_nights_query]
+
+
+def _build_kpi_daily_select(nights_filter: str = "") -> str:
+    """
+    Generate the query that aggregates reservation_nights per hotel and night
+    Reservations of room types that are not in the active inventory are excluded, room count is the sum of the room
+    quantities in the active inventory of the hotel
+    """
+    return f"""
+    WITH cte_inventory_room_types AS (
+        SELECT DISTINCT hotel_id, room_type_id FROM inventory WHERE is_active
+    ),
+    cte_inventory_room_count AS (
+        SELECT hotel_id, SUM(quantity) AS room_count FROM inventory WHERE is_active GROUP BY hotel_id
+    )
+    SELECT
+        n.hotel_id,
+        n.stay_night AS night_of_stay,
+        COUNT(DISTINCT n.reservation_id) AS occupied_rooms,
+        SUM(n.revenue_net_amount) AS total_net_revenue,
+        c.room_count
+    FROM reservation_nights AS n
+    {nights_filter}
+    INNER JOIN cte_inventory_room_types AS i
+    ON i.hotel_id = n.hotel_id
+    AND i.room_type_id = n.room_type_id
+    INNER JOIN cte_inventory_room_count AS c
+    ON c.hotel_id = n.hotel_id
+    WHERE NOT n.is_overlapped
+    AND NOT n.is_cancelled
+    GROUP BY n.hotel_id, n.stay_night, c.room_count
+    """
+
+
+def build_kpi_daily_queries() -> List[str]:
+    """
+    Generate the queries that recompute the kpi_daily rows of the nights changed by the batch
+    """
+    delete_query = f"""
+    DELETE FROM kpi_daily
+    USING {BATCH_NIGHTS_TABLE} AS c
+    WHERE c.hotel_id = kpi_daily.hotel_id
+    AND c.stay_night = kpi_daily.night_of_stay
+    """
+
+    nights_filter = f"""
+    SEMI JOIN {BATCH_NIGHTS_TABLE} AS b
+    ON b.hotel_id = n.hotel_id
+    AND b.stay_night = n.stay_night
+    """
+    insert_query = f"INSERT INTO kpi_daily {_build_kpi_daily_select(nights_filter=nights_filter)}"
+
+    return [delete_query, insert_query]
+
+
+def build_kpi_daily_rebuild_queries() -> List[str]:
+    """
+    Generate the queries that rebuild kpi_daily from scratch (e.g. after the inventory is replaced)
+    """
+    return ["DELETE FROM kpi_daily", f"INSERT INTO kpi_daily {_build_kpi_daily_select()}"]
+
+
+def build_reservation_batch_cleanup_queries() -> List[str]:
+    """
+    Generate the queries that drop the batch tables
+    """
+    return [f"DROP TABLE IF EXISTS {table_name}"
+            for table_name in [BATCH_EXISTING_HASHES_TABLE, BATCH_RESERVATIONS_TABLE, BATCH_STAY_DATES_TABLE,
+                               BATCH_NIGHTS_TABLE]]
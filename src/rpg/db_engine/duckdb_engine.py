@@ -1,26 +1,111 @@
+import os
+import math
+import numbers
+import itertools
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
+from contextlib import contextmanager
+from decimal import Decimal
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Optional, Union, Sequence, Iterator
 import duckdb
 import pandas as pd
 from rpg.db_engine.db_engine_base import DBEngineBase
+from rpg.db_engine.query_profiler import QueryProfiler, ProfilingCursor
+from rpg.db_engine.native_ingestion import (
+    sql_string,
+    build_reservation_ingestion_queries,
+    build_reservation_insert_queries,
+    build_reservation_cleanup_queries
+)
+from rpg.db_engine.derived_tables import (
+    ARCHIVED_HASHES_TABLE,
+    build_existing_hashes_queries,
+    build_reservation_history_insert_queries,
+    build_inserted_batch_queries,
+    build_current_reservations_queries,
+    build_reservation_nights_queries,
+    build_kpi_daily_queries,
+    build_kpi_daily_rebuild_queries,
+    build_reservation_batch_cleanup_queries
+)
 from rpg.utils.io_util import read_text_file, list_files
+from rpg.utils.hash_util import calculate_text_hash
+from rpg.utils.datetime_util import format_datetime
 from rpg.utils.logger import Logger
 
 
+def _sql_literal(value: Any) -> str:
+    """
+    Typed SQL literal of a parameter value, used as EXECUTE argument of a prepared statement
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, Decimal):
+        return f"{sql_string(str(value))}::DECIMAL" if value.is_finite() else f"{sql_string(str(value))}::DOUBLE"
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return repr(value) if math.isfinite(value) else f"{sql_string(repr(value))}::DOUBLE"
+    if isinstance(value, datetime):
+        data_type = "TIMESTAMPTZ" if value.tzinfo is not None else "TIMESTAMP"
+        return f"{data_type} {sql_string(value.isoformat(sep=' '))}"
+    if isinstance(value, date):
+        return f"DATE {sql_string(value.isoformat())}"
+    if isinstance(value, str):
+        return sql_string(value)
+    raise TypeError(f"Parameter type '{type(value).__name__}' is not supported!")
+
+
 class DuckDBEngine(DBEngineBase):
 
     ENGINE_NAME = "DuckDBEngine"
-
-    def __init__(self, database_configuration: Dict[Any, Any]):
-        super().__init__(database_configuration)
+    PREPARED_STATEMENT_CACHE_SIZE = 128
+    MIGRATIONS_TABLE = "schema_migrations"
+    SNAPSHOT_DATABASE_NAME = "rpg_snapshot"
+    # Tables read by the views, history tables are not published to the read snapshot
+    SNAPSHOT_TABLES = ["inventory", "current_reservations", "current_stay_dates", "reservation_nights", "kpi_daily",
+                       "source_names", "room_type_names"]
+    # Fact tables read by hotel and night range, and their (hotel, date) columns. Re-clustered by maintain (optional)
+    CLUSTERED_TABLES = OrderedDict([("reservation_stay_dates", ("hotel_id", "start_date")),
+                                    ("current_stay_dates", ("hotel_id", "start_date")),
+                                    ("reservation_nights", ("hotel_id", "stay_night")),
+                                    ("kpi_daily", ("hotel_id", "night_of_stay"))])
+
+    def __init__(self, database_configuration: Dict[Any, Any], read_only: Optional[bool] = False):
+        super().__init__(database_configuration, read_only=read_only)
         self._engine_name = self.ENGINE_NAME
         self._db_path = None
+        self._snapshot_path = None
+        self._query_profiler = None
+        self._connection = None
+        self._connection_lock = threading.Lock()
+        self._cursors = []
+        self._thread_local = threading.local()
+        self._statement_ids = itertools.count(1)
+        self._is_transaction_open = False
         self._init()
 
+        # Statements are recorded by the query profiler if profile_path is configured (optional)
+        if self.database_configuration.get("profile_path"):
+            self._query_profiler = QueryProfiler(
+                profile_path=self.database_configuration["profile_path"],
+                slow_query_ms=int(self.database_configuration.get("profile_slow_query_ms", 1000)),
+                include_plans=self.database_configuration.get("profile_plans", False)
+            )
+
     @property
     def db_path(self) -> str:
         return self._db_path
 
+    @property
+    def snapshot_path(self) -> Optional[Path]:
+        return self._snapshot_path
+
     def _init(self):
         # region Check configuration and set DB path
         db_path = Path(self.database_configuration["db_path"])
@@ -28,12 +113,123 @@ class DuckDBEngine(DBEngineBase):
         self._db_path = db_path
         # endregion
 
+        # region Set read snapshot path (optional)
+        if self.database_configuration.get("snapshot_path"):
+            snapshot_path = Path(self.database_configuration["snapshot_path"])
+            snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            self._snapshot_path = snapshot_path
+        # endregion
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        """
+        Cursor of the current thread on the long-lived database connection, connection is opened on first use
+        If profile_path is configured, the statements of the cursor are recorded by the query profiler
+        """
+        cursor = getattr(self._thread_local, "cursor", None)
+        if cursor is not None and cursor[0] is self._connection:
+            return cursor[1]
+
+        with self._connection_lock:
+            if self._connection is None:
+                self._connection = self._connect()
+            thread_cursor = self._connection.cursor()
+            if self._query_profiler is not None:
+                thread_cursor = ProfilingCursor(cursor=thread_cursor,
+                                                profiler=self._query_profiler,
+                                                tags=self._profiling_tags)
+            self._cursors.append(thread_cursor)
+            self._thread_local.cursor = (self._connection, thread_cursor)
+            # Prepared statements belong to the cursor
+            self._thread_local.prepared_statements = OrderedDict()
+        return thread_cursor
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        """
+        Open the long-lived database connection. Read only engines open the latest read snapshot if published,
+        so they do not wait for the database file held by the ingestion
+        """
+        if self.read_only and self.snapshot_path is not None and self.snapshot_path.exists():
+            Logger.info(f"Reading snapshot '{self.snapshot_path}'")
+            return duckdb.connect(database=str(self.snapshot_path), read_only=True)
+        return duckdb.connect(database=str(self.db_path), read_only=self.read_only)
+
+    def _prepared_statement(self, conn: duckdb.DuckDBPyConnection, query: str) -> str:
+        """
+        Name of the prepared statement of the query on the cursor of the current thread, keyed by SQL text
+        Statement is prepared (parsed and planned) on the first call, least recently used statement is deallocated
+        """
+        prepared_statements = self._thread_local.prepared_statements
+        statement_name = prepared_statements.get(query)
+        if statement_name is not None:
+            prepared_statements.move_to_end(query)
+            return statement_name
+
+        statement_name = f"rpg_statement_{next(self._statement_ids)}"
+        conn.execute(f"PREPARE {statement_name} AS {query}")
+        prepared_statements[query] = statement_name
+
+        if len(prepared_statements) > self.PREPARED_STATEMENT_CACHE_SIZE:
+            _, evicted_statement_name = prepared_statements.popitem(last=False)
+            conn.execute(f"DEALLOCATE {evicted_statement_name}")
+        return statement_name
+
+    def begin_transaction(self):
+        """
+        Open a transaction on the cursor of the current thread that is ended by end_transaction. Writes of the engine
+        (insert_rows, bulk_insert, ingest_reservations, ingest_inventory) run inside it instead of committing on their own
+        """
+        self._cursor().execute("BEGIN")
+        self._is_transaction_open = True
+
+    def end_transaction(self, commit: bool):
+        """
+        Commit or roll back the transaction opened by begin_transaction
+        """
+        conn = self._cursor()
+        try:
+            conn.execute("COMMIT" if commit else "ROLLBACK")
+        except Exception as e:
+            # A failed COMMIT leaves nothing written
+            if commit:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._is_transaction_open = False
+
+    @contextmanager
+    def _transaction(self, conn: duckdb.DuckDBPyConnection) -> Iterator[None]:
+        """
+        Transaction of a write, the write joins the transaction opened by begin_transaction if there is one
+        """
+        if self._is_transaction_open:
+            yield
+            return
+
+        conn.execute("BEGIN")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            raise
+
+    def close(self):
+        """
+        Close the cursors and the database connection
+        """
+        with self._connection_lock:
+            for cursor in self._cursors:
+                cursor.close()
+            self._cursors = []
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
     def validate_connection(self) -> bool:
         try:
             Logger.info("Validating DuckDB connection...")
-            with duckdb.connect(database=self.db_path) as conn:
-                Logger.success("Success!")
-                pass
+            self._cursor().execute("SELECT 1")
+            Logger.success("Success!")
             return True
         except Exception as e:
             Logger.error(message="Error DukDB connection",
@@ -42,35 +238,378 @@ class DuckDBEngine(DBEngineBase):
             return False
 
     def initialize_database(self):
+        """
+        Apply new and changed SQL files in order. Applied files and their checksums are kept in schema_migrations,
+        each file runs with its schema_migrations row in a single transaction
+        View files are applied after all DDL files. Views are created again after a DDL migration, so their columns
+        are bound to the migrated tables
+        """
         Logger.info("Initializing tables...")
         sql_source_path = Path(__file__).parents[1] / "sql"
         sql_paths = [str(p) for p in list_files(filepath=str(sql_source_path))]
+        ddl_paths = [sql_path for sql_path in sql_paths if "__view__" not in Path(sql_path).name]
+        view_paths = [sql_path for sql_path in sql_paths if "__view__" in Path(sql_path).name]
+
+        conn = self._cursor()
+        conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {self.MIGRATIONS_TABLE} (
+            filename VARCHAR PRIMARY KEY,
+            checksum VARCHAR,
+            applied_at TIMESTAMP
+        )
+        """)
+        applied_checksums = dict(conn.execute(f"SELECT filename, checksum FROM {self.MIGRATIONS_TABLE}").fetchall())
+
+        is_migrated = False
+        for sql_path in ddl_paths:
+            is_migrated = self._apply_sql_file(conn=conn,
+                                               sql_path=sql_path,
+                                               applied_checksums=applied_checksums) or is_migrated
+
+        for sql_path in view_paths:
+            self._apply_sql_file(conn=conn,
+                                 sql_path=sql_path,
+                                 applied_checksums=applied_checksums,
+                                 force=is_migrated)
+
+        # region Remove rows of view files that do not exist anymore (views of earlier file names)
+        view_filenames = [Path(sql_path).name for sql_path in view_paths]
+        for filename in applied_checksums:
+            if "__view__" in filename and filename not in view_filenames:
+                conn.execute(f"DELETE FROM {self.MIGRATIONS_TABLE} WHERE filename = ?", [filename])
+        # endregion
 
-        with duckdb.connect(self.db_path) as conn:
-            for sql_path in sql_paths:
-                Logger.info(f"Running DDL query '{sql_path}'")
-                query = read_text_file(filepath=sql_path)
-                conn.execute(query)
-                Logger.success("Done!")
+        # First snapshot, later snapshots are published after the ingestion runs
+        if self.snapshot_path is not None and not self.snapshot_path.exists():
+            self.publish_snapshot()
+
+        return True
+
+    def _apply_sql_file(self,
+                        conn: duckdb.DuckDBPyConnection,
+                        sql_path: str,
+                        applied_checksums: Dict[str, str],
+                        force: Optional[bool] = False) -> bool:
+        """
+        Run the SQL file with its schema_migrations row in a single transaction, if the file is new or changed
+        (or force). Returns True if the file is applied
+        """
+        filename = Path(sql_path).name
+        query = read_text_file(filepath=sql_path)
+        checksum = calculate_text_hash(text=query)
+        if applied_checksums.get(filename) == checksum and not force:
+            return False
 
+        Logger.info(f"Running DDL query '{sql_path}'")
+        conn.execute("BEGIN")
+        try:
+            conn.execute(query)
+            conn.execute(f"INSERT OR REPLACE INTO {self.MIGRATIONS_TABLE} VALUES (?, ?, now())",
+                         [filename, checksum])
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            raise
+        Logger.success("Done!")
         return True
 
+    def publish_snapshot(self, is_safe: Optional[bool] = True) -> bool:
+        """
+        Copy the tables read by the views into a new database file in a single transaction, create the views and
+        replace the snapshot file. Readers keep the snapshot they already opened
+        """
+        if self.snapshot_path is None:
+            return False
+
+        try:
+            Logger.info(f"Publishing read snapshot '{self.snapshot_path}'...")
+
+            # region Remove leftovers of a failed publish
+            temporary_path = self.snapshot_path.with_name(f"{self.snapshot_path.name}.tmp")
+            for path in [temporary_path, temporary_path.with_name(f"{temporary_path.name}.wal")]:
+                path.unlink(missing_ok=True)
+            # endregion
+
+            # region Copy tables and create views in the temporary database
+            conn = self._cursor()
+            database_name = conn.execute("SELECT current_database()").fetchone()[0]
+            conn.execute(f"ATTACH {sql_string(str(temporary_path))} AS {self.SNAPSHOT_DATABASE_NAME}")
+
+            try:
+
+                conn.execute("BEGIN")
+                try:
+                    for table_name in self.SNAPSHOT_TABLES:
+                        conn.execute(f"CREATE TABLE {self.SNAPSHOT_DATABASE_NAME}.{table_name} AS "
+                                     f"FROM {database_name}.main.{table_name}")
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    conn.execute("ROLLBACK")
+                    raise
+
+                conn.execute(f"USE {self.SNAPSHOT_DATABASE_NAME}")
+                try:
+                    sql_source_path = Path(__file__).parents[1] / "sql"
+                    for sql_path in list_files(filepath=str(sql_source_path)):
+                        if "__view__" in Path(sql_path).name:
+                            conn.execute(read_text_file(filepath=str(sql_path)))
+                finally:
+                    conn.execute(f"USE {database_name}")
+
+                conn.execute(f"CHECKPOINT {self.SNAPSHOT_DATABASE_NAME}")
+
+            finally:
+                conn.execute(f"DETACH {self.SNAPSHOT_DATABASE_NAME}")
+            # endregion
+
+            os.replace(temporary_path, self.snapshot_path)
+            Logger.success("Done!")
+            return True
+
+        except Exception as e:
+            Logger.error(message=f"Error publishing read snapshot '{self.snapshot_path}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return False
+            else:
+                raise
+
+    def _database_size(self) -> int:
+        """
+        Size of the database file and its write-ahead log in bytes
+        """
+        wal_path = self.db_path.with_name(f"{self.db_path.name}.wal")
+        return sum(path.stat().st_size for path in [self.db_path, wal_path] if path.exists())
+
+    def _clustering_statistics(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> Dict[str, float]:
+        """
+        Row groups of the table and the average number of row groups a single hotel monthly report scans, row groups
+        are skipped by the min/max (zone map) of their hotel and date columns
+        """
+        hotel_column, date_column = self.CLUSTERED_TABLES[table_name]
+        row_groups, scanned_row_groups = conn.execute(f"""
+        WITH zone_maps AS (
+            SELECT
+                row_group_id,
+                MIN(TRY_CAST(REGEXP_EXTRACT(stats, 'Min: ([^,\\]]+)', 1) AS INTEGER))
+                    FILTER (WHERE column_name = {sql_string(hotel_column)}) AS min_hotel_id,
+                MAX(TRY_CAST(REGEXP_EXTRACT(stats, 'Max: ([^,\\]]+)', 1) AS INTEGER))
+                    FILTER (WHERE column_name = {sql_string(hotel_column)}) AS max_hotel_id,
+                MIN(TRY_CAST(REGEXP_EXTRACT(stats, 'Min: ([^,\\]]+)', 1) AS DATE))
+                    FILTER (WHERE column_name = {sql_string(date_column)}) AS min_date,
+                MAX(TRY_CAST(REGEXP_EXTRACT(stats, 'Max: ([^,\\]]+)', 1) AS DATE))
+                    FILTER (WHERE column_name = {sql_string(date_column)}) AS max_date
+            FROM pragma_storage_info({sql_string(table_name)})
+            WHERE segment_type <> 'VALIDITY'
+            GROUP BY row_group_id
+        ),
+        monthly_reports AS (
+            SELECT DISTINCT {hotel_column} AS hotel_id, CAST(DATE_TRUNC('month', {date_column}) AS DATE) AS month_start
+            FROM {table_name}
+        )
+        SELECT
+            (SELECT COUNT(*) FROM zone_maps),
+            COALESCE(AVG(scanned_row_groups), 0)
+        FROM (
+            SELECT r.hotel_id, r.month_start, COUNT(z.row_group_id) AS scanned_row_groups
+            FROM monthly_reports AS r
+            LEFT JOIN zone_maps AS z
+            ON r.hotel_id BETWEEN z.min_hotel_id AND z.max_hotel_id
+            AND z.min_date < r.month_start + INTERVAL 1 MONTH
+            AND z.max_date >= r.month_start
+            GROUP BY r.hotel_id, r.month_start
+        )
+        """).fetchone()
+        return dict(row_groups=row_groups, scanned_row_groups=round(float(scanned_row_groups), 1))
+
+    def maintain(self,
+                 archive_path: str,
+                 retention_days: Optional[int] = 30,
+                 compact: Optional[bool] = False,
+                 cluster: Optional[bool] = False,
+                 is_safe: Optional[bool] = True) -> Optional[Dict[str, Any]]:
+        """
+        Move the superseded reservation versions ingested before the retention window, and their stay dates, into
+        Parquet files under archive_path in a single transaction and checkpoint the database. Fingerprints of the
+        archived versions are kept in archived_reservation_hashes, the ingestion skips them. If cluster, the fact
+        tables are rewritten in (hotel, date) order, so the zone maps of their row groups skip the other hotels and
+        nights. If compact, the database is copied into a new file, which releases the free blocks of the file
+        """
+        superseded_table = "maintenance_superseded_versions"
+        archive_tables = ["reservation_stay_dates", "reservation_imports"]
+
+        try:
+            Logger.info(f"Archiving reservation versions superseded more than {retention_days} day(s) ago...")
+            size_before = self._database_size()
+            archived_at = format_datetime(value=datetime.now(), pattern="%Y%m%d%H%M%S")
+            archive_filepaths = {table_name: Path(archive_path) / table_name / f"{table_name}__{archived_at}.parquet"
+                                 for table_name in archive_tables}
+
+            # region Write superseded versions to temporary Parquet files and delete them in a single transaction
+            conn = self._cursor()
+            conn.execute("BEGIN")
+            try:
+
+                conn.execute(f"""
+                CREATE OR REPLACE TEMP TABLE {superseded_table} AS
+                SELECT r.reservation_hash
+                FROM reservation_imports AS r
+                ANTI JOIN current_reservations AS c
+                ON c.reservation_hash = r.reservation_hash
+                WHERE r.ingested_at < ?
+                """, [datetime.now() - timedelta(days=retention_days)])
+
+                row_counts = {table_name: 0 for table_name in archive_tables}
+                if conn.execute(f"SELECT COUNT(*) FROM {superseded_table}").fetchone()[0] > 0:
+                    for table_name, archive_filepath in archive_filepaths.items():
+                        archive_filepath.parent.mkdir(parents=True, exist_ok=True)
+                        conn.execute(f"""
+                        COPY (
+                            SELECT t.*
+                            FROM {table_name} AS t
+                            SEMI JOIN {superseded_table} AS s
+                            ON s.reservation_hash = t.reservation_hash
+                        ) TO {sql_string(f"{archive_filepath}.tmp")} (FORMAT PARQUET)
+                        """)
+                        row_counts[table_name] = conn.execute(f"""
+                        DELETE FROM {table_name}
+                        USING {superseded_table} AS s
+                        WHERE s.reservation_hash = {table_name}.reservation_hash
+                        """).fetchone()[0]
+
+                    # Archived versions of re-sent files are skipped by the ingestion
+                    conn.execute(f"INSERT INTO {ARCHIVED_HASHES_TABLE} SELECT reservation_hash FROM {superseded_table}")
+
+                conn.execute("COMMIT")
+
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                for archive_filepath in archive_filepaths.values():
+                    Path(f"{archive_filepath}.tmp").unlink(missing_ok=True)
+                raise
+
+            finally:
+                conn.execute(f"DROP TABLE IF EXISTS {superseded_table}")
+
+            # Temporary files are kept if renaming fails, deleted rows are not lost
+            for table_name, archive_filepath in archive_filepaths.items():
+                if row_counts[table_name] > 0:
+                    os.replace(f"{archive_filepath}.tmp", archive_filepath)
+            # endregion
+
+            # region Re-cluster the fact tables in a single transaction
+            # Ingestion appends rows in arrival order, each table is created again from its catalog DDL (primary key
+            # included) and filled in (hotel, date) order. Rows can not be deleted and inserted again in the same
+            # transaction, unique indexes of DuckDB reject the inserted keys
+            clustering = OrderedDict()
+            if cluster:
+                Logger.info(f"Clustering tables {list(self.CLUSTERED_TABLES.keys())} by hotel and date...")
+                for table_name in self.CLUSTERED_TABLES.keys():
+                    clustering[table_name] = dict(before=self._clustering_statistics(conn=conn, table_name=table_name))
+
+                conn.execute("BEGIN")
+                try:
+                    for table_name, (hotel_column, date_column) in self.CLUSTERED_TABLES.items():
+                        clustered_table = f"{table_name}__clustered"
+                        table_sql = conn.execute("SELECT sql FROM duckdb_tables() WHERE table_name = ?",
+                                                 [table_name]).fetchone()[0]
+                        index_sqls = [row[0] for row in conn.execute("SELECT sql FROM duckdb_indexes() "
+                                                                     "WHERE table_name = ?", [table_name]).fetchall()]
+                        if not table_sql.startswith(f"CREATE TABLE {table_name}("):
+                            raise ValueError(f"Unexpected DDL of table '{table_name}': {table_sql}")
+
+                        conn.execute(table_sql.replace(f"CREATE TABLE {table_name}(",
+                                                       f"CREATE TABLE {clustered_table}(", 1))
+                        conn.execute(f"""
+                        INSERT INTO {clustered_table}
+                        SELECT * FROM {table_name}
+                        ORDER BY {hotel_column}, {date_column}
+                        """)
+                        conn.execute(f"DROP TABLE {table_name}")
+                        conn.execute(f"ALTER TABLE {clustered_table} RENAME TO {table_name}")
+                        for index_sql in index_sqls:
+                            conn.execute(index_sql)
+                    conn.execute("COMMIT")
+                except Exception as e:
+                    conn.execute("ROLLBACK")
+                    raise
+            # endregion
+
+            # region Checkpoint, deleted rows are vacuumed and their blocks are reused by the next ingestions
+            conn.execute("CHECKPOINT")
+            # endregion
+
+            # region Scan statistics of the clustered tables
+            for table_name, statistics in clustering.items():
+                statistics["after"] = self._clustering_statistics(conn=conn, table_name=table_name)
+                Logger.info(f"'{table_name}': a single hotel monthly report scans "
+                            f"{statistics['before']['scanned_row_groups']} of {statistics['before']['row_groups']} "
+                            f"row group(s) before clustering, {statistics['after']['scanned_row_groups']} of "
+                            f"{statistics['after']['row_groups']} after")
+            # endregion
+
+            # region Compact the database file
+            if compact:
+                Logger.info(f"Compacting database '{self.db_path}'...")
+                compact_path = self.db_path.with_name(f"{self.db_path.name}.compact")
+                for path in [compact_path, compact_path.with_name(f"{compact_path.name}.wal")]:
+                    path.unlink(missing_ok=True)
+
+                database_name = conn.execute("SELECT current_database()").fetchone()[0]
+                conn.execute(f"ATTACH {sql_string(str(compact_path))} AS rpg_compact")
+                try:
+                    conn.execute(f"COPY FROM DATABASE {database_name} TO rpg_compact")
+                finally:
+                    conn.execute("DETACH rpg_compact")
+
+                # Engine reconnects to the compacted file on the next call, compacted file contains the WAL entries
+                self.close()
+                os.replace(compact_path, self.db_path)
+                self.db_path.with_name(f"{self.db_path.name}.wal").unlink(missing_ok=True)
+            # endregion
+
+            size_after = self._database_size()
+            Logger.success(f"Done! {row_counts['reservation_imports']} reservation version(s) and "
+                           f"{row_counts['reservation_stay_dates']} stay date(s) archived, database size "
+                           f"{size_before / 1024 ** 2:.1f} MiB -> {size_after / 1024 ** 2:.1f} MiB "
+                           f"({(size_before - size_after) / 1024 ** 2:.1f} MiB reclaimed)")
+            return dict(row_counts, size_before=size_before, size_after=size_after, clustering=clustering)
+
+        except Exception as e:
+            Logger.error(message="Error maintaining database",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise
+
     def execute(self,
                 query: str,
+                parameters: Optional[Sequence[Any]] = None,
                 is_safe: Optional[bool] = True) -> Optional[Union[bool, int, pd.DataFrame]]:
+        """
+        Queries with parameters run as cached prepared statements, repeated calls skip parsing and planning
+        """
         try:
 
             # region Execute query and process result (DML, DDL, SELECT)
-            with duckdb.connect(self.db_path) as conn:
+            conn = self._cursor()
+            if parameters is None:
                 result = conn.execute(query=query)
+            else:
+                statement_name = self._prepared_statement(conn=conn, query=query.strip().rstrip(";"))
+                arguments = ", ".join(_sql_literal(value) for value in parameters)
+                result = conn.execute(f"EXECUTE {statement_name}({arguments})")
 
-                if result.description is not None:
-                    # If the description is not None, then the query is SELECT query. Fetch all
-                    return result.df()
+            if result.description is not None:
+                # If the description is not None, then the query is SELECT query. Fetch all
+                return result.df()
 
-                row_count = getattr(result, "rowcount", None) # Try to get row count for DMLs
-                if row_count is not None:
-                    return row_count
+            row_count = getattr(result, "rowcount", None) # Try to get row count for DMLs
+            if row_count is not None:
+                return row_count
 
             # If DDL and has no errors, return True
             return True
@@ -114,10 +653,68 @@ class DuckDBEngine(DBEngineBase):
             # endregion
 
             # region Begin transaction and execute insert query to prevent missing inserts
-            with duckdb.connect(self.db_path) as conn:
-                conn.execute("BEGIN")
+            conn = self._cursor()
+            with self._transaction(conn=conn):
 
-                try:
+                if overwrite:
+                    conn.execute(f"TRUNCATE {table_name}")
+
+                if pre_query:
+                    conn.execute(pre_query)
+
+                conn.executemany(query=sql_statement,
+                                 parameters=values)
+
+                if post_query:
+                    conn.execute(post_query)
+            # endregion
+
+            return len(rows)
+
+        except Exception as e:
+
+            Logger.error(message=f"Error inserting rows into '{table_name}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return 0
+            else:
+                raise
+
+    def bulk_insert(self,
+                    table_name: str,
+                    data: pd.DataFrame,
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True) -> int:
+        """
+        Register the DataFrame (or Arrow table) as a relation and load it with a single INSERT ... SELECT
+        """
+        try:
+
+            # region If there is no rows, return 0
+            if data is None or len(data) == 0:
+                return 0
+            # endregion
+
+            # region Prepare SQL query
+            source_name = "bulk_insert_source"
+            sql_columns = ", ".join(f'"{column}"' for column in data.columns)
+
+            sql_statement = f"""
+            INSERT INTO {table_name} ({sql_columns})
+            SELECT {sql_columns} FROM {source_name}
+            """
+            # endregion
+
+            # region Begin transaction and execute insert query to prevent missing inserts
+            conn = self._cursor()
+            conn.register(source_name, data)
+
+            try:
+
+                with self._transaction(conn=conn):
 
                     if overwrite:
                         conn.execute(f"TRUNCATE {table_name}")
@@ -125,20 +722,16 @@ class DuckDBEngine(DBEngineBase):
                     if pre_query:
                         conn.execute(pre_query)
 
-                    conn.executemany(query=sql_statement,
-                                     parameters=values)
+                    conn.execute(sql_statement)
 
                     if post_query:
                         conn.execute(post_query)
 
-                    conn.execute("COMMIT")
-
-                except Exception as e:
-                    conn.execute("ROLLBACK")
-                    raise
+            finally:
+                conn.unregister(source_name)
             # endregion
 
-            return len(rows)
+            return len(data)
 
         except Exception as e:
 
@@ -149,3 +742,221 @@ class DuckDBEngine(DBEngineBase):
                 return 0
             else:
                 raise
+
+    def _write_reservation_batch(self,
+                                 conn: duckdb.DuckDBPyConnection,
+                                 reservations_source: str,
+                                 stay_dates_source: str) -> Dict[str, int]:
+        """
+        Append the not yet ingested rows of the sources to the history tables and apply the inserted rows to the
+        current reservation tables, reservation_nights and kpi_daily. Runs inside the transaction of the caller
+        """
+        inserted_sources = dict(reservation_imports="inserted_reservation_keys",
+                                reservation_stay_dates="inserted_stay_date_keys")
+        try:
+            reservation_hashes = [row[0] for row in conn.execute(f"SELECT DISTINCT reservation_hash "
+                                                                 f"FROM {reservations_source}").fetchall()]
+            for query in build_existing_hashes_queries(reservation_hashes=reservation_hashes):
+                conn.execute(query)
+
+            # region Append to the history tables, keys of the inserted rows are registered as relations
+            row_counts = {}
+            insert_queries = build_reservation_history_insert_queries(reservations_source=reservations_source,
+                                                                      stay_dates_source=stay_dates_source)
+            for table_name, query in insert_queries.items():
+                inserted_keys = conn.execute(query).df()
+                conn.register(inserted_sources[table_name], inserted_keys)
+                row_counts[table_name] = len(inserted_keys)
+            # endregion
+
+            batch_queries = build_inserted_batch_queries(
+                reservations_source=reservations_source,
+                stay_dates_source=stay_dates_source,
+                inserted_reservations_source=inserted_sources["reservation_imports"],
+                inserted_stay_dates_source=inserted_sources["reservation_stay_dates"])
+            for query in (batch_queries
+                          + build_current_reservations_queries()
+                          + build_reservation_nights_queries()
+                          + build_kpi_daily_queries()):
+                conn.execute(query)
+
+            return row_counts
+
+        finally:
+            for source_name in inserted_sources.values():
+                conn.unregister(source_name)
+            for query in build_reservation_batch_cleanup_queries():
+                conn.execute(query)
+
+    def ingest_reservations(self,
+                            reservations: pd.DataFrame,
+                            stay_dates: pd.DataFrame,
+                            is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        Register the DataFrames as relations, write them and maintain the derived tables
+        in a single transaction
+        """
+        try:
+
+            # region If there is no rows, return 0
+            if (reservations is None or len(reservations) == 0) and (stay_dates is None or len(stay_dates) == 0):
+                return dict(reservation_imports=0, reservation_stay_dates=0)
+            # endregion
+
+            # region Begin transaction and write the batch
+            reservations_source = "ingest_reservations_source"
+            stay_dates_source = "ingest_stay_dates_source"
+
+            conn = self._cursor()
+            conn.register(reservations_source, reservations)
+            conn.register(stay_dates_source, stay_dates)
+
+            try:
+
+                with self._transaction(conn=conn):
+                    row_counts = self._write_reservation_batch(conn=conn,
+                                                               reservations_source=reservations_source,
+                                                               stay_dates_source=stay_dates_source)
+
+            finally:
+                conn.unregister(reservations_source)
+                conn.unregister(stay_dates_source)
+            # endregion
+
+            return row_counts
+
+        except Exception as e:
+
+            Logger.error(message="Error ingesting reservations",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise
+
+    def ingest_inventory(self,
+                         inventory: pd.DataFrame,
+                         is_safe: Optional[bool] = True) -> int:
+        """
+        Previous inventory rows are kept as inactive, kpi_daily is rebuilt with the new room types and room counts
+        in the same transaction
+        """
+        return self.bulk_insert(table_name="inventory",
+                                data=inventory,
+                                pre_query="UPDATE inventory SET is_active=False",
+                                post_query=";\n".join(build_kpi_daily_rebuild_queries()),
+                                is_safe=is_safe)
+
+    def load_kpi(self,
+                 hotel_id: int,
+                 start_date: date,
+                 end_date: date,
+                 is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        view_kpi reads the pre-aggregated kpi_daily rows of the hotel
+        """
+        query = """
+        SELECT * 
+        FROM view_kpi 
+        WHERE NIGHT_OF_STAY BETWEEN ? AND ? 
+        AND HOTEL_ID = ?
+        """
+        return self.execute(query=query,
+                            parameters=[start_date, end_date, hotel_id],
+                            is_safe=is_safe)
+
+    @property
+    def supports_maintenance(self) -> bool:
+        return True
+
+    @property
+    def supports_native_ingestion(self) -> bool:
+        return True
+
+    def check_ingestion_mode(self, ingestion_mode: str, is_safe: Optional[bool] = True) -> bool:
+        """
+        Mode is recorded in ingestion_settings. It can only be changed while the database has no reservations
+        """
+        try:
+            conn = self._cursor()
+            recorded_mode = conn.execute("""
+            SELECT setting_value FROM ingestion_settings WHERE setting_name = 'ingestion_mode'
+            """).fetchone()
+            if recorded_mode is not None and recorded_mode[0] == ingestion_mode:
+                return True
+
+            if recorded_mode is not None:
+                reservation_count = conn.execute("""
+                SELECT (SELECT count(*) FROM reservation_imports) + (SELECT count(*) FROM archived_reservation_hashes)
+                """).fetchone()[0]
+                if reservation_count > 0:
+                    Logger.error(f"Database reservations were ingested in '{recorded_mode[0]}' mode, "
+                                 f"'{ingestion_mode}' mode is not allowed")
+                    return False
+
+            conn.execute("INSERT OR REPLACE INTO ingestion_settings VALUES ('ingestion_mode', ?)", [ingestion_mode])
+            return True
+
+        except Exception as e:
+            Logger.error(message="Error checking ingestion mode",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return False
+            else:
+                raise
+
+    def ingest_reservation_file(self,
+                                filepath: str,
+                                source_filename: str,
+                                is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        DuckDB-native reservation ingestion. The JSON array of reservations (chunk of a reservations file) is loaded
+        with read_json, stay dates are unnested, ingestion and logic level validations run as SQL and the result is
+        split into rejected_imports, reservation_imports and reservation_stay_dates in a single transaction.
+        Hashes are calculated with SQL sha256
+        """
+        try:
+            parameters = dict(source_filename=source_filename, ingested_at=datetime.now())
+
+            conn = self._cursor()
+
+            # region Validate and split reservations, write results in a single transaction
+            conn.execute("BEGIN")
+            try:
+
+                for query in build_reservation_ingestion_queries(filepath=filepath):
+                    conn.execute(query)
+
+                results = []
+                for query in build_reservation_insert_queries():
+                    query_parameters = {k: v for k, v in parameters.items() if f"${k}" in query}
+                    results.append(conn.execute(query, query_parameters).fetchone())
+                row_counts = dict(rejected_imports=results[0][0])
+
+                row_counts.update(self._write_reservation_batch(conn=conn,
+                                                                reservations_source="native_reservation_imports",
+                                                                stay_dates_source="native_reservation_stay_dates"))
+
+                conn.execute("COMMIT")
+
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            finally:
+                for query in build_reservation_cleanup_queries():
+                    conn.execute(query)
+            # endregion
+
+            return row_counts
+
+        except Exception as e:
+            Logger.error(message=f"Error ingesting reservations file '{filepath}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise
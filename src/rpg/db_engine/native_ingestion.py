@@ -0,0 +1,477 @@
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+from rpg.utils.validation_util import ValidationPlan, load_validation_plan
+
+# Characters removed by Python's str.strip()
+_WHITESPACE = ("\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+               "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000")
+
+
+def sql_string(value: Optional[str]) -> str:
+    """
+    SQL string literal
+    """
+    if value is None:
+        return "NULL"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def sql_fingerprint(expression: str) -> str:
+    """
+    64-bit row fingerprint (UBIGINT) of a SQL text expression, first 8 bytes of its SHA-256 hash
+    """
+    return f"CAST('0x' || LEFT(sha256({expression}), 16) AS UBIGINT)"
+
+
+def _sql_json(value: Any) -> str:
+    return f"{sql_string(json.dumps(value, ensure_ascii=False))}::JSON"
+
+
+def _sql_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column(field_name: str, suffix: str) -> str:
+    return _sql_identifier(f"{field_name}__{suffix}")
+
+
+def _error(message_sql: str, field_name: Optional[str], value_sql: str, metadata: Dict[str, Any]) -> str:
+    """
+    SQL expression of a ValidationError.to_dict() JSON object
+    """
+    return (f"json_object('message', {message_sql}, "
+            f"'field_name', {sql_string(field_name)}, "
+            f"'value', {value_sql}, "
+            f"'metadata', {_sql_json(metadata)})")
+
+
+def _has_surrounding_whitespace(text_sql: str) -> str:
+    """
+    SQL condition, the text starts or ends with a whitespace (checked first, trimming with _WHITESPACE is slow)
+    """
+    whitespace = sql_string(_WHITESPACE)
+    return f"(contains({whitespace}, left({text_sql}, 1)) OR contains({whitespace}, right({text_sql}, 1)))"
+
+
+def _strip(text_sql: str) -> str:
+    """
+    SQL expression of Python's str.strip()
+    """
+    return (f"CASE WHEN {_has_surrounding_whitespace(text_sql)} THEN trim({text_sql}, {sql_string(_WHITESPACE)}) "
+            f"ELSE {text_sql} END")
+
+
+def _python_str(sql_expression: str, sql_type: str) -> str:
+    """
+    SQL expression formatting a parsed value like Python's str()
+    """
+    if sql_type == "date":
+        return f"strftime({sql_expression}, '%Y-%m-%d')"
+    if sql_type == "datetime":
+        return (f"(strftime({sql_expression}, '%Y-%m-%d %H:%M:%S') || "
+                f"CASE WHEN microsecond({sql_expression}) % 1000000 <> 0 "
+                f"THEN strftime({sql_expression}, '.%f') ELSE '' END)")
+    return f"CAST({sql_expression} AS VARCHAR)"
+
+
+class NativeValidationQuery:
+    """
+    Translate a compiled validation plan into DuckDB SQL expressions over a JSON column
+    Messages, field names, values and metadata of the errors follow the Python validators
+    """
+
+    def __init__(self, plan: ValidationPlan, document: str):
+        self._plan = plan
+        self._document = document
+
+    def fields_column(self) -> str:
+        """
+        JSON values of all the fields, the document is parsed only once
+        """
+        paths = ", ".join(sql_string(f'$."{field_name}"') for field_name, _, _, _ in self._plan.rules)
+        return f"json_extract({self._document}, [{paths}]) AS {_column(self._document, 'fields')}"
+
+    def extract_columns(self) -> List[str]:
+        """
+        JSON type, text and JSON value of every field (requires fields_column)
+        Stripped text is only needed for the fields that are parsed from strings (int, number, boolean)
+        """
+        columns = []
+        for index, (field_name, field_type, _, _) in enumerate(self._plan.rules):
+            original = f"{_column(self._document, 'fields')}[{index + 1}]"
+            text = f"json_extract_string({original}, '$')"
+            columns.append(f"{original} AS {_column(field_name, 'json')}")
+            columns.append(f"json_type({original}) AS {_column(field_name, 'type')}")
+            columns.append(f"{text} AS {_column(field_name, 'text')}")
+            if field_type in ("int", "number", "boolean"):
+                columns.append(f"CASE WHEN json_type({original}) = 'VARCHAR' THEN {_strip(text)} "
+                               f"END AS {_column(field_name, 'stripped')}")
+        return columns
+
+    def value_columns(self) -> List[str]:
+        """
+        Parsed value of every field, NULL if the value cannot be parsed
+        """
+        columns = []
+        for field_name, field_type, options, _ in self._plan.rules:
+            value_type = _column(field_name, "type")
+            text = _column(field_name, "text")
+            stripped = _column(field_name, "stripped")
+            metadata = self._plan.metadata(field_name)
+
+            if field_type == "string":
+                value = f"CASE WHEN {value_type} = 'VARCHAR' THEN {text} END"
+            elif field_type == "int":
+                # HUGEINT casts also accept decimal and exponent forms, which int() does not
+                value = (f"CASE WHEN {value_type} IN ('BIGINT', 'UBIGINT') THEN TRY_CAST({text} AS HUGEINT) "
+                         f"WHEN {value_type} = 'DOUBLE' THEN TRY_CAST(trunc(CAST({text} AS DOUBLE)) AS HUGEINT) "
+                         f"WHEN {value_type} = 'VARCHAR' AND NOT (contains({stripped}, '.') "
+                         f"OR contains({stripped}, 'e') OR contains({stripped}, 'E')) "
+                         f"THEN TRY_CAST({stripped} AS HUGEINT) END")
+            elif field_type == "number":
+                # DOUBLE casts also accept a '+-' sign, which float() does not
+                value = (f"CASE WHEN {value_type} IN ('BIGINT', 'UBIGINT', 'DOUBLE') THEN CAST({text} AS DOUBLE) "
+                         f"WHEN {value_type} = 'VARCHAR' AND NOT starts_with({stripped}, '+-') "
+                         f"THEN TRY_CAST({stripped} AS DOUBLE) END")
+            elif field_type in ("date", "datetime"):
+                # strptime accepts surrounding whitespace and year 0, which Python's strptime does not
+                parsed = f"try_strptime({text}, {sql_string(metadata['pattern'])})"
+                value = (f"CASE WHEN {value_type} = 'VARCHAR' AND NOT {_has_surrounding_whitespace(text)} "
+                         f"AND year({parsed}) >= 1 THEN {parsed} END")
+                if field_type == "date":
+                    value = f"CAST({value} AS DATE)"
+            elif field_type == "boolean":
+                value = (f"CASE WHEN {value_type} = 'BOOLEAN' THEN CAST({text} AS BOOLEAN) "
+                         f"WHEN {value_type} = 'VARCHAR' AND lower({stripped}) IN ('true', 'false') "
+                         f"THEN CAST(lower({stripped}) AS BOOLEAN) END")
+            else:
+                raise ValueError(f"Unsupported field type '{field_type}' for field '{field_name}'")
+
+            columns.append(f"{value} AS {_column(field_name, 'value')}")
+        return columns
+
+    def value_names(self) -> List[str]:
+        """
+        Names of the parsed value columns
+        """
+        return [_column(field_name, "value") for field_name, _, _, _ in self._plan.rules]
+
+    def errors_column(self, alias: str) -> str:
+        """
+        List of the validation errors (JSON) of the fields, in the order of the plan
+        """
+        errors = []
+        for field_name, field_type, options, optional in self._plan.rules:
+            error = self._field_error(field_name=field_name, field_type=field_type)
+            if optional:
+                error = f"CASE WHEN {_column(field_name, 'type')} IS NOT NULL THEN {error} END"
+            errors.append(error)
+        return f"list_filter([{', '.join(errors)}], e -> e IS NOT NULL) AS {alias}"
+
+    def _field_error(self, field_name: str, field_type: str) -> str:
+        value_type = _column(field_name, "type")
+        text = _column(field_name, "text")
+        original = _column(field_name, "json")
+        stripped = _column(field_name, "stripped")
+        value = _column(field_name, "value")
+        metadata = self._plan.metadata(field_name)
+
+        def error(message: str, value_sql: str, is_message_sql: Optional[bool] = False) -> str:
+            return _error(message_sql=message if is_message_sql else sql_string(message),
+                          field_name=field_name,
+                          value_sql=value_sql,
+                          metadata=metadata)
+
+        cases: List[Tuple[str, str]] = [(f"{value_type} IS NULL", error(f"{field_name} is missing", "NULL"))]
+
+        if field_type == "string":
+            cases.append((f"{value_type} <> 'VARCHAR'", error(f"{field_name} must be a string", original)))
+            if not metadata["allow_empty_string"]:
+                cases.append((f"{_strip(text)} = ''",
+                              error(f"{field_name} must NOT be empty string", original)))
+            if metadata["allowed_values"] is not None:
+                allowed_values = ", ".join(sql_string(v) for v in metadata["allowed_values"])
+                cases.append((f"{text} NOT IN ({allowed_values})",
+                              error(f"{field_name} must be one of {', '.join(metadata['allowed_values'])}", original)))
+
+        elif field_type == "int":
+            cases.append((f"{value_type} = 'BOOLEAN'", error(f"{field_name} must be an integer", original)))
+            cases.append((f"{value} IS NULL",
+                          error(f"{field_name} must be an integer or integer-like string",
+                                f"CASE WHEN {value_type} = 'VARCHAR' THEN to_json({stripped}) ELSE {original} END")))
+            cases.extend(self._bound_cases(field_name=field_name, metadata=metadata, value_json=f"to_json({value})"))
+
+        elif field_type == "number":
+            field_value = f"CASE WHEN {value_type} = 'VARCHAR' THEN to_json({stripped}) ELSE {original} END"
+            cases.append((f"{value_type} = 'NULL'", error(f"{field_name} is NULL", original)))
+            cases.append((f"{value_type} = 'BOOLEAN' OR {value} IS NULL", error(f"{field_name} must be a number", field_value)))
+            cases.append((f"isinf({value}) OR isnan({value})", error(f"{field_name} must be finite number", field_value)))
+            if not metadata["allow_int"]:
+                cases.append((f"{value} = floor({value})", error(f"{field_name} must be non-integer number", field_value)))
+            cases.extend(self._bound_cases(field_name=field_name, metadata=metadata, value_json=f"to_json({value})"))
+
+        elif field_type in ("date", "datetime"):
+            cases.append((f"{value_type} <> 'VARCHAR'",
+                          error(f"{field_name} must be a date string or date (not datetime)" if field_type == "date"
+                                else f"{field_name} must be a datetime string or datetime", original)))
+            cases.append((f"{value} IS NULL",
+                          error(f"{field_name} must be valid {field_type} value", original)))
+            min_value = metadata.get("min_date", None)
+            max_value = metadata.get("max_date", metadata.get("maxn_date", None))
+            for operator, bound, label in [("<", min_value, ">="), (">", max_value, "<=")]:
+                if bound is None:
+                    continue
+                bound_sql = f"CAST({sql_string(bound)} AS {'DATE' if field_type == 'date' else 'TIMESTAMP'})"
+                message = (f"{sql_string(field_name + ' field value ')} || {_python_str(value, field_type)} || "
+                           f"{sql_string(' must be ' + label + ' ')} || {_python_str(bound_sql, field_type)}")
+                cases.append((f"{value} {operator} {bound_sql}", error(message, original, is_message_sql=True)))
+
+        elif field_type == "boolean":
+            cases.append((f"{value_type} = 'VARCHAR' AND {value} IS NULL",
+                          error(f"{field_name} must be a boolean or boolean-like", "NULL")))
+            cases.append((f"{value} IS NULL", error(f"{field_name} must be a boolean", "NULL")))
+
+        return "CASE " + " ".join(f"WHEN {condition} THEN {result}" for condition, result in cases) + " END"
+
+    def _bound_cases(self, field_name: str, metadata: Dict[str, Any], value_json: str) -> List[Tuple[str, str]]:
+        value = _column(field_name, "value")
+        cases = []
+        for operator, bound, label in [("<", metadata.get("min_value"), ">="), (">", metadata.get("max_value"), "<=")]:
+            if bound is None:
+                continue
+            message = (f"{sql_string(field_name + ' field value ')} || {_python_str(value, 'number')} || "
+                       f"{sql_string(f' must be {label} {bound}')}")
+            cases.append((f"{value} {operator} {bound}",
+                          _error(message_sql=message, field_name=field_name, value_sql=value_json, metadata=metadata)))
+        return cases
+
+
+def build_reservation_ingestion_queries(filepath: str) -> List[str]:
+    """
+    Generate the queries that load a JSON array of reservations (chunk of a reservations file) into temporary
+    tables and validate it. Results are `native_reservations` (one row per reservation with its errors, valid
+    and invalid stay dates) and `native_stay_dates` (valid stay dates of valid reservations)
+    """
+    reservation_query = NativeValidationQuery(plan=load_validation_plan(schema_name="reservations", entity="reservation"),
+                                              document="res")
+    stay_date_query = NativeValidationQuery(plan=load_validation_plan(schema_name="reservations", entity="stay_date"),
+                                            document="stay_date")
+    empty_metadata = _sql_json({})
+
+    # region Load reservations
+    load_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_source AS
+    SELECT json AS res, ordinality AS res_index
+    FROM read_json({sql_string(filepath)}, format='array', records=false, columns={{'json': 'JSON'}}) WITH ORDINALITY
+    """
+    # endregion
+
+    # region Reservation INGESTION and LOGIC level validations
+    reservation_checks_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_reservation_checks AS
+    WITH fields AS (
+        SELECT res_index, res,
+               json_type(res, '$.stay_dates') = 'ARRAY' AND json_array_length(res, '$.stay_dates') > 0 AS has_stay_dates,
+               {reservation_query.fields_column()}
+        FROM native_source
+    ), extracted AS (
+        SELECT *, {", ".join(reservation_query.extract_columns())}
+        FROM fields
+    ), parsed AS (
+        SELECT *, {", ".join(reservation_query.value_columns())}
+        FROM extracted
+    ), checked AS (
+        SELECT *, {reservation_query.errors_column(alias="ingestion_errors")}
+        FROM parsed
+    )
+    SELECT res_index, res, has_stay_dates, {", ".join(reservation_query.value_names())}, ingestion_errors,
+           CASE WHEN len(ingestion_errors) = 0 THEN list_filter([
+               CASE WHEN NOT ("arrival_date__value" < "departure_date__value") THEN json_object(
+                   'message', 'arrival_date ''' || {_python_str('"arrival_date__value"', 'date')} || ''' should be less than departure_date ''' || {_python_str('"departure_date__value"', 'date')} || '''',
+                   'field_name', 'arrival_date',
+                   'value', to_json({_python_str('"arrival_date__value"', 'date')}),
+                   'metadata', {empty_metadata}) END,
+               CASE WHEN NOT ("updated_at__value" >= "created_at__value") THEN json_object(
+                   'message', 'updated_at ''' || {_python_str('"updated_at__value"', 'datetime')} || ''' should be greater than or equal to created_at ''' || {_python_str('"created_at__value"', 'datetime')} || '''',
+                   'field_name', 'updated_at',
+                   'value', to_json({_python_str('"updated_at__value"', 'datetime')}),
+                   'metadata', {empty_metadata}) END
+           ], e -> e IS NOT NULL) ELSE [] END AS logic_errors
+    FROM checked
+    """
+    # endregion
+
+    # region Stay dates INGESTION and LOGIC level validations
+    stay_date_checks_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_stay_date_checks AS
+    WITH flattened AS (
+        SELECT res_index,
+               "arrival_date__value" AS reservation_arrival_date,
+               "departure_date__value" AS reservation_departure_date,
+               unnest(json_extract(res, '$.stay_dates[*]')) AS stay_date,
+               generate_subscripts(json_extract(res, '$.stay_dates[*]'), 1) AS stay_index
+        FROM native_reservation_checks
+        WHERE has_stay_dates
+    ), fields AS (
+        SELECT *, {stay_date_query.fields_column()}
+        FROM flattened
+    ), extracted AS (
+        SELECT *, {", ".join(stay_date_query.extract_columns())}
+        FROM fields
+    ), parsed AS (
+        SELECT *, {", ".join(stay_date_query.value_columns())}
+        FROM extracted
+    ), checked AS (
+        SELECT *, {stay_date_query.errors_column(alias="ingestion_errors")}
+        FROM parsed
+    )
+    SELECT res_index, stay_index, stay_date, {", ".join(stay_date_query.value_names())}, ingestion_errors,
+           CASE WHEN len(ingestion_errors) = 0 THEN list_filter([
+               CASE WHEN NOT ("start_date__value" <= "end_date__value") THEN json_object(
+                   'message', 'start_date ''' || {_python_str('"start_date__value"', 'date')} || ''' should be less than or equal to end_date ''' || {_python_str('"end_date__value"', 'date')} || '''',
+                   'field_name', 'start_date',
+                   'value', stay_date,
+                   'metadata', {empty_metadata}) END,
+               CASE WHEN reservation_arrival_date IS NULL OR reservation_departure_date IS NULL THEN json_object(
+                   'message', 'All dates must be fall within reservation period.Invalid arrival_date and/or departure_date',
+                   'field_name', NULL,
+                   'value', NULL,
+                   'metadata', {empty_metadata})
+               WHEN NOT ("start_date__value" >= reservation_arrival_date AND "end_date__value" <= reservation_departure_date) THEN json_object(
+                   'message', 'All dates must be fall within reservation period.''' || {_python_str('"start_date__value"', 'date')} || ''' and ''' || {_python_str('"end_date__value"', 'date')} || ''' not fall into ''' || {_python_str('reservation_arrival_date', 'date')} || ''' and ''' || {_python_str('reservation_departure_date', 'date')} || '''',
+                   'field_name', NULL,
+                   'value', NULL,
+                   'metadata', {empty_metadata}) END
+           ], e -> e IS NOT NULL) ELSE [] END AS logic_errors
+    FROM checked
+    """
+    # endregion
+
+    # region Split reservations into valid and invalid rows
+    split_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_reservations AS
+    WITH stay_date_summary AS (
+        SELECT res_index,
+               list(stay_date ORDER BY stay_index)
+                   FILTER (WHERE len(ingestion_errors) + len(logic_errors) = 0) AS valid_stay_dates,
+               list(json_object('stay_date', stay_date,
+                                'validation_errors', to_json(ingestion_errors || logic_errors)) ORDER BY stay_index)
+                   FILTER (WHERE len(ingestion_errors) + len(logic_errors) > 0) AS invalid_stay_dates
+        FROM native_stay_date_checks
+        GROUP BY res_index
+    )
+    SELECT r.*,
+           coalesce(s.valid_stay_dates, []) AS valid_stay_dates,
+           coalesce(s.invalid_stay_dates, []) AS invalid_stay_dates,
+           r.ingestion_errors || r.logic_errors || CASE WHEN r.has_stay_dates THEN [] ELSE [json_object(
+               'message', 'stay_dates missing or invalid',
+               'field_name', NULL,
+               'value', NULL,
+               'metadata', {empty_metadata})] END AS reservation_errors
+    FROM native_reservation_checks AS r
+    LEFT JOIN stay_date_summary AS s ON s.res_index = r.res_index
+    """
+
+    valid_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_valid_reservations AS
+    SELECT *,
+           {sql_fingerprint("CAST(json_merge_patch(res, json_object('stay_dates', to_json(valid_stay_dates))) AS VARCHAR)")} AS reservation_hash
+    FROM native_reservations
+    WHERE len(reservation_errors) = 0
+    """
+
+    stay_dates_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_stay_dates AS
+    SELECT r.reservation_hash, r."hotel_id__value" AS hotel_id, r."reservation_id__value" AS reservation_id,
+           r."created_at__value" AS created_at, r."updated_at__value" AS updated_at, s.*
+    FROM native_valid_reservations AS r
+    JOIN native_stay_date_checks AS s ON s.res_index = r.res_index
+    WHERE len(s.ingestion_errors) + len(s.logic_errors) = 0
+    """
+    # endregion
+
+    return [load_query, reservation_checks_query, stay_date_checks_query, split_query, valid_query, stay_dates_query]
+
+
+def build_reservation_insert_queries() -> List[str]:
+    """
+    Generate the queries that write the rejected reservations into rejected_imports and shape the valid
+    reservations and stay dates as `native_reservation_imports` and `native_reservation_stay_dates`
+    (columns of reservation_imports and reservation_stay_dates). Parameters: source_filename and ingested_at
+    Valid rows are written like the batches of the python mode (DuckDBEngine._write_reservation_batch)
+    """
+    rejected_query = """
+    INSERT INTO rejected_imports (rejected_row, validation_errors, source_filename, ingested_at)
+    SELECT rejected_row, validation_errors, $source_filename, $ingested_at
+    FROM (
+        SELECT res_index,
+               json_merge_patch(res, json_object('stay_dates', to_json(
+                   invalid_stay_dates || list_transform(valid_stay_dates, s -> json_object('row', s, 'validation_errors', NULL))
+               ))) AS rejected_row,
+               to_json(reservation_errors) AS validation_errors
+        FROM native_reservations
+        WHERE len(reservation_errors) > 0
+        UNION ALL
+        SELECT res_index,
+               json_merge_patch(res, json_object('stay_dates', to_json(invalid_stay_dates))) AS rejected_row,
+               CAST('[]' AS JSON) AS validation_errors
+        FROM native_reservations
+        WHERE len(reservation_errors) = 0 AND len(invalid_stay_dates) > 0
+    )
+    ORDER BY res_index
+    """
+
+    imports_query = """
+    CREATE OR REPLACE TEMP TABLE native_reservation_imports AS
+    SELECT CAST(stg."hotel_id__value" AS INTEGER) AS hotel_id,
+           stg."reservation_id__value" AS reservation_id,
+           stg."status__value" AS status,
+           stg."arrival_date__value" AS arrival_date,
+           stg."departure_date__value" AS departure_date,
+           json_extract_string(stg.res, '$.source_name') AS source_name,
+           json_extract_string(stg.res, '$.source_id') AS source_id,
+           stg."created_at__value" AS created_at,
+           stg."updated_at__value" AS updated_at,
+           $source_filename AS source_filename,
+           $ingested_at AS ingested_at,
+           stg.reservation_hash
+    FROM native_valid_reservations AS stg
+    ORDER BY stg.res_index
+    """
+
+    stay_dates_query = f"""
+    CREATE OR REPLACE TEMP TABLE native_reservation_stay_dates AS
+    SELECT CAST(stg.hotel_id AS INTEGER) AS hotel_id,
+           stg.reservation_id,
+           stg."start_date__value" AS start_date,
+           stg."end_date__value" AS end_date,
+           stg."room_type_id__value" AS room_type_id,
+           stg."room_type_name__value" AS room_type_name,
+           CAST(stg."number_of_adults__value" AS INTEGER) AS number_of_adults,
+           CAST(stg."number_of_children__value" AS INTEGER) AS number_of_children,
+           stg."room_revenue_gross_amount__value" AS revenue_gross_amount,
+           stg."room_revenue_net_amount__value" AS revenue_net_amount,
+           stg."fnb_gross_amount__value" AS fnb_gross_amount,
+           stg."fnb_net_amount__value" AS fnb_net_amount,
+           stg.created_at,
+           stg.updated_at,
+           $ingested_at AS ingested_at,
+           stg.reservation_hash,
+           {sql_fingerprint("CAST(stg.stay_date AS VARCHAR)")} AS stay_date_hash
+    FROM native_stay_dates AS stg
+    ORDER BY stg.res_index, stg.stay_index
+    """
+
+    return [rejected_query, imports_query, stay_dates_query]
+
+
+def build_reservation_cleanup_queries() -> List[str]:
+    """
+    Generate the queries that drop the temporary tables of the ingestion queries
+    Temporary tables live as long as the connection, which is kept open by the engine
+    """
+    temporary_tables = ["native_source", "native_reservation_checks", "native_stay_date_checks",
+                        "native_reservations", "native_valid_reservations", "native_stay_dates",
+                        "native_reservation_imports", "native_reservation_stay_dates"]
+    return [f"DROP TABLE IF EXISTS {table_name}" for table_name in temporary_tables]
@@ -0,0 +1,451 @@
+import shutil
+from pathlib import Path
+from datetime import date
+from typing import List, Dict, Any, Optional
+import duckdb
+import pandas as pd
+from rpg.db_engine.duckdb_engine import DuckDBEngine
+from rpg.db_engine.native_ingestion import sql_string
+from rpg.db_engine.derived_tables import (
+    BATCH_RESERVATIONS_TABLE,
+    BATCH_STAY_DATES_TABLE,
+    build_reservation_batch_queries,
+    build_reservation_batch_cleanup_queries
+)
+from rpg.utils.io_util import read_text_file, list_files
+from rpg.utils.logger import Logger
+
+# Partition columns of the stored tables. month (YYYY-MM) is derived from a date column of the row
+_PARTITION_COLUMNS = dict(inventory=["hotel_id", "month"],
+                          reservation_imports=["hotel_id", "month"],
+                          reservation_stay_dates=["hotel_id", "month"],
+                          rejected_imports=["month"])
+
+# Rows to write per table, {source} is a relation with the columns of the table.
+# A stay date is written into every month it covers, so the nights of a month are read from one partition
+_PARTITION_QUERIES = dict(
+    inventory="SELECT *, strftime(ingested_at, '%Y-%m') AS month FROM {source}",
+    reservation_imports="SELECT *, strftime(arrival_date, '%Y-%m') AS month FROM {source}",
+    reservation_stay_dates="""
+    SELECT s.*, strftime(m.month_start, '%Y-%m') AS month
+    FROM {source} AS s
+    CROSS JOIN GENERATE_SERIES(date_trunc('month', s.start_date), date_trunc('month', s.end_date), INTERVAL 1 MONTH)
+    AS m(month_start)
+    """,
+    rejected_imports="SELECT *, strftime(ingested_at, '%Y-%m') AS month FROM {source}"
+)
+
+# Columns stored in the files in addition to the table columns
+_DERIVED_COLUMNS = dict(reservation_imports=dict(is_overlapped="BOOLEAN"))
+
+# Column expressions of the table views that are not read as stored
+_VIEW_COLUMNS = dict(inventory=dict(is_active="ingested_at = MAX(ingested_at) OVER()"))
+
+# Filters of the table views. Stay dates are read from the partition of their start month
+_VIEW_FILTERS = dict(reservation_stay_dates="month = strftime(start_date, '%Y-%m')")
+
+# Row fingerprint columns (UBIGINT). Files written before the fingerprints store SHA-256 hex strings, their
+# fingerprint is the first 8 bytes of the hash (files are never rewritten)
+_FINGERPRINT_COLUMNS = dict(reservation_imports=["reservation_hash"],
+                            reservation_stay_dates=["reservation_hash", "stay_date_hash"])
+
+# Tables that can be appended with bulk_insert/insert_rows. Reservations are written with ingest_reservations
+_APPEND_TABLES = ["inventory", "rejected_imports"]
+
+
+class ParquetEngine(DuckDBEngine):
+    """
+    Stores inventory, reservation_imports, reservation_stay_dates and rejected_imports as Hive-partitioned Parquet
+    files (by hotel_id and month) and queries them through an in-memory DuckDB database
+    Each write appends new files to the partitions, already written files are never rewritten
+    """
+
+    ENGINE_NAME = "ParquetEngine"
+    STAGING_SCHEMA = "staging"
+
+    def __init__(self, database_configuration: Dict[Any, Any], read_only: Optional[bool] = False):
+        self._data_path = None
+        super().__init__(database_configuration, read_only=read_only)
+
+    @property
+    def data_path(self) -> Path:
+        return self._data_path
+
+    def _init(self):
+        # region Check configuration and set data path
+        self._data_path = Path(self.database_configuration["data_path"])
+        self._db_path = ":memory:"
+        # endregion
+
+    def _table_path(self, table_name: str) -> Path:
+        return self.data_path / table_name
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        """
+        Open the in-memory database, create the empty staging tables (schema and defaults of the stored tables)
+        and the views over the Parquet files
+        """
+        conn = duckdb.connect(database=":memory:")
+
+        # region Run DDL queries of the stored tables in staging schema
+        conn.execute(f"CREATE SCHEMA {self.STAGING_SCHEMA}")
+        conn.execute(f"USE memory.{self.STAGING_SCHEMA}")
+        sql_source_path = Path(__file__).parents[1] / "sql"
+        for sql_path in list_files(filepath=str(sql_source_path)):
+            if any(Path(sql_path).name.endswith(f"__ddl__{table_name}.sql") for table_name in _PARTITION_COLUMNS):
+                conn.execute(read_text_file(filepath=str(sql_path)))
+        conn.execute("USE memory.main")
+        # endregion
+
+        for table_name in _PARTITION_COLUMNS:
+            self._create_views(conn=conn, table_name=table_name)
+        return conn
+
+    def _create_views(self, conn: duckdb.DuckDBPyConnection, table_name: str):
+        """
+        Create parquet_<table> view (stored columns with partition columns) and <table> view (columns of the table)
+        Without files, views read the empty staging table
+        """
+        columns = conn.execute(f"DESCRIBE {self.STAGING_SCHEMA}.{table_name}").fetchall()
+        column_types = {column[0]: column[1] for column in columns}
+        derived_columns = _DERIVED_COLUMNS.get(table_name, {})
+
+        table_path = self._table_path(table_name)
+        if table_path.exists() and any(table_path.rglob("*.parquet")):
+            hive_types = ", ".join(f"{sql_string(column)}: {column_types.get(column, 'VARCHAR')}"
+                                   for column in _PARTITION_COLUMNS[table_name])
+            source = f"""
+            read_parquet({sql_string(str(table_path / "**" / "*.parquet"))},
+                         hive_partitioning=true,
+                         hive_types={{{hive_types}}},
+                         union_by_name=true)
+            """
+        else:
+            null_columns = {column: "VARCHAR" for column in _PARTITION_COLUMNS[table_name]}
+            null_columns.update(derived_columns)
+            source = f"""
+            (SELECT *, {", ".join(f"NULL::{data_type} AS {column}" for column, data_type in null_columns.items())}
+             FROM {self.STAGING_SCHEMA}.{table_name})
+            """
+        fingerprints = ", ".join(f"""
+        IF(LENGTH(CAST({column} AS VARCHAR)) = 64,
+           CAST('0x' || LEFT(CAST({column} AS VARCHAR), 16) AS UBIGINT),
+           CAST({column} AS UBIGINT)) AS {column}
+        """ for column in _FINGERPRINT_COLUMNS.get(table_name, []))
+        conn.execute(f"""
+        CREATE OR REPLACE VIEW parquet_{table_name} AS
+        SELECT * {f"REPLACE ({fingerprints})" if fingerprints else ""}
+        FROM {source}
+        """)
+
+        view_columns = ", ".join(f"{_VIEW_COLUMNS.get(table_name, {}).get(column, column)} AS {column}"
+                                 for column in column_types)
+        view_filter = _VIEW_FILTERS.get(table_name)
+        conn.execute(f"""
+        CREATE OR REPLACE VIEW {table_name} AS
+        SELECT {view_columns}
+        FROM parquet_{table_name}
+        {f"WHERE {view_filter}" if view_filter else ""}
+        """)
+
+    def _write_partitions(self, conn: duckdb.DuckDBPyConnection, table_name: str, source: str) -> int:
+        """
+        Append the rows of the source relation to the partitions of the table as new files
+        """
+        partition_query = _PARTITION_QUERIES[table_name].format(source=source)
+        table_path = self._table_path(table_name)
+        table_path.mkdir(parents=True, exist_ok=True)
+
+        conn.execute(f"""
+        COPY ({partition_query}) TO {sql_string(str(table_path))}
+        (FORMAT PARQUET, PARTITION_BY ({", ".join(_PARTITION_COLUMNS[table_name])}), APPEND)
+        """)
+        return conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"'{self.engine_name}' is opened in read only mode!")
+
+    def initialize_database(self):
+        Logger.info(f"Initializing Parquet dataset '{self.data_path}'...")
+        for table_name in _PARTITION_COLUMNS:
+            self._table_path(table_name).mkdir(parents=True, exist_ok=True)
+        self._cursor()
+        Logger.success("Done!")
+        return True
+
+    def insert_rows(self,
+                    table_name: str,
+                    rows: List[Dict[Any, Any]],
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True) -> int:
+        return self.bulk_insert(table_name=table_name,
+                                data=pd.DataFrame(rows),
+                                pre_query=pre_query,
+                                post_query=post_query,
+                                overwrite=overwrite,
+                                is_safe=is_safe)
+
+    def bulk_insert(self,
+                    table_name: str,
+                    data: pd.DataFrame,
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True) -> int:
+        """
+        Load the DataFrame into the staging table (table defaults) and append it to the partitions of the table
+        Files cannot be updated, so pre_query and post_query are not supported
+        """
+        try:
+
+            # region Check table and arguments
+            self._check_writable()
+            if table_name not in _APPEND_TABLES:
+                raise ValueError(f"'{table_name}' can not be appended with bulk_insert, "
+                                 f"allowed tables: {', '.join(_APPEND_TABLES)}")
+            if pre_query or post_query:
+                raise ValueError(f"'{self.engine_name}' does not support pre_query and post_query!")
+            # endregion
+
+            # region If there is no rows, return 0
+            if data is None or len(data) == 0:
+                return 0
+            # endregion
+
+            # region Load staging table and write partitions
+            source_name = "bulk_insert_source"
+            staging_table = f"{self.STAGING_SCHEMA}.{table_name}"
+            sql_columns = ", ".join(f'"{column}"' for column in data.columns)
+
+            conn = self._cursor()
+            conn.register(source_name, data)
+            conn.execute("BEGIN")
+
+            try:
+
+                conn.execute(f"""
+                INSERT INTO {staging_table} ({sql_columns})
+                SELECT {sql_columns} FROM {source_name}
+                """)
+
+                if overwrite:
+                    shutil.rmtree(self._table_path(table_name), ignore_errors=True)
+
+                row_count = self._write_partitions(conn=conn, table_name=table_name, source=staging_table)
+                conn.execute(f"DELETE FROM {staging_table}")
+                conn.execute("COMMIT")
+
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                raise
+
+            finally:
+                conn.unregister(source_name)
+            # endregion
+
+            self._create_views(conn=conn, table_name=table_name)
+            return row_count
+
+        except Exception as e:
+
+            Logger.error(message=f"Error inserting rows into '{table_name}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return 0
+            else:
+                raise
+
+    def ingest_inventory(self,
+                         inventory: pd.DataFrame,
+                         is_safe: Optional[bool] = True) -> int:
+        """
+        Rows of the latest inventory ingestion are the active inventory (is_active of the inventory view)
+        """
+        return self.bulk_insert(table_name="inventory",
+                                data=inventory,
+                                is_safe=is_safe)
+
+    def ingest_reservations(self,
+                            reservations: pd.DataFrame,
+                            stay_dates: pd.DataFrame,
+                            is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        Append the not yet ingested rows of the batch to the partitions. Reservation rows store whether
+        their stay dates overlap (is_overlapped), so the KPI of a month does not read the other months
+        """
+        try:
+
+            # region If there is no rows, return 0
+            self._check_writable()
+            if (reservations is None or len(reservations) == 0) and (stay_dates is None or len(stay_dates) == 0):
+                return dict(reservation_imports=0, reservation_stay_dates=0)
+            # endregion
+
+            # region Load batch tables and write partitions
+            reservations_source = "ingest_reservations_source"
+            stay_dates_source = "ingest_stay_dates_source"
+
+            conn = self._cursor()
+            conn.register(reservations_source, reservations)
+            conn.register(stay_dates_source, stay_dates)
+
+            try:
+
+                # Files are never rewritten, versions are not archived
+                reservation_hashes = reservations["reservation_hash"].unique()
+                for query in build_reservation_batch_queries(reservations_source=reservations_source,
+                                                             stay_dates_source=stay_dates_source,
+                                                             reservation_hashes=reservation_hashes,
+                                                             archived_hashes_table=None):
+                    conn.execute(query)
+
+                reservations_query = f"""
+                (SELECT r.*, COALESCE(o.is_overlapped, FALSE) AS is_overlapped
+                 FROM {BATCH_RESERVATIONS_TABLE} AS r
+                 LEFT JOIN (
+                    SELECT reservation_hash, MAX(night_count) > 1 AS is_overlapped
+                    FROM (
+                        SELECT d.reservation_hash, COUNT(1) AS night_count
+                        FROM {BATCH_STAY_DATES_TABLE} AS d
+                        CROSS JOIN GENERATE_SERIES(d.start_date, d.end_date, INTERVAL 1 DAY) AS ds(stay_night)
+                        GROUP BY d.reservation_hash, ds.stay_night
+                    )
+                    GROUP BY reservation_hash
+                 ) AS o
+                 ON o.reservation_hash = r.reservation_hash)
+                """
+
+                # Stay dates are written first. If writing the reservations fails, the batch can be ingested again
+                row_counts = dict(reservation_stay_dates=self._write_partitions(conn=conn,
+                                                                                table_name="reservation_stay_dates",
+                                                                                source=BATCH_STAY_DATES_TABLE))
+                self._create_views(conn=conn, table_name="reservation_stay_dates")
+                row_counts["reservation_imports"] = self._write_partitions(conn=conn,
+                                                                           table_name="reservation_imports",
+                                                                           source=reservations_query)
+                self._create_views(conn=conn, table_name="reservation_imports")
+
+            finally:
+                conn.unregister(reservations_source)
+                conn.unregister(stay_dates_source)
+                for query in build_reservation_batch_cleanup_queries():
+                    conn.execute(query)
+            # endregion
+
+            return row_counts
+
+        except Exception as e:
+
+            Logger.error(message="Error ingesting reservations",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise
+
+    def publish_snapshot(self, is_safe: Optional[bool] = True) -> bool:
+        """
+        Files are never rewritten and readers do not lock them, so read snapshots are not needed
+        """
+        return False
+
+    @property
+    def supports_maintenance(self) -> bool:
+        return False
+
+    @property
+    def supports_native_ingestion(self) -> bool:
+        return False
+
+    def ingest_reservation_file(self,
+                                filepath: str,
+                                source_filename: str,
+                                is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        raise NotImplementedError(f"'{self.engine_name}' does not support native ingestion!")
+
+    def check_ingestion_mode(self, ingestion_mode: str, is_safe: Optional[bool] = True) -> bool:
+        # Only python mode is supported, native mode is rejected by supports_native_ingestion
+        return True
+
+    def maintain(self,
+                 archive_path: str,
+                 retention_days: Optional[int] = 30,
+                 compact: Optional[bool] = False,
+                 cluster: Optional[bool] = False,
+                 is_safe: Optional[bool] = True) -> Optional[Dict[str, Any]]:
+        # Reservation versions are read from the partitions to find the latest version, files are never rewritten
+        raise NotImplementedError(f"'{self.engine_name}' does not support maintenance!")
+
+    def load_kpi(self,
+                 hotel_id: int,
+                 start_date: date,
+                 end_date: date,
+                 is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        Calculate the KPI from the stay dates of the hotel and months of the period. Latest reservation versions are
+        read from all months of the hotel, active inventory is the latest inventory ingestion
+        """
+        query = """
+        WITH cte_reservations AS (
+            SELECT reservation_id, reservation_hash, status, is_overlapped
+            FROM parquet_reservation_imports
+            WHERE hotel_id = ?
+            QUALIFY ROW_NUMBER() OVER(PARTITION BY reservation_id ORDER BY updated_at DESC, ingested_at DESC) = 1
+        ),
+        cte_inventory AS (
+            SELECT room_type_id, quantity
+            FROM parquet_inventory
+            WHERE hotel_id = ?
+            AND ingested_at = (SELECT MAX(ingested_at) FROM parquet_inventory)
+        ),
+        cte_nights AS (
+            SELECT
+                r.reservation_id,
+                CAST(ds.stay_night AS DATE) AS night_of_stay,
+                d.revenue_net_amount
+            FROM parquet_reservation_stay_dates AS d
+            INNER JOIN cte_reservations AS r
+            ON r.reservation_hash = d.reservation_hash
+            CROSS JOIN GENERATE_SERIES(GREATEST(d.start_date, CAST(d.month || '-01' AS DATE)),
+                                       LEAST(d.end_date, LAST_DAY(CAST(d.month || '-01' AS DATE))),
+                                       INTERVAL 1 DAY) AS ds(stay_night)
+            WHERE d.hotel_id = ?
+            AND d.month BETWEEN ? AND ?
+            AND NOT r.is_overlapped
+            AND LOWER(r.status) <> 'cancelled'
+            AND d.room_type_id IN (SELECT room_type_id FROM cte_inventory)
+        ),
+        cte_kpi_daily AS (
+            SELECT
+                night_of_stay,
+                COUNT(DISTINCT reservation_id) AS occupied_rooms,
+                SUM(revenue_net_amount) AS total_net_revenue,
+                (SELECT CAST(SUM(quantity) AS BIGINT) FROM cte_inventory) AS room_count
+            FROM cte_nights
+            WHERE night_of_stay BETWEEN ? AND ?
+            GROUP BY night_of_stay
+        )
+        SELECT
+            CAST(? AS INTEGER) AS HOTEL_ID,
+            night_of_stay AS NIGHT_OF_STAY,
+            ROUND(occupied_rooms / room_count * 100, 2) AS OCCUPANCY_PERCENTAGE,
+            CAST(total_net_revenue AS DECIMAL(38, 2)) AS TOTAL_NET_REVENUE,
+            ROUND(CAST(total_net_revenue AS DECIMAL(38, 2)) / occupied_rooms) AS ADR
+        FROM cte_kpi_daily
+        ORDER BY night_of_stay DESC
+        """
+        return self.execute(query=query,
+                            parameters=[hotel_id,
+                                        str(hotel_id),
+                                        hotel_id,
+                                        start_date.strftime("%Y-%m"),
+                                        end_date.strftime("%Y-%m"),
+                                        start_date,
+                                        end_date,
+                                        hotel_id],
+                            is_safe=is_safe)
@@ -0,0 +1,162 @@
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence
+
+import duckdb
+
+from rpg.utils.logger import Logger
+
+# Operators writing the rows of DML statements, their input cardinality is recorded as row count
+_WRITE_OPERATORS = {"INSERT", "MERGE_INTO", "UPDATE", "DELETE_OPERATOR", "CREATE_TABLE_AS", "COPY_TO_FILE"}
+
+
+class QueryProfiler:
+    """
+    Append one JSON line per statement (run, stage, wall time, rows, DuckDB plan of slow statements) to profile_path
+    """
+
+    def __init__(self,
+                 profile_path: str,
+                 slow_query_ms: Optional[int] = 1000,
+                 include_plans: Optional[bool] = False):
+        self._profile_path = Path(profile_path)
+        self._profile_path.parent.mkdir(parents=True, exist_ok=True)
+        self._slow_query_ms = slow_query_ms
+        self._include_plans = include_plans
+        self._lock = threading.Lock()
+
+    @property
+    def profile_path(self) -> Path:
+        return self._profile_path
+
+    def record(self,
+               query: str,
+               tags: Dict[str, Optional[str]],
+               started_at: datetime,
+               wall_time: float,
+               profile: Optional[Dict[Any, Any]] = None,
+               row_count: Optional[int] = None):
+        """
+        Write the profile entry of a statement. Plan (DuckDB EXPLAIN ANALYZE JSON) is written for slow statements,
+        or for every statement if include_plans
+        """
+        wall_time_ms = round(wall_time * 1000, 3)
+        is_slow = self._slow_query_ms is not None and wall_time_ms >= self._slow_query_ms
+        # Root operator of the plan, prepared statements are wrapped by an EXECUTE operator and CTEs by a CTE operator
+        # (main query is the last child)
+        operator = ((profile or {}).get("children") or [{}])[0]
+        while operator.get("operator_type") in ("EXECUTE", "CTE") and operator.get("children"):
+            operator = operator["children"][-1]
+        operator_type = operator.get("operator_type")
+
+        if row_count is None and profile is not None:
+            if operator_type in _WRITE_OPERATORS:
+                row_count = sum(child.get("operator_cardinality", 0) for child in operator.get("children", []))
+            else:
+                row_count = operator.get("operator_cardinality", profile.get("rows_returned"))
+
+        entry = dict(run_id=tags.get("run_id"),
+                     stage=tags.get("stage"),
+                     started_at=started_at.isoformat(),
+                     query=query.strip(),
+                     operator=operator_type,
+                     wall_time_ms=wall_time_ms,
+                     latency_ms=round(profile["latency"] * 1000, 3) if profile and profile.get("latency") else None,
+                     row_count=row_count,
+                     is_slow=is_slow)
+        if profile is not None and (is_slow or self._include_plans):
+            entry["plan"] = profile
+
+        with self._lock:
+            with open(self._profile_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, default=str) + "\n")
+
+        if is_slow:
+            Logger.warning(f"Slow query ({wall_time_ms:.0f} ms, stage '{tags.get('stage')}'), "
+                           f"plan written to '{self._profile_path}'")
+
+
+class ProfilingCursor:
+    """
+    DuckDB cursor recording every statement with the query profiler. Profile of a SELECT is complete after its
+    result is fetched, it is recorded on fetch (or on the next statement if the result is not fetched)
+    """
+
+    def __init__(self, cursor: duckdb.DuckDBPyConnection, profiler: QueryProfiler, tags: Dict[str, Optional[str]]):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._tags = tags
+        self._pending = None
+        self._cursor.execute("SET enable_profiling='no_output'")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def _profile(self) -> Optional[Dict[Any, Any]]:
+        # Statements without a query profile (e.g. BEGIN, COMMIT) return an error result
+        profile = json.loads(self._cursor.get_profiling_information(format="json"))
+        return profile if "latency" in profile else None
+
+    def _finish(self, profile: Optional[Dict[Any, Any]] = None):
+        if self._pending is None:
+            return
+        pending, self._pending = self._pending, None
+        self._profiler.record(query=pending["query"],
+                              tags=pending["tags"],
+                              started_at=pending["started_at"],
+                              wall_time=pending["wall_time"],
+                              profile=profile or self._profile())
+
+    def execute(self, query: str, parameters: Optional[Any] = None) -> "ProfilingCursor":
+        self._finish()
+        started_at = datetime.now()
+        timer = time.perf_counter()
+        self._cursor.execute(query, parameters)
+        self._pending = dict(query=query,
+                             tags=dict(self._tags),
+                             started_at=started_at,
+                             timer=timer,
+                             wall_time=time.perf_counter() - timer)
+
+        # DML and DDL statements are complete, a SELECT runs until its result is fetched
+        profile = self._profile()
+        if self._cursor.description is None or profile is None or profile.get("latency"):
+            self._finish(profile=profile)
+        return self
+
+    def executemany(self, query: str, parameters: Optional[Sequence[Any]] = None) -> "ProfilingCursor":
+        self._finish()
+        started_at = datetime.now()
+        timer = time.perf_counter()
+        self._cursor.executemany(query, parameters)
+        self._profiler.record(query=query,
+                              tags=dict(self._tags),
+                              started_at=started_at,
+                              wall_time=time.perf_counter() - timer,
+                              row_count=len(parameters or []))
+        return self
+
+    def _fetched(self, result: Any) -> Any:
+        if self._pending is not None:
+            self._pending["wall_time"] = time.perf_counter() - self._pending["timer"]
+            self._finish()
+        return result
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._fetched(self._cursor.fetchone())
+
+    def fetchall(self) -> List[tuple]:
+        return self._fetched(self._cursor.fetchall())
+
+    def df(self, *args, **kwargs) -> Any:
+        return self._fetched(self._cursor.df(*args, **kwargs))
+
+    def fetchdf(self, *args, **kwargs) -> Any:
+        return self._fetched(self._cursor.fetchdf(*args, **kwargs))
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
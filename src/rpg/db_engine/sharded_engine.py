@@ -0,0 +1,517 @@
+from pathlib import Path
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Union, Optional, Any, Dict, List, Sequence, Callable
+import duckdb
+import pandas as pd
+from rpg.db_engine.db_engine_base import DBEngineBase
+from rpg.db_engine.duckdb_engine import DuckDBEngine
+from rpg.db_engine.native_ingestion import sql_string
+from rpg.db_engine.derived_tables import build_kpi_daily_rebuild_queries
+from rpg.utils.logger import Logger
+
+# Shard engine of the writer process of a shard
+_writer_engine = None
+
+
+def _open_writer_engine(database_configuration: Dict[Any, Any]):
+    """
+    Initializer of the writer process, the process holds the read-write connection of its shard
+    """
+    global _writer_engine
+    _writer_engine = DuckDBEngine(database_configuration=database_configuration, read_only=False)
+
+
+def _run_shard_task(engine: DuckDBEngine,
+                    task: Callable[..., Any],
+                    profiling_tags: Dict[str, Optional[str]],
+                    kwargs: Dict[str, Any]) -> Any:
+    with engine.profiling_stage(stage=profiling_tags["stage"], run_id=profiling_tags["run_id"]):
+        return task(engine, **kwargs)
+
+
+def _run_writer_task(task: Callable[..., Any],
+                     profiling_tags: Dict[str, Optional[str]],
+                     kwargs: Dict[str, Any]) -> Any:
+    return _run_shard_task(engine=_writer_engine, task=task, profiling_tags=profiling_tags, kwargs=kwargs)
+
+
+def _stage_write(engine: DuckDBEngine, task: Callable[..., Any], task_kwargs: Dict[str, Any]) -> Any:
+    """
+    First phase of a write across the shards, the task runs in a transaction that is left open until _end_write
+    """
+    engine.begin_transaction()
+    return task(engine, **task_kwargs)
+
+
+def _end_write(engine: DuckDBEngine, commit: bool) -> bool:
+    """
+    Second phase of a write across the shards, commit or roll back the transaction of _stage_write
+    """
+    engine.end_transaction(commit=commit)
+    return True
+
+
+def _replace_inventory(engine: DuckDBEngine, inventory: Optional[pd.DataFrame] = None) -> int:
+    """
+    Replace the active inventory of the shard, a shard without hotels in the inventory file deactivates its inventory
+    Runs in the transaction of _stage_write
+    """
+    if inventory is not None and len(inventory) > 0:
+        return engine.ingest_inventory(inventory=inventory, is_safe=False)
+    for query in ["UPDATE inventory SET is_active=False"] + build_kpi_daily_rebuild_queries():
+        engine.execute(query=query, is_safe=False)
+    return 0
+
+
+def _combine_results(results: Dict[int, Any]) -> Any:
+    """
+    Combine the results of the shards: DataFrames are concatenated, numbers are added, booleans are True if True for
+    every shard and dictionaries are combined by key. None (error) if any shard returned None
+    """
+    values = list(results.values())
+    if any(value is None for value in values):
+        return None
+    if all(isinstance(value, bool) for value in values):
+        return all(values)
+    if all(isinstance(value, pd.DataFrame) for value in values):
+        return pd.concat(values, ignore_index=True)
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return sum(values)
+    if all(isinstance(value, dict) for value in values):
+        keys = list(dict.fromkeys(key for value in values for key in value))
+        return {key: _combine_results({shard: value.get(key) for shard, value in results.items()})
+                for key in keys}
+    # Results that can not be combined are returned per shard
+    return dict(results)
+
+
+class ShardedEngine(DBEngineBase):
+    """
+    Routes the rows of each hotel to one of shard_count DuckDB database files (hotel_id % shard_count). Every shard is
+    written by its own writer process, so the shards of a batch are written in parallel. Reads of a hotel open only
+    the shard of the hotel, portfolio queries attach all shards
+    """
+
+    ENGINE_NAME = "ShardedEngine"
+    PORTFOLIO_DATABASE_NAME = "portfolio"
+    # Tables and views of the shards that are queried across the shards by portfolio_query
+    PORTFOLIO_RELATIONS = ["inventory", "kpi_daily", "view_reservations", "view_kpi"]
+
+    def __init__(self, database_configuration: Dict[Any, Any], read_only: Optional[bool] = False):
+        super().__init__(database_configuration, read_only=read_only)
+        self._engine_name = self.ENGINE_NAME
+        self._shard_count = int(self.database_configuration["shard_count"])
+        self._shard_configurations = [self._shard_configuration(shard=shard) for shard in range(self._shard_count)]
+        self._writers = {}
+        self._readers = {}
+        self._portfolio_connection = None
+
+    @property
+    def shard_count(self) -> int:
+        return self._shard_count
+
+    @property
+    def shard_configurations(self) -> List[Dict[Any, Any]]:
+        return self._shard_configurations
+
+    def shard_of(self, hotel_id: int) -> int:
+        """
+        Shard of the hotel
+        """
+        return int(hotel_id) % self._shard_count
+
+    def _shard_configuration(self, shard: int) -> Dict[Any, Any]:
+        """
+        DuckDBEngine configuration of the shard, file paths get the shard number (db/rpg.db -> db/rpg_shard0.db)
+        """
+        configuration = dict(self.database_configuration)
+        for path_key in ["db_path", "snapshot_path", "profile_path"]:
+            if configuration.get(path_key):
+                path = Path(configuration[path_key])
+                configuration[path_key] = str(path.with_name(f"{path.stem}_shard{shard}{path.suffix}"))
+        return configuration
+
+    def _split(self, data: Optional[pd.DataFrame]) -> Dict[int, pd.DataFrame]:
+        """
+        Rows of the DataFrame per shard, by hotel_id. Rows without hotel_id (e.g. rejected rows) are written to shard 0
+        """
+        if data is None or len(data) == 0:
+            return {}
+        if "hotel_id" not in data.columns:
+            return {0: data}
+        shards = pd.to_numeric(data["hotel_id"], errors="coerce").fillna(0).astype("int64") % self._shard_count
+        return {int(shard): rows for shard, rows in data.groupby(shards, sort=True)}
+
+    # region Shard connections
+
+    def _writer(self, shard: int) -> ProcessPoolExecutor:
+        """
+        Writer process of the shard, started on first use. DuckDB allows one read-write process per database file,
+        every write of the shard runs in this process
+        """
+        if shard not in self._writers:
+            self._close_portfolio()
+            self._writers[shard] = ProcessPoolExecutor(max_workers=1,
+                                                       initializer=_open_writer_engine,
+                                                       initargs=(self._shard_configurations[shard],))
+        return self._writers[shard]
+
+    def _reader(self, shard: int) -> DuckDBEngine:
+        """
+        Read only engine of the shard (the latest read snapshot of the shard if published), opened on first use
+        """
+        if shard not in self._readers:
+            self._close_portfolio()
+            self._readers[shard] = DuckDBEngine(database_configuration=self._shard_configurations[shard],
+                                                read_only=True)
+        return self._readers[shard]
+
+    def _run_on_shards(self,
+                       task: Callable[..., Any],
+                       shard_kwargs: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        """
+        Run task(engine, **kwargs) on the engine of each shard and return the results per shard. Writer processes run
+        the tasks of the shards in parallel, read only engines run them in this process
+        """
+        profiling_tags = dict(self._profiling_tags)
+        if self.read_only:
+            return {shard: _run_shard_task(engine=self._reader(shard),
+                                           task=task,
+                                           profiling_tags=profiling_tags,
+                                           kwargs=kwargs)
+                    for shard, kwargs in sorted(shard_kwargs.items())}
+
+        futures = {shard: self._writer(shard).submit(_run_writer_task, task, profiling_tags, kwargs)
+                   for shard, kwargs in sorted(shard_kwargs.items())}
+        # Every shard finishes its task before an error of a shard is raised
+        wait(list(futures.values()))
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _write_on_shards(self,
+                         task: Callable[..., Any],
+                         shard_kwargs: Dict[int, Dict[str, Any]]) -> Dict[int, Any]:
+        """
+        Two-phase write: every shard runs the task in an open transaction, the shards are committed once every shard
+        has written its rows and rolled back if any shard failed. The error of the first failed shard is raised
+        A COMMIT that fails after other shards committed is not undone, re-ingesting the file repairs the shards
+        """
+        if len(shard_kwargs) == 0:
+            return {}
+
+        profiling_tags = dict(self._profiling_tags)
+        futures = {shard: self._writer(shard).submit(_run_writer_task,
+                                                     _stage_write,
+                                                     profiling_tags,
+                                                     dict(task=task, task_kwargs=kwargs))
+                   for shard, kwargs in sorted(shard_kwargs.items())}
+        wait(list(futures.values()))
+        errors = [future.exception() for future in futures.values() if future.exception() is not None]
+
+        end_futures = {shard: self._writer(shard).submit(_run_writer_task,
+                                                         _end_write,
+                                                         profiling_tags,
+                                                         dict(commit=len(errors) == 0))
+                       for shard in futures}
+        wait(list(end_futures.values()))
+        errors.extend(future.exception() for future in end_futures.values() if future.exception() is not None)
+        if errors:
+            raise errors[0]
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _run_on_all_shards(self, task: Callable[..., Any], **kwargs) -> Dict[int, Any]:
+        return self._run_on_shards(task=task, shard_kwargs={shard: kwargs for shard in range(self._shard_count)})
+
+    def _close_portfolio(self):
+        if self._portfolio_connection is not None:
+            self._portfolio_connection.close()
+            self._portfolio_connection = None
+
+    def _close_shards(self):
+        # Writer engines are closed before their processes exit, so the shard files are checkpointed
+        for shard, writer in self._writers.items():
+            try:
+                writer.submit(_run_writer_task, DuckDBEngine.close, dict(self._profiling_tags), {}).result()
+            except Exception as e:
+                Logger.error(message=f"Error closing database shard {shard}",
+                             err=e,
+                             include_stack_trace=True)
+            finally:
+                writer.shutdown()
+        self._writers = {}
+
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
+
+    def close(self):
+        """
+        Close the shard engines, stop the writer processes and close the portfolio connection
+        """
+        self._close_shards()
+        self._close_portfolio()
+
+    # endregion
+
+    def validate_connection(self) -> bool:
+        return _combine_results(self._run_on_all_shards(task=DuckDBEngine.validate_connection))
+
+    def initialize_database(self):
+        """
+        Apply the SQL files to every shard, the shards are migrated in parallel
+        """
+        Logger.info(f"Initializing {self._shard_count} database shard(s)...")
+        self._run_on_all_shards(task=DuckDBEngine.initialize_database)
+        Logger.success("Done!")
+
+    def execute(self,
+                query: str,
+                parameters: Optional[Sequence[Any]] = None,
+                is_safe: Optional[bool] = True) -> Optional[Union[bool, int, pd.DataFrame]]:
+        """
+        Execute the query on every shard. Results of a SELECT are concatenated, row counts are added
+        """
+        return _combine_results(self._run_on_all_shards(task=DuckDBEngine.execute,
+                                                        query=query,
+                                                        parameters=parameters,
+                                                        is_safe=is_safe))
+
+    def insert_rows(self,
+                    table_name: str,
+                    rows: List[Dict[Any, Any]],
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True) -> int:
+        """
+        Rows are written to the shard of their hotel_id, rows without hotel_id to shard 0
+        """
+        shard_rows = {}
+        for row in rows or []:
+            shard = self.shard_of(row["hotel_id"]) if row.get("hotel_id") is not None else 0
+            shard_rows.setdefault(shard, []).append(row)
+
+        try:
+            results = self._write_on_shards(task=DuckDBEngine.insert_rows,
+                                            shard_kwargs={shard: dict(table_name=table_name,
+                                                                      rows=rows_of_shard,
+                                                                      pre_query=pre_query,
+                                                                      post_query=post_query,
+                                                                      overwrite=overwrite,
+                                                                      is_safe=False)
+                                                          for shard, rows_of_shard in shard_rows.items()})
+            return sum(results.values())
+
+        except Exception as e:
+            Logger.error(message=f"Error inserting rows into '{table_name}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return 0
+            else:
+                raise
+
+    def bulk_insert(self,
+                    table_name: str,
+                    data: pd.DataFrame,
+                    pre_query: Optional[str] = None,
+                    post_query: Optional[str] = None,
+                    overwrite: Optional[bool] = False,
+                    is_safe: Optional[bool] = True) -> int:
+        """
+        Rows are written to the shard of their hotel_id, DataFrames without hotel_id (e.g. rejected_imports) to shard 0
+        """
+        try:
+            results = self._write_on_shards(task=DuckDBEngine.bulk_insert,
+                                            shard_kwargs={shard: dict(table_name=table_name,
+                                                                      data=shard_data,
+                                                                      pre_query=pre_query,
+                                                                      post_query=post_query,
+                                                                      overwrite=overwrite,
+                                                                      is_safe=False)
+                                                          for shard, shard_data in self._split(data).items()})
+            return sum(results.values())
+
+        except Exception as e:
+            Logger.error(message=f"Error inserting rows into '{table_name}'",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return 0
+            else:
+                raise
+
+    def ingest_reservations(self,
+                            reservations: pd.DataFrame,
+                            stay_dates: pd.DataFrame,
+                            is_safe: Optional[bool] = True) -> Optional[Dict[str, int]]:
+        """
+        Split the batch by shard and write the shards in parallel, the shards are committed together (_write_on_shards)
+        """
+        shard_reservations = self._split(reservations)
+        shard_stay_dates = self._split(stay_dates)
+        shards = sorted(set(shard_reservations) | set(shard_stay_dates))
+        if len(shards) == 0:
+            return dict(reservation_imports=0, reservation_stay_dates=0)
+
+        try:
+            results = self._write_on_shards(task=DuckDBEngine.ingest_reservations,
+                                            shard_kwargs={shard: dict(reservations=shard_reservations.get(shard,
+                                                                                                          reservations.iloc[0:0]),
+                                                                      stay_dates=shard_stay_dates.get(shard,
+                                                                                                      stay_dates.iloc[0:0]),
+                                                                      is_safe=False)
+                                                          for shard in shards})
+            return _combine_results(results)
+
+        except Exception as e:
+            Logger.error(message="Error ingesting reservations",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise
+
+    def ingest_inventory(self,
+                         inventory: pd.DataFrame,
+                         is_safe: Optional[bool] = True) -> int:
+        """
+        Every shard replaces its active inventory, shards without hotels in the inventory deactivate their inventory
+        The shards are committed together (_write_on_shards)
+        """
+        shard_inventory = self._split(inventory)
+        try:
+            results = self._write_on_shards(task=_replace_inventory,
+                                            shard_kwargs={shard: dict(inventory=shard_inventory.get(shard))
+                                                          for shard in range(self._shard_count)})
+            return sum(results.values())
+
+        except Exception as e:
+            Logger.error(message="Error ingesting inventory",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return 0
+            else:
+                raise
+
+    def load_kpi(self,
+                 hotel_id: int,
+                 start_date: date,
+                 end_date: date,
+                 is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        Only the shard of the hotel is opened
+        """
+        shard = self.shard_of(hotel_id)
+        return self._run_on_shards(task=DuckDBEngine.load_kpi,
+                                   shard_kwargs={shard: dict(hotel_id=hotel_id,
+                                                             start_date=start_date,
+                                                             end_date=end_date,
+                                                             is_safe=is_safe)})[shard]
+
+    def publish_snapshot(self, is_safe: Optional[bool] = True) -> bool:
+        """
+        Every shard publishes its own read snapshot, in parallel
+        """
+        return _combine_results(self._run_on_all_shards(task=DuckDBEngine.publish_snapshot, is_safe=is_safe))
+
+    @property
+    def supports_maintenance(self) -> bool:
+        return True
+
+    def maintain(self,
+                 archive_path: str,
+                 retention_days: Optional[int] = 30,
+                 compact: Optional[bool] = False,
+                 cluster: Optional[bool] = False,
+                 is_safe: Optional[bool] = True) -> Optional[Dict[str, Any]]:
+        """
+        Every shard is maintained in parallel and archives into its own folder (archive_path/shard<n>)
+        Archived row counts and sizes are added, the clustering statistics are returned per shard
+        """
+        results = self._run_on_shards(task=DuckDBEngine.maintain,
+                                      shard_kwargs={shard: dict(archive_path=str(Path(archive_path) / f"shard{shard}"),
+                                                                retention_days=retention_days,
+                                                                compact=compact,
+                                                                cluster=cluster,
+                                                                is_safe=is_safe)
+                                                    for shard in range(self._shard_count)})
+        if any(result is None for result in results.values()):
+            return None
+        combined_result = _combine_results({shard: {key: value for key, value in result.items() if key != "clustering"}
+                                            for shard, result in results.items()})
+        combined_result["clustering"] = {shard: result.get("clustering") for shard, result in results.items()}
+        return combined_result
+
+    # region Portfolio
+
+    def _portfolio(self) -> duckdb.DuckDBPyConnection:
+        """
+        In-memory database attaching every shard read only (the latest read snapshot of the shard if published),
+        PORTFOLIO_RELATIONS are views over the relations of all shards
+        Shard engines are closed first, the shard files are held by the portfolio connection until the next shard call
+        """
+        if self._portfolio_connection is not None:
+            return self._portfolio_connection
+
+        self._close_shards()
+        conn = duckdb.connect(database=":memory:")
+        try:
+            for shard, configuration in enumerate(self._shard_configurations):
+                shard_path = Path(configuration["db_path"])
+                if self.read_only and configuration.get("snapshot_path") and Path(configuration["snapshot_path"]).exists():
+                    shard_path = Path(configuration["snapshot_path"])
+                conn.execute(f"ATTACH {sql_string(str(shard_path))} AS shard{shard} (READ_ONLY)")
+
+            conn.execute(f"CREATE SCHEMA {self.PORTFOLIO_DATABASE_NAME}")
+            for relation_name in self.PORTFOLIO_RELATIONS:
+                union_query = "\nUNION ALL\n".join(f"SELECT * FROM shard{shard}.main.{relation_name}"
+                                                   for shard in range(self._shard_count))
+                conn.execute(f"CREATE VIEW {self.PORTFOLIO_DATABASE_NAME}.{relation_name} AS {union_query}")
+            conn.execute(f"USE memory.{self.PORTFOLIO_DATABASE_NAME}")
+        except Exception as e:
+            conn.close()
+            raise
+
+        self._portfolio_connection = conn
+        return conn
+
+    def portfolio_query(self,
+                        query: str,
+                        parameters: Optional[Sequence[Any]] = None,
+                        is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        Run a SELECT over all shards. inventory, kpi_daily, view_reservations and view_kpi read the rows of every shard
+        """
+        try:
+            return self._portfolio().execute(query, parameters).df()
+        except Exception as e:
+            Logger.error(message="Error executing portfolio query!",
+                         err=e,
+                         include_stack_trace=True)
+            if is_safe:
+                return None
+            else:
+                raise e
+
+    def load_portfolio_kpi(self,
+                           start_date: date,
+                           end_date: date,
+                           is_safe: Optional[bool] = True) -> Optional[pd.DataFrame]:
+        """
+        Load the KPI of all hotels of the portfolio between start_date and end_date (columns of load_kpi), by hotel
+        and newest night first
+        """
+        query = """
+        SELECT *
+        FROM view_kpi
+        WHERE NIGHT_OF_STAY BETWEEN ? AND ?
+        ORDER BY HOTEL_ID, NIGHT_OF_STAY DESC
+        """
+        return self.portfolio_query(query=query,
+                                    parameters=[start_date, end_date],
+                                    is_safe=is_safe)
+
+    # endregion
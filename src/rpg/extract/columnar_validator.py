@@ -0,0 +1,300 @@
+import numpy as np
+from operator import itemgetter
+from itertools import chain, repeat, compress
+from typing import List, Dict, Any, Tuple, Callable, Optional
+
+from rpg.utils.datetime_util import to_epoch_days, to_epoch_microseconds
+from rpg.utils.validation_util import ValidationPlan, FieldValidator, load_validation_plan
+
+_MISSING = object()
+
+# Parsed value of the date/datetime values which are not valid
+_INVALID = np.iinfo(np.int64).min
+
+# Value types checked by the vectorized checks, values of other types are validated by the plan validators
+_ACCEPTED_TYPES = dict(
+    string=frozenset([str]),
+    int=frozenset([int]),
+    number=frozenset([int, float]),
+    date=frozenset([str]),
+    datetime=frozenset([str])
+)
+_TO_EPOCH = dict(date=to_epoch_days, datetime=to_epoch_microseconds)
+
+ISO_DATETIME_PATTERN = "%Y-%m-%d %H:%M:%S.%f"
+_ISO_DATETIME_SEPARATORS = {4: "-", 7: "-", 10: " ", 13: ":", 16: ":", 19: "."}
+
+RowValidator = Callable[[List[Dict[Any, Any]]], Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]]
+
+
+class ColumnarReservationValidator:
+    """
+    Columnar implementation of the reservation INGESTION and LOGIC level validations
+
+    Reservations and stay dates are flattened into columns and the rules of the compiled plans are applied as
+    vectorized checks. Date/datetime columns are parsed once per distinct value with the plan validators (shared
+    parse cache). Reservations that are not confirmed as valid by the vectorized checks (invalid or unusual values)
+    are validated by the row-wise engine, so the valid/invalid split and error payloads are identical
+    """
+
+    def __init__(self, row_validator: RowValidator):
+        # Field rules and validators come from the compiled plans of `schema/reservations.json`
+        self._reservation_plan = load_validation_plan(schema_name="reservations", entity="reservation")
+        self._stay_date_plan = load_validation_plan(schema_name="reservations", entity="stay_date")
+        self._row_validator = row_validator
+
+    def validate(self, reservations: List[Dict[Any, Any]]) -> Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]:
+        """
+        Run ingestion and logic level validations and split reservations into valid and invalid rows
+        """
+        reservation_count = len(reservations)
+        if reservation_count == 0 or set(map(type, reservations)) != {dict}:
+            return self._row_validator(reservations)
+
+        # region Flatten stay dates
+        stay_date_lists = self._column(rows=reservations, field_name="stay_dates")
+        if set(map(type, stay_date_lists)) == {list}:
+            is_valid = np.ones(reservation_count, dtype=bool)
+        else:
+            is_valid = np.fromiter(map(isinstance, stay_date_lists, repeat(list)), dtype=bool, count=reservation_count)
+            stay_date_lists = [s if valid else [] for s, valid in zip(stay_date_lists, is_valid)]
+        stay_date_counts = np.fromiter(map(len, stay_date_lists), dtype=np.int64, count=reservation_count)
+        # stay_dates must have at least one entry
+        is_valid &= stay_date_counts > 0
+
+        stay_dates = list(chain.from_iterable(stay_date_lists))
+        if stay_dates and set(map(type, stay_dates)) != {dict}:
+            return self._row_validator(reservations)
+        parents = np.repeat(np.arange(reservation_count), stay_date_counts)
+        # endregion
+
+        # region Reservation fields - INGESTION LEVEL
+        parsed = {}
+        for field_name, field_type, options, optional in self._reservation_plan.rules:
+            valid, parsed[field_name] = self._check_column(rows=reservations,
+                                                           plan=self._reservation_plan,
+                                                           field_name=field_name,
+                                                           field_type=field_type,
+                                                           options=options,
+                                                           optional=optional)
+            is_valid &= valid
+        # endregion
+
+        # region Reservation fields - LOGIC LEVEL
+        arrival_dates = parsed["arrival_date"]
+        departure_dates = parsed["departure_date"]
+        is_valid &= arrival_dates < departure_dates
+        is_valid &= parsed["updated_at"] >= parsed["created_at"]
+        # endregion
+
+        # region Stay dates - INGESTION LEVEL
+        is_valid_stay_date = np.ones(len(stay_dates), dtype=bool)
+        for field_name, field_type, options, optional in self._stay_date_plan.rules:
+            valid, parsed[field_name] = self._check_column(rows=stay_dates,
+                                                           plan=self._stay_date_plan,
+                                                           field_name=field_name,
+                                                           field_type=field_type,
+                                                           options=options,
+                                                           optional=optional)
+            is_valid_stay_date &= valid
+        # endregion
+
+        # region Stay dates - LOGIC LEVEL
+        start_dates = parsed["start_date"]
+        end_dates = parsed["end_date"]
+        is_valid_stay_date &= start_dates <= end_dates
+        # All dates must be fall within the reservation period
+        is_valid_stay_date &= (start_dates >= arrival_dates[parents]) & (end_dates <= departure_dates[parents])
+        is_valid[parents[~is_valid_stay_date]] = False
+        # endregion
+
+        # region Split reservations into valid and invalid rows
+        if is_valid.all():
+            return [{**res, "stay_dates": list(res["stay_dates"])} for res in reservations], []
+
+        valid_reservations = []
+        invalid_reservations = []
+        for res, valid in zip(reservations, is_valid.tolist()):
+            if valid:
+                valid_reservations.append({**res, "stay_dates": list(res["stay_dates"])})
+            else:
+                valid_rows, invalid_rows = self._row_validator([res])
+                valid_reservations.extend(valid_rows)
+                invalid_reservations.extend(invalid_rows)
+        # endregion
+
+        return valid_reservations, invalid_reservations
+
+    @staticmethod
+    def _column(rows: List[Dict[Any, Any]], field_name: str) -> List[Any]:
+        """
+        Flatten a field of the rows into a column. Missing values are marked with a sentinel
+        """
+        try:
+            return list(map(itemgetter(field_name), rows))
+        except KeyError:
+            return [row.get(field_name, _MISSING) for row in rows]
+
+    def _check_column(self,
+                      rows: List[Dict[Any, Any]],
+                      plan: ValidationPlan,
+                      field_name: str,
+                      field_type: str,
+                      options: Dict[str, Any],
+                      optional: bool) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Validate a column, returns the mask of the values confirmed as valid and the parsed values of
+        date (epoch days) and datetime (epoch microseconds) columns
+        """
+        values = self._column(rows=rows, field_name=field_name)
+        validator = plan.validator(field_name)
+        to_epoch = _TO_EPOCH.get(field_type, None)
+        accepted_types = _ACCEPTED_TYPES.get(field_type, frozenset())
+
+        if set(map(type, values)) <= accepted_types:
+            return self._check_values(values=values,
+                                      validator=validator,
+                                      field_name=field_name,
+                                      field_type=field_type,
+                                      options=options)
+
+        # region Values of other types (missing, NULL, mixed types) are validated one by one by the plan validator
+        count = len(values)
+        is_typed = np.fromiter(map(accepted_types.__contains__, map(type, values)), dtype=bool, count=count)
+        typed_valid, typed_parsed = self._check_values(values=list(compress(values, is_typed)),
+                                                       validator=validator,
+                                                       field_name=field_name,
+                                                       field_type=field_type,
+                                                       options=options)
+        valid = np.zeros(count, dtype=bool)
+        valid[is_typed] = typed_valid
+        parsed = None
+        if to_epoch is not None:
+            parsed = np.full(count, _INVALID, dtype=np.int64)
+            parsed[is_typed] = typed_parsed
+
+        for index in np.flatnonzero(~is_typed).tolist():
+            row = rows[index]
+            if optional and field_name not in row:
+                valid[index] = True
+                continue
+            validation_error, value = validator(row)
+            if validation_error is None:
+                valid[index] = True
+                if parsed is not None:
+                    parsed[index] = to_epoch(value)
+        # endregion
+
+        return valid, parsed
+
+    def _check_values(self,
+                      values: List[Any],
+                      validator: FieldValidator,
+                      field_name: str,
+                      field_type: str,
+                      options: Dict[str, Any]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Vectorized checks of values of the accepted types of the field
+        """
+        if field_type == "string":
+            return self._check_strings(values=values, **options), None
+
+        if field_type in ("int", "number"):
+            try:
+                if field_type == "int":
+                    numbers = np.fromiter(values, dtype=np.int64, count=len(values))
+                    valid = np.ones(len(values), dtype=bool)
+                else:
+                    numbers = np.array(values, dtype=np.float64)
+                    valid = np.isfinite(numbers)
+                    if not options.get("allow_int", True):
+                        valid &= numbers != np.floor(numbers)
+            except OverflowError:
+                return self._check_distinct_values(values=values, validator=validator, field_name=field_name)
+            if options.get("min_value", None) is not None:
+                valid &= numbers >= options["min_value"]
+            if options.get("max_value", None) is not None:
+                valid &= numbers <= options["max_value"]
+            return valid, None
+
+        # region date, datetime
+        pending = np.ones(len(values), dtype=bool)
+        parsed = np.full(len(values), _INVALID, dtype=np.int64)
+        if field_type == "datetime" and options.get("pattern", None) == ISO_DATETIME_PATTERN:
+            parsed_values, parsed = parse_iso_datetimes(values=values)
+            pending = ~parsed_values
+
+        # Dates repeat heavily, the other values are parsed once per distinct value by the plan validator
+        if pending.any():
+            pending_values = values if pending.all() else list(compress(values, pending))
+            _, parsed[pending] = self._check_distinct_values(values=pending_values,
+                                                             validator=validator,
+                                                             field_name=field_name,
+                                                             to_epoch=_TO_EPOCH[field_type])
+        # endregion
+
+        return parsed != _INVALID, parsed
+
+    @staticmethod
+    def _check_strings(values: List[str],
+                       allow_empty_string: Optional[bool] = True,
+                       allowed_values: Optional[List[str]] = None) -> np.ndarray:
+        valid = np.ones(len(values), dtype=bool)
+        if allowed_values is not None:
+            invalid_values = set(values).difference(allowed_values)
+            if invalid_values:
+                valid &= ~np.fromiter(map(invalid_values.__contains__, values), dtype=bool, count=len(values))
+        elif not allow_empty_string and not all(map(str.strip, values)):
+            valid &= np.fromiter(map(bool, map(str.strip, values)), dtype=bool, count=len(values))
+        return valid
+
+    @staticmethod
+    def _check_distinct_values(values: List[Any],
+                               validator: FieldValidator,
+                               field_name: str,
+                               to_epoch: Optional[Callable[[Any], int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Validate every distinct value once with the plan validator
+        """
+        epochs = {}
+        for value in set(values):
+            validation_error, parsed_value = validator({field_name: value})
+            if validation_error is not None:
+                epochs[value] = _INVALID
+            else:
+                epochs[value] = to_epoch(parsed_value) if to_epoch is not None else 0
+        parsed = np.fromiter(map(epochs.__getitem__, values), dtype=np.int64, count=len(values))
+        return parsed != _INVALID, parsed
+
+
+def parse_iso_datetimes(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized parser of `%Y-%m-%d %H:%M:%S.%f` values (1-6 fraction digits, the layout of the parse fast path)
+    Returns the mask of the parsed values and their epoch microseconds. Other values are left to the plan validators
+    """
+    count = len(values)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=count)
+    text = np.array(values, dtype="U26")
+    codes = text.view(np.uint32).reshape(count, 26)
+    is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+
+    parsed_values = (lengths >= 21) & (lengths <= 26)
+    for position in range(26):
+        separator = _ISO_DATETIME_SEPARATORS.get(position, None)
+        if separator is not None:
+            parsed_values &= codes[:, position] == ord(separator)
+        elif position < 20:
+            parsed_values &= is_digit[:, position]
+        else:
+            parsed_values &= is_digit[:, position] | (lengths <= position)
+    # Year 0 is valid for NumPy, but not for Python datetimes
+    parsed_values &= (codes[:, :4] != ord("0")).any(axis=1)
+
+    parsed = np.full(count, _INVALID, dtype=np.int64)
+    if parsed_values.any():
+        try:
+            parsed[parsed_values] = text[parsed_values].astype("datetime64[us]").view(np.int64)
+        except ValueError:
+            # Out of range fields (e.g. 30th of February), every value is left to the plan validators
+            parsed_values[:] = False
+    return parsed_values, parsed
@@ -1,6 +1,7 @@
 import pandas as pd
+from pathlib import Path
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Iterator
 
 
 
@@ -19,4 +20,25 @@ class ExtractEngineBase(ABC):
 
     @abstractmethod
     def extract_reservations(self) -> Optional[List[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]]:
-        pass
\ No newline at end of file
+        pass
+
+    def iter_reservation_batches(self) -> Iterator[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """
+        Yield reservation batches one by one as (file_info, imports, stay_dates, rejected_imports)
+        Engines should override it to keep only one batch in memory at a time
+        """
+        yield from self.extract_reservations() or []
+
+    def iter_reservation_files(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the file info (original_filename, temporary_filepath) of every reservation file, without reading them
+        Used by the database-native ingestion mode, which loads the files inside the database engine
+        """
+        raise NotImplementedError
+
+    def iter_reservation_chunks(self, filepath: Path, batch_size: Optional[int] = None) -> Iterator[Path]:
+        """
+        Yield the reservations of a reservation file as JSON array files of batch_size reservations (all
+        reservations if None), for the database-native ingestion mode
+        """
+        raise NotImplementedError
@@ -1,5 +1,13 @@
+import io
+import re
+import csv
 import json
+import pickle
 import os.path
+import warnings
+from collections import deque
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -7,18 +15,16 @@ from datetime import datetime
 
 from rpg.utils.logger import Logger
 from rpg.utils.io_util import file_exists
-from rpg.utils.hash_util import calculate_row_hash
-from typing import List, Optional, Dict, Tuple, Any
-from rpg.utils.datetime_util import cast_date, cast_datetime
+from rpg.utils.json_util import iter_json_array
+from rpg.utils.hash_util import calculate_row_fingerprint
+from typing import List, Optional, Dict, Tuple, Any, Iterator
+from rpg.utils.datetime_util import cast_date, cast_datetime, to_epoch_days, to_epoch_microseconds
 from rpg.extract.extract_engine_base import ExtractEngineBase
-from rpg.utils.validation_util import (
-    validate_int,
-    validate_string,
-    validate_date,
-    validate_datetime,
-    ValidationError,
-    validate_number
-)
+from rpg.extract.columnar_validator import ColumnarReservationValidator
+from rpg.utils.validation_util import ValidationError, load_validation_plan
+
+# Number of inventory CSV lines parsed and validated at once
+INVENTORY_CHUNK_SIZE = 100000
 
 
 class LocalExtractEngine(ExtractEngineBase):
@@ -38,6 +44,7 @@ class LocalExtractEngine(ExtractEngineBase):
             error_path = Path(os.path.join(archive_path, "error"))
             column_separator = self.configuration["source_config"]["inventory_column_separator"]
             row_separator = self.configuration["source_config"]["inventory_row_separator"]
+            chunk_size = self.configuration["source_config"].get("inventory_chunk_size", None)
             # endregion
 
             # region Create paths if not exists
@@ -85,11 +92,12 @@ class LocalExtractEngine(ExtractEngineBase):
                 )
                 csv_path.rename(temp_filepath)
 
-                # region Validate CSV file
-                is_valid = self.validate_inventory(filepath=temp_filepath,
-                                                   column_separator=column_separator,
-                                                   row_separator=row_separator)
-                if not is_valid:
+                # region Validate and convert CSV file in a single pass
+                inventory = self.read_inventory(filepath=temp_filepath,
+                                                column_separator=column_separator,
+                                                row_separator=row_separator,
+                                                chunk_size=chunk_size)
+                if inventory is None:
                     Logger.error(f"INVALID: Moving '{temp_filepath}' to error folder '{str(error_path)}'")
                     error_filepath = Path(str(temp_filepath).replace("tmp_", "error_", 1))
                     temp_filepath.rename(error_filepath)
@@ -99,9 +107,7 @@ class LocalExtractEngine(ExtractEngineBase):
                     Logger.success(f"VALID: Inventory file '{temp_filepath}' is valid.")
                     file_info = dict(original_filename=csv_filename,
                                      temporary_filepath=temp_filepath)
-                    return file_info, self.inventory_to_dataframe(file_info=file_info,
-                                                                  column_separator=column_separator,
-                                                                  row_seperator=row_separator)
+                    return file_info, self.inventory_to_dataframe(file_info=file_info, inventory=inventory)
                 # endregion
 
                 # endregion
@@ -114,15 +120,11 @@ class LocalExtractEngine(ExtractEngineBase):
 
     def inventory_to_dataframe(self,
                                file_info: Dict[str, str],
-                               column_separator: str,
-                               row_seperator: str) -> pd.DataFrame:
+                               inventory: pd.DataFrame) -> pd.DataFrame:
         """
-        Load, enrich amd convert inventory CSV file to Pandas DataFrame
+        Enrich validated inventory DataFrame
         """
-        df = pd.read_csv(file_info["temporary_filepath"], sep=column_separator, lineterminator=row_seperator)
-        df = df[["hotel_id", "room_type_id", "quantity"]]
-        df["hotel_id"] = pd.to_numeric(df["hotel_id"]).astype(int)
-        df["quantity"] = pd.to_numeric(df["quantity"]).astype(int)
+        df = inventory[["hotel_id", "room_type_id", "quantity"]].copy()
         df["ingested_at"] = datetime.now()
         df["source_filename"] = file_info["original_filename"]
         df["is_active"] = True
@@ -135,83 +137,158 @@ class LocalExtractEngine(ExtractEngineBase):
                            ignore_empty_lines: Optional[bool] = True) -> bool:
         """
         Load and validate inventory CSV file
-        Function is validating CSV file line by line to make it available to validate huge files
         """
+        return self.read_inventory(filepath=filepath,
+                                   column_separator=column_separator,
+                                   row_separator=row_separator,
+                                   ignore_empty_lines=ignore_empty_lines) is not None
+
+    def read_inventory(self,
+                       filepath: Path,
+                       column_separator: str,
+                       row_separator: str,
+                       ignore_empty_lines: Optional[bool] = True,
+                       chunk_size: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Parse, validate and convert inventory CSV file in a single pass
+        File is read in chunks of lines and every chunk is validated with vectorized column checks, so huge files
+        are loaded with bounded parsing memory. Returns typed (hotel_id, room_type_id, quantity) DataFrame,
+        or None if the file is invalid
+        """
+        chunk_size = chunk_size or INVENTORY_CHUNK_SIZE
+        expected_column_names = ["hotel_id", "room_type_id", "quantity"]
+        inventory_plan = load_validation_plan(schema_name="inventory", entity="inventory")
 
-        is_header = True
-        column_names = []
+        column_names = None
+        column_indexes = []
         row_index = 0
-
-        hotel_id_index = -1
-        room_type_id_index = -1
-        quantity_index = -1
+        chunks = []
+        invalid_hotel_id = None
 
         with open(str(filepath), "r") as f:
 
+            # region Validate header columns
             for line in f:
-
                 line = line.rstrip(row_separator).strip()
-
                 if line == "" and ignore_empty_lines:
                     continue
+                column_names = line.split(column_separator)
+                break
 
-                if is_header:
+            if column_names is None or not set(expected_column_names).issubset(column_names):
+                Logger.error(message=f"'{filepath}' should have the columns {', '.join(expected_column_names)}")
+                return None
 
-                    # region Validate header columns
-                    expected_column_names = ["hotel_id", "room_type_id", "quantity"]
-                    column_names = line.split(column_separator)
-                    if not set(expected_column_names).issubset(column_names):
-                        Logger.error(message=f"'{filepath}' should have the columns {', '.join(expected_column_names)}")
-                        return False
-                    # endregion
+            column_indexes = [column_names.index(column_name) for column_name in expected_column_names]
+            # endregion
 
-                    # region Find the column indexes
-                    hotel_id_index = column_names.index("hotel_id")
-                    room_type_id_index = column_names.index("room_type_id")
-                    quantity_index = column_names.index("quantity")
-                    # endregion
+            while True:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    break
 
-                    is_header = False
+                # region Strip lines and count their columns
+                rows = [line.rstrip(row_separator).strip() for line in lines]
+                if ignore_empty_lines:
+                    rows = [row for row in rows if row != ""]
+                if not rows:
+                    continue
+                column_counts = np.fromiter(map(str.count, rows, repeat(column_separator)),
+                                            dtype=np.int64,
+                                            count=len(rows)) + 1
+                is_short = column_counts < len(column_names)
+                # endregion
+
+                # region Fast path: integer columns parsed by the CSV parser, rows that are certainly valid
+                hotel_ids, room_type_ids, quantities = self._read_inventory_chunk(rows=rows,
+                                                                                  column_separator=column_separator,
+                                                                                  column_count=len(column_names),
+                                                                                  column_indexes=column_indexes,
+                                                                                  as_text=False)
+                if hotel_ids.dtype.kind == "i" and quantities.dtype.kind == "i" and not is_short.any():
+                    room_type_text = np.asarray(room_type_ids.to_numpy(dtype=object), dtype=str)
+                    quantity_values = quantities.to_numpy(dtype=np.int64)
+                    is_valid = (room_type_text != "") & ~np.char.isspace(room_type_text) & (quantity_values >= 0)
+                    hotel_id_values = hotel_ids.to_numpy(dtype=np.int64)
                 else:
-                    values = line.split(column_separator)
+                    hotel_ids, room_type_ids, quantities = self._read_inventory_chunk(rows=rows,
+                                                                                      column_separator=column_separator,
+                                                                                      column_count=len(column_names),
+                                                                                      column_indexes=column_indexes,
+                                                                                      as_text=True)
+                    quantity_values = np.zeros(len(rows), dtype=np.int64)
+                    is_valid = np.zeros(len(rows), dtype=bool)
+                    hotel_id_values = pd.to_numeric(hotel_ids.str.strip(), errors="coerce")
+                    if invalid_hotel_id is None and hotel_id_values.isna().any():
+                        # Raised after the whole file is validated
+                        invalid_hotel_id = hotel_ids[hotel_id_values.isna()].iloc[0]
+                # endregion
 
-                    if len(values) < len(column_names):
+                # region Row-wise validation of the remaining rows to keep the validation errors
+                for index in np.flatnonzero(~is_valid):
+                    if is_short[index]:
                         Logger.error(
-                            message=f"Invalid row. Row {row_index} column count should be {len(column_names)}, but have {len(values)} columns"
+                            message=f"Invalid row. Row {row_index + index + 1} column count should be {len(column_names)}, but have {column_counts[index]} columns"
                         )
-                        return False
-
-                    # region Validate hotel_id
-                    hotel_id = values[hotel_id_index]
-                    valid, validation_error = validate_string(json_value={"hotel_id": hotel_id},
-                                                              field_name="hotel_id",
-                                                              allow_empty_string=False)
-                    if not valid:
-                        Logger.error(message=f"Invalid hotel_id. {validation_error.message}")
-                        return False
-                    # endregion
-
-                    # region Validate room_type_id
-                    room_type_id = values[room_type_id_index]
-                    valid, validation_error = validate_string(json_value={"room_type_id": room_type_id},
-                                                              field_name="room_type_id",
-                                                              allow_empty_string=False)
-                    if not valid:
-                        Logger.error(message=f"Invalid room_type_id. {validation_error.message}")
-                        return False
-                    # endregion
-
-                    # region Validate quantity
-                    quantity = values[quantity_index]
-                    valid, validation_error = validate_int(json_value={"quantity": quantity},
-                                                           field_name="quantity",
-                                                           min_value=0)
-                    if not valid:
-                        Logger.error(message=f"Invalid room_type_id. {validation_error.message}")
-                        return False
-                    # endregion
+                        return None
+
+                    validation_errors, parsed_values = inventory_plan.validate({"hotel_id": str(hotel_ids[index]),
+                                                                                "room_type_id": room_type_ids[index],
+                                                                                "quantity": str(quantities[index])})
+                    if validation_errors:
+                        validation_error = validation_errors[0]
+                        Logger.error(message=f"Invalid {validation_error.field_name}. {validation_error.message}")
+                        return None
+                    quantity_values[index] = parsed_values["quantity"]
+                # endregion
 
-        return True
+                chunks.append(pd.DataFrame(dict(hotel_id=hotel_id_values,
+                                                room_type_id=room_type_ids.to_numpy(dtype=object),
+                                                quantity=quantity_values)))
+                row_index += len(rows)
+
+        if invalid_hotel_id is not None:
+            raise ValueError(f"Unable to parse hotel_id '{invalid_hotel_id}' as integer")
+
+        if not chunks:
+            return pd.DataFrame(dict(hotel_id=pd.Series(dtype=np.int64),
+                                     room_type_id=pd.Series(dtype=object),
+                                     quantity=pd.Series(dtype=np.int64)))
+
+        inventory = pd.concat(chunks, ignore_index=True)
+        inventory["hotel_id"] = inventory["hotel_id"].astype(np.int64)
+        return inventory
+
+    @staticmethod
+    def _read_inventory_chunk(rows: List[str],
+                              column_separator: str,
+                              column_count: int,
+                              column_indexes: List[int],
+                              as_text: bool) -> List[pd.Series]:
+        """
+        Split stripped inventory lines into (hotel_id, room_type_id, quantity) columns with the pandas CSV parser
+        Lines are split like str.split (no quoting), missing columns are empty and extra columns are ignored
+        If not `as_text`, hotel_id and quantity are parsed as integers where the whole column allows it
+        """
+        dtype = {index: object for index in column_indexes}
+        if not as_text:
+            dtype = {column_indexes[1]: object}
+
+        with warnings.catch_warnings():
+            # Rows with extra columns are truncated, as they are ignored by the validation
+            warnings.simplefilter("ignore", category=pd.errors.ParserWarning)
+            df = pd.read_csv(io.StringIO("\n".join(rows)),
+                             sep=column_separator if len(column_separator) == 1 else re.escape(column_separator),
+                             engine="c" if len(column_separator) == 1 else "python",
+                             header=None,
+                             names=list(range(column_count)),
+                             usecols=column_indexes,
+                             index_col=False,
+                             dtype=dtype,
+                             na_filter=False,
+                             quoting=csv.QUOTE_NONE,
+                             skip_blank_lines=False)
+        return [df[index] for index in column_indexes]
 
     # endregion
 
@@ -221,12 +298,24 @@ class LocalExtractEngine(ExtractEngineBase):
         """
         Load and process reservation JSON files
         """
+        ingested_reservations = list(self.iter_reservation_batches())
+        return ingested_reservations if ingested_reservations else None
+
+    def iter_reservation_batches(self) -> Iterator[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """
+        Load and process reservation JSON files and yield one self-contained batch per file
+        In streaming mode (reservations_batch_size), yield one batch per chunk of the file
+        With max_workers > 1, files are processed by a process pool and yielded in filename order
+        """
 
         # region Read configuration parameters
         reservations_path = Path(self.configuration["source_config"]["reservations_path"])
         archive_path = Path(self.configuration["archive_path"])
         temp_path = Path(os.path.join(archive_path, "tmp"))
         error_path = Path(os.path.join(archive_path, "error"))
+        batch_size = self.configuration["source_config"].get("reservations_batch_size", None)
+        batch_size = int(batch_size) if batch_size is not None else None
+        max_workers = int(self.configuration["source_config"].get("max_workers", 1))
         # endregion
 
         # region Create paths if not exists
@@ -237,204 +326,383 @@ class LocalExtractEngine(ExtractEngineBase):
         # endregion
 
         Logger.info("Loading reservations JSON file(s)...")
-        json_filenames = [p.name for p in reservations_path.glob("*.json")]
+        # Files are processed in filename order to keep the batch order deterministic
+        json_filenames = sorted(p.name for p in reservations_path.glob("*.json"))
 
         if len(json_filenames) == 0:
-            # region No CSV files found
+            # region No JSON files found
             Logger.info("No reservations JSON files found!")
-            return None
+            return
+            # endregion
+
+        if max_workers > 1 and len(json_filenames) > 1:
+            # region Validate and convert files in parallel worker processes
+            Logger.info(f"Processing {len(json_filenames)} reservations JSON files with {max_workers} workers...")
+            # Workers write the converted batches into batch files, leftovers of an interrupted run are removed
+            batches_path = temp_path / "batches"
+            batches_path.mkdir(parents=True, exist_ok=True)
+            for batch_filepath in batches_path.glob("*.pkl"):
+                batch_filepath.unlink()
+
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                # Keep a bounded number of files in flight and yield the results in submission order
+                pending_files = deque()
+                for json_filename in json_filenames:
+                    temp_filepath = self._move_to_temp(source_filepath=Path(os.path.join(reservations_path, json_filename)),
+                                                       temp_path=temp_path)
+                    pending_files.append(executor.submit(_extract_reservation_file,
+                                                         self.configuration,
+                                                         json_filename,
+                                                         temp_filepath,
+                                                         batches_path,
+                                                         batch_size))
+                    if len(pending_files) >= max_workers * 2:
+                        yield from self._load_batch_files(pending_files.popleft().result())
+
+                while pending_files:
+                    yield from self._load_batch_files(pending_files.popleft().result())
             # endregion
         else:
+            for json_filename in json_filenames:
+                temp_filepath = self._move_to_temp(source_filepath=Path(os.path.join(reservations_path, json_filename)),
+                                                   temp_path=temp_path)
+                yield from self._iter_file_batches(json_filename=json_filename,
+                                                   temp_filepath=temp_filepath,
+                                                   batch_size=batch_size)
+
+    @staticmethod
+    def _load_batch_files(batch_files: List[Tuple[Dict[str, Any], Path]]
+                          ) -> Iterator[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """
+        Load the batches written by a worker process one by one, batch files are deleted after they are loaded
+        """
+        for file_info, batch_filepath in batch_files:
+            with open(batch_filepath, "rb") as file:
+                df_imports, df_stay_dates, df_rejected_imports = pickle.load(file)
+            batch_filepath.unlink()
+            yield file_info, df_imports, df_stay_dates, df_rejected_imports
 
-            validated_reservations: List[Dict[str, Any]] = []
+    def iter_reservation_files(self) -> Iterator[Dict[str, Any]]:
+        """
+        Move reservation JSON files to tmp folder one by one (filename order) and yield their file info
+        """
 
-            ingested_reservations: List[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]] = []
+        # region Read configuration parameters
+        reservations_path = Path(self.configuration["source_config"]["reservations_path"])
+        archive_path = Path(self.configuration["archive_path"])
+        temp_path = Path(os.path.join(archive_path, "tmp"))
+        # endregion
 
-            for json_filename in json_filenames:
+        # region Create paths if not exists
+        reservations_path.mkdir(parents=True, exist_ok=True)
+        temp_path.mkdir(parents=True, exist_ok=True)
+        # endregion
 
-                # region Move reservation JSON file to tmp folder
-                json_path = Path(os.path.join(reservations_path, json_filename))
-                temp_filepath = Path(
-                    os.path.join(temp_path,
-                                 f"tmp_{json_filename.split('.')[0]}_{str(datetime.now().timestamp()).replace('.', '_')}.json")
-                )
-                json_path.rename(temp_filepath)
-                # endregion
+        json_filenames = sorted(p.name for p in reservations_path.glob("*.json"))
+        if len(json_filenames) == 0:
+            Logger.info("No reservations JSON files found!")
+            return
 
-                # region Validate reservations
-                validation_result = self.validate_reservation(filepath=temp_filepath)
-                if validation_result:
-                    valid_rows, invalid_rows = validation_result
-                    validated_reservations.append(dict(
-                        filename=json_filename,
-                        valid_rows=valid_rows,
-                        invalid_rows=invalid_rows,
-                        error=None
-                    ))
-                else:
-                    validated_reservations.append(dict(
-                        filename=json_filename,
-                        error=ValidationError(message="Error reading JSON file")
-                    ))
-                # endregion
+        for json_filename in json_filenames:
+            temp_filepath = self._move_to_temp(source_filepath=Path(os.path.join(reservations_path, json_filename)),
+                                               temp_path=temp_path)
+            yield dict(original_filename=json_filename,
+                       temporary_filepath=temp_filepath)
 
-                # region Convert to DataFrames and file information dictionary
-                df_imports, df_stay_dates, df_rejected_imports = self.reservations_to_dataframe(validated_reservations)
-                ingested_reservations.append(
-                    (
-                        dict(original_filename=json_filename,
-                             temporary_filepath=temp_filepath),
-                        df_imports,
-                        df_stay_dates,
-                        df_rejected_imports
-                    )
-                )
-                # endregion
+    def iter_reservation_chunks(self,
+                                filepath: Path,
+                                batch_size: Optional[int] = None) -> Iterator[Path]:
+        """
+        Split the `data` array of a reservation JSON file into JSON array files of batch_size reservations (all
+        reservations if None) under the tmp folder and yield their paths one by one. Items are copied as JSON text,
+        so only one chunk is kept in memory. A chunk file is deleted when the next one is requested
+        Raises KeyError if the reservations list is not found
+        """
+        chunk_path = Path(self.configuration["archive_path"]) / "tmp" / "chunks"
+        chunk_path.mkdir(parents=True, exist_ok=True)
+
+        reservations = iter_json_array(filepath=str(filepath), key="data", raw=True)
+        chunk_number = 0
+        while True:
+            chunk = list(islice(reservations, batch_size))
+            if len(chunk) == 0:
+                return
+
+            chunk_number += 1
+            chunk_filepath = chunk_path / f"{filepath.stem}__{chunk_number}.json"
+            with open(chunk_filepath, "w", encoding="utf-8") as file:
+                file.write("[" + ",\n".join(chunk) + "]")
+            del chunk
+
+            try:
+                yield chunk_filepath
+            finally:
+                chunk_filepath.unlink(missing_ok=True)
+
+    def _move_to_temp(self, source_filepath: Path, temp_path: Path) -> Path:
+        """
+        Move reservation JSON file to tmp folder
+        """
+        temp_filepath = Path(
+            os.path.join(temp_path,
+                         f"tmp_{source_filepath.name.split('.')[0]}_{str(datetime.now().timestamp()).replace('.', '_')}.json")
+        )
+        source_filepath.rename(temp_filepath)
+        return temp_filepath
+
+    def _iter_file_batches(self,
+                           json_filename: str,
+                           temp_filepath: Path,
+                           batch_size: Optional[int] = None
+                           ) -> Iterator[Tuple[Dict[str, Any], pd.DataFrame, pd.DataFrame, pd.DataFrame]]:
+        """
+        Validate a single reservation JSON file and convert every validated batch into DataFrames
+        The last batch of the file is flagged with is_last_batch, so the file can be archived after it is processed
+        """
+
+        def file_info(batch_number: int, is_last_batch: bool) -> Dict[str, Any]:
+            return dict(original_filename=json_filename,
+                        temporary_filepath=temp_filepath,
+                        batch_number=batch_number,
+                        is_last_batch=is_last_batch)
 
-            return ingested_reservations
+        batch_number = 0
+        is_completed = False
+        read_error = None
+
+        if not file_exists(filepath=str(temp_filepath)):
+            Logger.error(message=f"Reservations JSON file '{str(temp_filepath)}' not found")
+
+        try:
+
+            # region Validate and convert reservations batch by batch
+            Logger.info(f"Reading '{str(temp_filepath)}' JSON file...")
+            for valid_rows, invalid_rows, is_last_batch in self.iter_validated_reservations(filepath=temp_filepath,
+                                                                                            batch_size=batch_size):
+                batch_number += 1
+                df_imports, df_stay_dates, df_rejected_imports = self.reservations_to_dataframe([dict(
+                    filename=json_filename,
+                    valid_rows=valid_rows,
+                    invalid_rows=invalid_rows,
+                    error=None
+                )])
+                is_completed = is_last_batch
+                yield file_info(batch_number, is_last_batch), df_imports, df_stay_dates, df_rejected_imports
+            # endregion
+
+        except KeyError:
+            Logger.error(f"Reservations list not found in JSON file")
+            read_error = ValidationError(message="Error reading JSON file")
+
+        except Exception as e:
+            Logger.error(message=f"Error reading '{str(temp_filepath)}' JSON file",
+                         err=e,
+                         include_stack_trace=True)
+            read_error = ValidationError(message="Error reading JSON file")
+
+        if not is_completed:
+            # region Empty or unreadable file, generate an empty last batch to complete the file
+            df_imports, df_stay_dates, df_rejected_imports = self.reservations_to_dataframe([dict(
+                filename=json_filename,
+                valid_rows=[],
+                invalid_rows=[],
+                error=read_error
+            )])
+            yield file_info(batch_number + 1, True), df_imports, df_stay_dates, df_rejected_imports
+            # endregion
 
     def reservations_to_dataframe(self,
                                   reservation_imports: List[Dict[str, Any]]
                                   ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
         Convert processed reservations into DataFrames
+        Rows are written into typed, preallocated column buffers (no row dicts, no object dtype copies).
+        Dates are buffered as epoch integers and viewed as datetime64, low cardinality string columns are
+        categorical, missing F&B amounts are masked (nullable Float64)
         """
 
-        import_rows = []
-        stay_date_rows = []
-        rejected_rows = []
+        reservation_imports = [r for r in reservation_imports if not self._has_pre_process_error(r)]
+        ingested_at = datetime.now()
+
+        # region Allocate column buffers
+        import_count = sum(len(r["valid_rows"]) for r in reservation_imports)
+        stay_date_count = sum(len(res["stay_dates"]) for r in reservation_imports for res in r["valid_rows"])
+
+        # reservation_imports
+        hotel_ids = np.empty(import_count, dtype=object)
+        reservation_ids = np.empty(import_count, dtype=object)
+        statuses = np.empty(import_count, dtype=object)
+        arrival_dates = np.empty(import_count, dtype=np.int64)
+        departure_dates = np.empty(import_count, dtype=np.int64)
+        source_names = np.empty(import_count, dtype=object)
+        source_ids = np.empty(import_count, dtype=object)
+        created_ats = np.empty(import_count, dtype=np.int64)
+        updated_ats = np.empty(import_count, dtype=np.int64)
+        source_filenames = np.empty(import_count, dtype=object)
+        reservation_hashes = np.empty(import_count, dtype=np.uint64)
+
+        # reservation_stay_dates
+        stay_hotel_ids = np.empty(stay_date_count, dtype=object)
+        stay_reservation_ids = np.empty(stay_date_count, dtype=object)
+        start_dates = np.empty(stay_date_count, dtype=np.int64)
+        end_dates = np.empty(stay_date_count, dtype=np.int64)
+        room_type_ids = np.empty(stay_date_count, dtype=object)
+        room_type_names = np.empty(stay_date_count, dtype=object)
+        numbers_of_adults = np.empty(stay_date_count, dtype=np.int64)
+        numbers_of_children = np.empty(stay_date_count, dtype=np.int64)
+        revenue_gross_amounts = np.empty(stay_date_count, dtype=np.float64)
+        revenue_net_amounts = np.empty(stay_date_count, dtype=np.float64)
+        fnb_gross_amounts = np.zeros(stay_date_count, dtype=np.float64)
+        fnb_gross_amounts_missing = np.zeros(stay_date_count, dtype=bool)
+        fnb_net_amounts = np.zeros(stay_date_count, dtype=np.float64)
+        fnb_net_amounts_missing = np.zeros(stay_date_count, dtype=bool)
+        stay_created_ats = np.empty(stay_date_count, dtype=np.int64)
+        stay_updated_ats = np.empty(stay_date_count, dtype=np.int64)
+        stay_reservation_hashes = np.empty(stay_date_count, dtype=np.uint64)
+        stay_date_hashes = np.empty(stay_date_count, dtype=np.uint64)
+        # endregion
 
-        # region Create rows for reservation_imports and reservation_stay_dates
+        # region Fill reservation_imports and reservation_stay_dates buffers
         Logger.info("Generating import rows...")
+        i = 0
+        j = 0
         for reservation_import in reservation_imports:
 
-            pre_process_error = reservation_import.get("error", None)
-            if  pre_process_error:
-                Logger.warning(f"Reservation import error. {pre_process_error}. Skipping...")
-                continue
-
-            # region Generate VALID rows
-
             for reservation in reservation_import["valid_rows"]:
 
-                reservation_hash = calculate_row_hash(row=reservation)
-
-                # region Generate reservation_imports row
-                import_rows.append(dict(
-                    hotel_id=reservation["hotel_id"],
-                    reservation_id=reservation["reservation_id"],
-                    status=reservation["status"],
-                    arrival_date=cast_date(value=reservation["arrival_date"],
-                                           pattern="%Y-%m-%d"),
-                    departure_date=cast_date(value=reservation["departure_date"],
-                                             pattern="%Y-%m-%d"),
-                    source_name=reservation.get("source_name", None),
-                    source_id=reservation.get("source_id", None),
-                    created_at=cast_datetime(value=reservation["created_at"],
-                                             pattern="%Y-%m-%d %H:%M:%S.%f"),
-                    updated_at = cast_datetime(value=reservation["updated_at"],
-                                               pattern="%Y-%m-%d %H:%M:%S.%f"),
-                    source_filename=reservation_import["filename"],
-                    ingested_at=datetime.now(),
-                    reservation_hash=reservation_hash
-                ))
+                reservation_hash = calculate_row_fingerprint(row=reservation)
+                hotel_id = reservation["hotel_id"]
+                reservation_id = reservation["reservation_id"]
+                # Parsed once per reservation and shared by its stay date rows
+                created_at = to_epoch_microseconds(cast_datetime(value=reservation["created_at"],
+                                                                 pattern="%Y-%m-%d %H:%M:%S.%f"))
+                updated_at = to_epoch_microseconds(cast_datetime(value=reservation["updated_at"],
+                                                                 pattern="%Y-%m-%d %H:%M:%S.%f"))
+
+                # region reservation_imports row
+                hotel_ids[i] = hotel_id
+                reservation_ids[i] = reservation_id
+                statuses[i] = reservation["status"]
+                arrival_dates[i] = to_epoch_days(cast_date(value=reservation["arrival_date"], pattern="%Y-%m-%d"))
+                departure_dates[i] = to_epoch_days(cast_date(value=reservation["departure_date"], pattern="%Y-%m-%d"))
+                source_names[i] = reservation.get("source_name", None)
+                source_ids[i] = reservation.get("source_id", None)
+                created_ats[i] = created_at
+                updated_ats[i] = updated_at
+                source_filenames[i] = reservation_import["filename"]
+                reservation_hashes[i] = reservation_hash
+                i += 1
                 # endregion
 
-                # region Generate reservation_stay_dates rows
+                # region reservation_stay_dates rows
                 for stay_date in reservation["stay_dates"]:
-                    stay_date_rows.append(dict(
-                        hotel_id=reservation["hotel_id"],
-                        reservation_id=reservation["reservation_id"],
-                        start_date=cast_date(value=stay_date["start_date"],
-                                            pattern="%Y-%m-%d"),
-                        end_date=cast_date(value=stay_date["end_date"],
-                                           pattern="%Y-%m-%d"),
-                        room_type_id=stay_date["room_type_id"],
-                        room_type_name=stay_date["room_type_name"],
-                        number_of_adults=int(stay_date["number_of_adults"]),
-                        number_of_children=int(stay_date["number_of_children"]),
-                        revenue_gross_amount=float(stay_date["room_revenue_gross_amount"]),
-                        revenue_net_amount=float(stay_date["room_revenue_net_amount"]),
-                        fnb_gross_amount=float(
-                            stay_date["fnb_gross_amount"]) if "fnb_gross_amount" in stay_date else None,
-                        fnb_net_amount=float(
-                            stay_date["fnb_net_amount"]) if "fnb_net_amount" in stay_date else None,
-                        created_at=cast_datetime(value=reservation["created_at"],
-                                                 pattern="%Y-%m-%d %H:%M:%S.%f"),
-                        updated_at=cast_datetime(value=reservation["updated_at"],
-                                                 pattern="%Y-%m-%d %H:%M:%S.%f"),
-                        ingested_at=datetime.now(),
-                        reservation_hash=reservation_hash,
-                        stay_date_hash=calculate_row_hash(row=stay_date)
-                    ))
+                    stay_hotel_ids[j] = hotel_id
+                    stay_reservation_ids[j] = reservation_id
+                    start_dates[j] = to_epoch_days(cast_date(value=stay_date["start_date"], pattern="%Y-%m-%d"))
+                    end_dates[j] = to_epoch_days(cast_date(value=stay_date["end_date"], pattern="%Y-%m-%d"))
+                    room_type_ids[j] = stay_date["room_type_id"]
+                    room_type_names[j] = stay_date["room_type_name"]
+                    numbers_of_adults[j] = int(stay_date["number_of_adults"])
+                    numbers_of_children[j] = int(stay_date["number_of_children"])
+                    revenue_gross_amounts[j] = float(stay_date["room_revenue_gross_amount"])
+                    revenue_net_amounts[j] = float(stay_date["room_revenue_net_amount"])
+                    if "fnb_gross_amount" in stay_date:
+                        fnb_gross_amounts[j] = float(stay_date["fnb_gross_amount"])
+                    else:
+                        fnb_gross_amounts_missing[j] = True
+                    if "fnb_net_amount" in stay_date:
+                        fnb_net_amounts[j] = float(stay_date["fnb_net_amount"])
+                    else:
+                        fnb_net_amounts_missing[j] = True
+                    stay_created_ats[j] = created_at
+                    stay_updated_ats[j] = updated_at
+                    stay_reservation_hashes[j] = reservation_hash
+                    stay_date_hashes[j] = calculate_row_fingerprint(row=stay_date)
+                    j += 1
                 # endregion
 
-            # endregion
-
-            # region Generate INVALID rows
-            for rejected_reservation in reservation_import["invalid_rows"]:
-                rejected_rows.append(dict(
-                    rejected_row=rejected_reservation["row"],
-                    validation_errors=rejected_reservation["validation_errors"],
-                    source_filename=reservation_import["filename"],
-                    ingested_at=datetime.now()
-                ))
-            # endregion
-
         Logger.success("Done!")
         # endregion
 
-        # region Generate Import DataFrames
-        Logger.info("Generating imports DataFrames...")
-        reservation_imports_columns = [
-            "hotel_id",
-            "reservation_id",
-            "status",
-            "arrival_date",
-            "departure_date",
-            "source_name",
-            "source_id",
-            "created_at",
-            "updated_at",
-            "source_filename",
-            "ingested_at",
-            "reservation_hash"
-        ]
-        reservation_stay_dates_columns = [
-            "hotel_id",
-            "reservation_id",
-            "start_date",
-            "end_date",
-            "room_type_id",
-            "room_type_name",
-            "number_of_adults",
-            "number_of_children",
-            "revenue_gross_amount",
-            "revenue_net_amount",
-            "fnb_gross_amount",
-            "fnb_net_amount",
-            "created_at",
-            "updated_at",
-            "ingested_at",
-            "reservation_hash",
-            "stay_date_hash"
+        # region Generate rejected_imports rows
+        # Rejected rows keep the original (nested) JSON values, serialized as compact JSON text
+        rejected_rows = [
+            rejected_reservation
+            for reservation_import in reservation_imports
+            for rejected_reservation in reservation_import["invalid_rows"]
         ]
-        rejected_imports_columns = [
-            "rejected_row",
-            "validation_errors",
-            "source_filename",
-            "ingested_at"
+        rejected_sources = [
+            reservation_import["filename"]
+            for reservation_import in reservation_imports
+            for _ in reservation_import["invalid_rows"]
         ]
+        # endregion
 
-        df_reservation_imports = pd.DataFrame(columns=reservation_imports_columns, data=import_rows).replace({np.nan: None})
-        df_reservation_stay_dates = pd.DataFrame(columns=reservation_stay_dates_columns, data=stay_date_rows).replace({np.nan: None})
-        df_rejected_imports = pd.DataFrame(columns=rejected_imports_columns, data=rejected_rows).replace({np.nan: None})
+        # region Generate Import DataFrames
+        Logger.info("Generating imports DataFrames...")
+        ingested_at = np.datetime64(ingested_at, "us")
+
+        df_reservation_imports = pd.DataFrame(dict(
+            hotel_id=pd.Categorical(hotel_ids),
+            reservation_id=reservation_ids,
+            status=pd.Categorical(statuses),
+            arrival_date=arrival_dates.view("datetime64[D]"),
+            departure_date=departure_dates.view("datetime64[D]"),
+            source_name=pd.Categorical(source_names),
+            source_id=pd.Categorical(source_ids),
+            created_at=created_ats.view("datetime64[us]"),
+            updated_at=updated_ats.view("datetime64[us]"),
+            source_filename=pd.Categorical(source_filenames),
+            ingested_at=np.full(import_count, ingested_at),
+            reservation_hash=reservation_hashes
+        ))
+        df_reservation_stay_dates = pd.DataFrame(dict(
+            hotel_id=pd.Categorical(stay_hotel_ids),
+            reservation_id=stay_reservation_ids,
+            start_date=start_dates.view("datetime64[D]"),
+            end_date=end_dates.view("datetime64[D]"),
+            room_type_id=pd.Categorical(room_type_ids),
+            room_type_name=pd.Categorical(room_type_names),
+            number_of_adults=numbers_of_adults,
+            number_of_children=numbers_of_children,
+            revenue_gross_amount=revenue_gross_amounts,
+            revenue_net_amount=revenue_net_amounts,
+            fnb_gross_amount=pd.arrays.FloatingArray(fnb_gross_amounts, fnb_gross_amounts_missing),
+            fnb_net_amount=pd.arrays.FloatingArray(fnb_net_amounts, fnb_net_amounts_missing),
+            created_at=stay_created_ats.view("datetime64[us]"),
+            updated_at=stay_updated_ats.view("datetime64[us]"),
+            ingested_at=np.full(stay_date_count, ingested_at),
+            reservation_hash=stay_reservation_hashes,
+            stay_date_hash=stay_date_hashes
+        ))
+        df_rejected_imports = pd.DataFrame(dict(
+            rejected_row=pd.Series([self._to_json_text(r["row"]) for r in rejected_rows], dtype=object),
+            validation_errors=pd.Series([self._to_json_text(r["validation_errors"]) for r in rejected_rows],
+                                        dtype=object),
+            source_filename=pd.Categorical(rejected_sources),
+            ingested_at=np.full(len(rejected_rows), ingested_at)
+        ))
         Logger.success("Done!")
         # endregion
 
         return df_reservation_imports, df_reservation_stay_dates, df_rejected_imports
 
-    def validate_reservation(self, filepath: Path) -> Optional[Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]]:
+    @staticmethod
+    def _to_json_text(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def _has_pre_process_error(reservation_import: Dict[str, Any]) -> bool:
+        pre_process_error = reservation_import.get("error", None)
+        if pre_process_error:
+            Logger.warning(f"Reservation import error. {pre_process_error}. Skipping...")
+            return True
+        return False
+
+    def validate_reservation(self,
+                             filepath: Path,
+                             batch_size: Optional[int] = None
+                             ) -> Optional[Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]]:
         """
         Load and validate reservations
         """
@@ -444,302 +712,242 @@ class LocalExtractEngine(ExtractEngineBase):
 
         try:
 
-            # region Read JSON file content
             Logger.info(f"Reading '{str(filepath)}' JSON file...")
-            with open(str(filepath), "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if "data" not in data:
-                    Logger.error(f"Reservations list not found in JSON file")
-                    return None
-                else:
-                    data = data["data"]
-            Logger.success(f"Done! {len(data)} rows loaded!")
-            # endregion
 
             valid_reservations = []
             invalid_reservations = []
 
-            # region Ingestion and Logic level validations
+            for valid_rows, invalid_rows, _ in self.iter_validated_reservations(filepath=filepath,
+                                                                                batch_size=batch_size):
+                valid_reservations.extend(valid_rows)
+                invalid_reservations.extend(invalid_rows)
 
-            for res in data:
-
-                reservation_validation_errors: List[ValidationError] = []
+            return valid_reservations, invalid_reservations
 
-                # region INGESTION LEVEL Validations
+        except KeyError:
+            Logger.error(f"Reservations list not found in JSON file")
+            return None
 
-                # region hotel_id
-                valid, validation_error = validate_string(json_value=res,
-                                                          field_name="hotel_id",
-                                                          allow_empty_string=False)
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+        except Exception as e:
+            Logger.error(message=f"Error reading '{str(filepath)}' JSON file",
+                         err=e,
+                         include_stack_trace=True)
+            return None
 
-                # region reservation_id
-                valid, validation_error = validate_string(json_value=res,
-                                                          field_name="reservation_id",
-                                                          allow_empty_string=False)
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+    def iter_validated_reservations(self,
+                                    filepath: Path,
+                                    batch_size: Optional[int] = None
+                                    ) -> Iterator[Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]], bool]]:
+        """
+        Validate reservations and yield (valid_rows, invalid_rows, is_last_batch) for every batch of `batch_size`
+        reservations. If `batch_size` is set, JSON file is streamed one reservation at a time.
+        Otherwise, it is loaded at once. Raises KeyError if reservations list not found in JSON file
+        """
+        row_count = 0
+        for reservations, is_last_batch in self._read_reservations(filepath=filepath, batch_size=batch_size):
+            row_count += len(reservations)
+            valid_rows, invalid_rows = self.validate_reservation_rows(reservations=reservations)
+            yield valid_rows, invalid_rows, is_last_batch
+        Logger.success(f"Done! {row_count} rows loaded!")
+
+    def _read_reservations(self,
+                           filepath: Path,
+                           batch_size: Optional[int] = None) -> Iterator[Tuple[List[Dict[Any, Any]], bool]]:
+        """
+        Read reservations from JSON file as (reservations, is_last_batch) batches
+        """
+        if batch_size is None:
+            # region Read JSON file content at once
+            with open(str(filepath), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if "data" not in data:
+                raise KeyError("data")
+            yield data["data"], True
+            # endregion
+        else:
+            # region Stream JSON file content
+            # Look one reservation ahead to flag the last batch without holding an extra batch in memory
+            reservations = iter_json_array(filepath=str(filepath), key="data")
+            end_of_file = object()
+            batch = []
+            reservation = next(reservations, end_of_file)
+            while reservation is not end_of_file:
+                batch.append(reservation)
+                reservation = next(reservations, end_of_file)
+                if len(batch) >= batch_size or reservation is end_of_file:
+                    yield batch, reservation is end_of_file
+                    batch = []
+            # endregion
 
-                # region status
-                valid, validation_error = validate_string(json_value=res,
-                                                          field_name="status",
-                                                          allow_empty_string=False,
-                                                          allowed_values=[
-                                                              "provisional",
-                                                              "waiting_list",
-                                                              "confirmed",
-                                                              "cancelled",
-                                                              "no_show",
-                                                              "checked_in",
-                                                              "checked_out"
-                                                          ])
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+    def validate_reservation_rows(self,
+                                  reservations: List[Dict[Any, Any]]
+                                  ) -> Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]:
+        """
+        Run ingestion and logic level validations with the configured validation engine (row, columnar)
+        and split reservations into valid and invalid rows
+        """
+        validation_engine = self.configuration["source_config"].get("validation_engine", "row")
+        if validation_engine == "columnar":
+            return ColumnarReservationValidator(row_validator=self._validate_reservation_rows).validate(
+                reservations=reservations)
+        return self._validate_reservation_rows(reservations=reservations)
+
+    def _validate_reservation_rows(self,
+                                   reservations: List[Dict[Any, Any]]
+                                   ) -> Tuple[List[Dict[Any, Any]], List[Dict[Any, Any]]]:
+        """
+        Row-wise validation: run ingestion and logic level validations reservation by reservation,
+        ingestion level rules are the compiled plans of `schema/reservations.json`
+        """
+        reservation_plan = load_validation_plan(schema_name="reservations", entity="reservation")
+        stay_date_plan = load_validation_plan(schema_name="reservations", entity="stay_date")
 
-                # region departure_date
-                valid, validation_error = validate_date(json_value=res,
-                                                        field_name="departure_date",
-                                                        pattern="%Y-%m-%d")
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+        valid_reservations = []
+        invalid_reservations = []
 
-                # region arrival_date
-                valid, validation_error = validate_date(json_value=res,
-                                                        field_name="arrival_date",
-                                                        pattern="%Y-%m-%d")
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+        # region Ingestion and Logic level validations
 
-                # region created_at
-                valid, validation_error = validate_datetime(json_value=res,
-                                                            field_name="created_at",
-                                                            pattern="%Y-%m-%d %H:%M:%S.%f")
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+        for res in reservations:
 
-                # region updated_at
-                valid, validation_error = validate_datetime(json_value=res,
-                                                            field_name="updated_at",
-                                                            pattern="%Y-%m-%d %H:%M:%S.%f")
-                if not valid:
-                    reservation_validation_errors.append(validation_error)
-                # endregion
+            # region INGESTION LEVEL Validations
+            reservation_validation_errors, reservation_values = reservation_plan.validate(res)
+            # endregion
 
+            # region If there is no ingestion level validation errors, run LOGIC LEVEL validations
+            if not reservation_validation_errors:
+
+                # region arrival_date should be less than departure_date
+                arrival_date = reservation_values["arrival_date"]
+                departure_date = reservation_values["departure_date"]
+                if not arrival_date < departure_date:
+                    reservation_validation_errors.append(ValidationError(
+                        message=f"arrival_date '{arrival_date}' should be less than departure_date '{departure_date}'",
+                        field_name="arrival_date",
+                        value=arrival_date
+                    ))
                 # endregion
 
-                # region If there is no ingestion level validation errors, run LOGIC LEVEL validations
-                if not reservation_validation_errors:
-
-                    # region arrival_date should be less than departure_date
-                    arrival_date = cast_date(value=res["arrival_date"], pattern="%Y-%m-%d")
-                    departure_date = cast_date(value=res["departure_date"], pattern="%Y-%m-%d")
-                    if not arrival_date < departure_date:
-                        reservation_validation_errors.append(ValidationError(
-                            message=f"arrival_date '{arrival_date}' should be less than departure_date '{departure_date}'",
-                            field_name="arrival_date",
-                            value=arrival_date
-                        ))
-                    # endregion
-
-                    # region updated_at should be greater than or equal to created_at
-                    created_at = cast_datetime(value=res["created_at"],
-                                               pattern="%Y-%m-%d %H:%M:%S.%f")
-                    updated_at = cast_datetime(value=res["updated_at"],
-                                               pattern="%Y-%m-%d %H:%M:%S.%f")
-                    if not updated_at >= created_at:
-                        reservation_validation_errors.append(ValidationError(
-                            message=f"updated_at '{updated_at}' should be greater than or equal to created_at '{created_at}'",
-                            field_name=updated_at,
-                            value=updated_at
-                        ))
-                    # endregion
-
+                # region updated_at should be greater than or equal to created_at
+                created_at = reservation_values["created_at"]
+                updated_at = reservation_values["updated_at"]
+                if not updated_at >= created_at:
+                    reservation_validation_errors.append(ValidationError(
+                        message=f"updated_at '{updated_at}' should be greater than or equal to created_at '{created_at}'",
+                        field_name=updated_at,
+                        value=updated_at
+                    ))
                 # endregion
 
-                # region stay_dates
-                valid_stay_dates = []
-                invalid_stay_dates = []
-
-                if "stay_dates" not in res or not isinstance(res["stay_dates"], list) or len(res["stay_dates"]) == 0:
-                    reservation_validation_errors.append(ValidationError(message="stay_dates missing or invalid"))
-                else:
-                    stay_dates = res["stay_dates"]
-
-                    for stay_date in stay_dates:
-
-                        stay_dates_validation_errors: List[ValidationError] = []
-
-                        # region INGESTION LEVEL Validations
-
-                        # region start_date
-                        valid, validation_error = validate_date(json_value=stay_date,
-                                                                field_name="start_date",
-                                                                pattern="%Y-%m-%d")
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
-
-                        # region end_date
-                        valid, validation_error = validate_date(json_value=stay_date,
-                                                                field_name="end_date",
-                                                                pattern="%Y-%m-%d")
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
-
-                        # region room_type_id
-                        valid, validation_error = validate_string(json_value=stay_date,
-                                                                  field_name="room_type_id",
-                                                                  allow_empty_string=False)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
-
-                        # region room_type_name
-                        valid, validation_error = validate_string(json_value=stay_date,
-                                                                  field_name="room_type_name",
-                                                                  allow_empty_string=False)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
+            # endregion
 
-                        # region number_of_adults
-                        valid, validation_error = validate_int(json_value=stay_date,
-                                                               field_name="number_of_adults",
-                                                               min_value=1)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
+            # region stay_dates
+            valid_stay_dates = []
+            invalid_stay_dates = []
 
-                        # region number_of_children
-                        valid, validation_error = validate_int(json_value=stay_date,
-                                                               field_name="number_of_children",
-                                                               min_value=0)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
+            if "stay_dates" not in res or not isinstance(res["stay_dates"], list) or len(res["stay_dates"]) == 0:
+                reservation_validation_errors.append(ValidationError(message="stay_dates missing or invalid"))
+            else:
+                stay_dates = res["stay_dates"]
 
-                        # region room_revenue_gross_amount
-                        valid, validation_error = validate_number(json_value=stay_date,
-                                                                  field_name="room_revenue_gross_amount",
-                                                                  allow_int=True)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
+                for stay_date in stay_dates:
 
-                        # region room_revenue_net_amount
-                        valid, validation_error = validate_number(json_value=stay_date,
-                                                                  field_name="room_revenue_net_amount",
-                                                                  allow_int=True)
-                        if not valid:
-                            stay_dates_validation_errors.append(validation_error)
-                        # endregion
+                    # region INGESTION LEVEL Validations
+                    stay_dates_validation_errors, stay_date_values = stay_date_plan.validate(stay_date)
+                    # endregion
 
-                        # region fnb_gross_amount
-                        if "fnb_gross_amount" in stay_date:
-                            valid, validation_error = validate_number(json_value=stay_date,
-                                                                      field_name="fnb_gross_amount",
-                                                                      allow_int=True)
-                            if not valid:
-                                stay_dates_validation_errors.append(validation_error)
-                        # endregion
+                    # region If there is no ingestion level validation error, run LOGIC LEVEL validations
 
-                        # region fnb_net_amount
-                        if "fnb_net_amount" in stay_date:
-                            valid, validation_error = validate_number(json_value=stay_date,
-                                                                      field_name="fnb_net_amount",
-                                                                      allow_int=True)
-                            if not valid:
-                                stay_dates_validation_errors.append(validation_error)
-                        # endregion
+                    if not stay_dates_validation_errors:
 
+                        # region start_date should be less than or equal to end_date
+                        start_date = stay_date_values["start_date"]
+                        end_date = stay_date_values["end_date"]
+                        if not start_date <= end_date:
+                            stay_dates_validation_errors.append(ValidationError(
+                                message=f"start_date '{start_date}' should be less than or equal to end_date '{end_date}'",
+                                field_name="start_date",
+                                value=stay_date
+                            ))
                         # endregion
 
-                        # region If there is no ingestion level validation error, run LOGIC LEVEL validations
-
-                        if not stay_dates_validation_errors:
+                        # region All dates must be fall within the reservation_period
+                        # Parsed by the reservation plan, missing when the reservation dates are invalid
+                        arrival_date = reservation_values.get("arrival_date", None)
+                        departure_date = reservation_values.get("departure_date", None)
 
-                            # region start_date should be less than or equal to end_date
-                            start_date = cast_date(value=stay_date["start_date"], pattern="%Y-%m-%d")
-                            end_date = cast_date(value=stay_date["end_date"], pattern="%Y-%m-%d")
-                            if not start_date <= end_date:
+                        if arrival_date is None or departure_date is None:
+                            stay_dates_validation_errors.append(ValidationError(
+                                message=f"All dates must be fall within reservation period."
+                                "Invalid arrival_date and/or departure_date"
+                            ))
+                        else:
+                            if not(start_date >= arrival_date and end_date <= departure_date):
                                 stay_dates_validation_errors.append(ValidationError(
-                                    message=f"start_date '{start_date}' should be less than or equal to end_date '{end_date}'",
-                                    field_name="start_date",
-                                    value=stay_date
+                                    message="All dates must be fall within reservation period."
+                                    f"'{start_date}' and '{end_date}' not fall into '{arrival_date}' and '{departure_date}'"
                                 ))
-                            # endregion
-
-                            # region All dates must be fall within the reservation_period
-                            arrival_date = cast_date(value=res.get("arrival_date", None),
-                                                     pattern="%Y-%m-%d",
-                                                     is_safe=True)
-                            departure_date = cast_date(value=res.get("departure_date", None),
-                                                       pattern="%Y-%m-%d",
-                                                       is_safe=True)
 
-                            if arrival_date is None or departure_date is None:
-                                stay_dates_validation_errors.append(ValidationError(
-                                    message=f"All dates must be fall within reservation period."
-                                    "Invalid arrival_date and/or departure_date"
-                                ))
-                            else:
-                                if not(start_date >= arrival_date and end_date <= departure_date):
-                                    stay_dates_validation_errors.append(ValidationError(
-                                        message="All dates must be fall within reservation period."
-                                        f"'{start_date}' and '{end_date}' not fall into '{arrival_date}' and '{departure_date}'"
-                                    ))
+                        # endregion
 
-                            # endregion
+                    # endregion
 
-                        # endregion
+                    if stay_dates_validation_errors:
+                        invalid_stay_dates.append(dict(stay_date=stay_date,
+                                                       validation_errors=[v.to_dict() for v in stay_dates_validation_errors]))
+                    else:
+                        valid_stay_dates.append(stay_date)
 
-                        if stay_dates_validation_errors:
-                            invalid_stay_dates.append(dict(stay_date=stay_date,
-                                                           validation_errors=[v.to_dict() for v in stay_dates_validation_errors]))
-                        else:
-                            valid_stay_dates.append(stay_date)
+            # endregion
 
+            if reservation_validation_errors:
+                # region Reservation is invalid, generate stay_dates VALID + INVALID stay_dates
+                res["stay_dates"] = invalid_stay_dates + [dict(row=r, validation_errors=None) for r in valid_stay_dates]
+                invalid_reservations.append(dict(row=res,
+                                                 validation_errors=[v.to_dict() for v in reservation_validation_errors]))
+                # endregion
+            else:
+                # region Reservation is valid, generate stay_dates just by using VALID stay_dates
+                # Generate new dictionary with valid stay_dates to prevent overwrite the object reference
+                res_valid = {**res, "stay_dates": valid_stay_dates}
+                valid_reservations.append(res_valid)
                 # endregion
 
-                if reservation_validation_errors:
-                    # region Reservation is invalid, generate stay_dates VALID + INVALID stay_dates
-                    res["stay_dates"] = invalid_stay_dates + [dict(row=r, validation_errors=None) for r in valid_stay_dates]
-                    invalid_reservations.append(dict(row=res,
-                                                     validation_errors=[v.to_dict() for v in reservation_validation_errors]))
-                    # endregion
-                else:
-                    # region Reservation is valid, generate stay_dates just by using VALID stay_dates
-                    # Generate new dictionary with valid stay_dates to prevent overwrite the object reference
-                    res_valid = {**res, "stay_dates": valid_stay_dates}
-                    valid_reservations.append(res_valid)
-                    # endregion
+                # region If there is at least one invalid stay_date, add reservation to invalid reservations with invalid stay_date
+                if invalid_stay_dates:
+                    # Generate new dictionary with invalid stay_dates to prevent overwrite the object reference
+                    res_invalid = {**res, "stay_dates": invalid_stay_dates}
+                    invalid_reservations.append(dict(
+                        row=res_invalid,
+                        validation_errors=[]
+                    ))
+                # endregion
 
-                    # region If there is at least one invalid stay_date, add reservation to invalid reservations with invalid stay_date
-                    if invalid_stay_dates:
-                        # Generate new dictionary with invalid stay_dates to prevent overwrite the object reference
-                        res_invalid = {**res, "stay_dates": invalid_stay_dates}
-                        invalid_reservations.append(dict(
-                            row=res_invalid,
-                            validation_errors=[]
-                        ))
-                    # endregion
+        # endregion
 
-            # endregion
+        return valid_reservations, invalid_reservations
 
-            return valid_reservations, invalid_reservations
+    # endregion
 
-        except Exception as e:
-            Logger.error(message=f"Error reading '{str(filepath)}' JSON file",
-                         err=e,
-                         include_stack_trace=True)
-            return None
 
-    # endregion
+def _extract_reservation_file(configuration: Dict[Any, Any],
+                              json_filename: str,
+                              temp_filepath: Path,
+                              batches_path: Path,
+                              batch_size: Optional[int] = None
+                              ) -> List[Tuple[Dict[str, Any], Path]]:
+    """
+    Validate and convert a single reservations JSON file in a worker process
+    Every batch is written into a batch file under batches_path as soon as it is converted, so the worker and the
+    result keep only one batch in memory. Returns the file info and the batch file of every batch, in batch order
+    """
+    engine = LocalExtractEngine(configuration=configuration)
+    batch_files = []
+    for file_info, df_imports, df_stay_dates, df_rejected_imports in engine._iter_file_batches(
+            json_filename=json_filename,
+            temp_filepath=temp_filepath,
+            batch_size=batch_size):
+        batch_filepath = Path(batches_path) / f"{Path(temp_filepath).stem}__{file_info['batch_number']}.pkl"
+        with open(batch_filepath, "wb") as file:
+            pickle.dump((df_imports, df_stay_dates, df_rejected_imports), file, protocol=pickle.HIGHEST_PROTOCOL)
+        batch_files.append((file_info, batch_filepath))
+    return batch_files
@@ -1,3 +1,4 @@
+import uuid
 import pandas as pd
 from pathlib import Path
 from typing import Optional, List
@@ -48,7 +49,8 @@ class KpiCalculator:
 
         # region Calculate KPI
         export_columns = ["NIGHT_OF_STAY", "OCCUPANCY_PERCENTAGE", "TOTAL_NET_REVENUE", "ADR"]
-        df_kpi = self._load_kpi_data()
+        with self._context.db_engine, self._context.db_engine.profiling_stage(stage="kpi", run_id=uuid.uuid4().hex):
+            df_kpi = self._load_kpi_data()
         if self._exclude_dates:
             df_kpi = df_kpi[~df_kpi["NIGHT_OF_STAY"].isin(self._exclude_dates)][export_columns]
         # endregion
@@ -70,15 +72,10 @@ class KpiCalculator:
         """
         try:
 
-            start_date = format_datetime(value=self._start_date, pattern="%Y-%m-%d")
-            end_date = format_datetime(value=self._end_date, pattern="%Y-%m-%d")
-            query = f"""
-            SELECT * 
-            FROM view_kpi 
-            WHERE NIGHT_OF_STAY BETWEEN '{start_date}' AND '{end_date}' 
-            AND HOTEL_ID = {self._hotel_id}
-            """
-            df_kpi = self._context.db_engine.execute(query=query, is_safe=False)
+            df_kpi = self._context.db_engine.load_kpi(hotel_id=self._hotel_id,
+                                                      start_date=self._start_date,
+                                                      end_date=self._end_date,
+                                                      is_safe=False)
             # Convert NIGHT_OF_STAY to date format
             df_kpi["NIGHT_OF_STAY"] = df_kpi["NIGHT_OF_STAY"].dt.date
             return df_kpi
@@ -9,20 +9,32 @@ class Pipeline:
     def __init__(self,
                  config_path: str,
                  run_once: Optional[bool] = None,
-                 schedule_minutes: Optional[int] = None):
+                 schedule_minutes: Optional[int] = None,
+                 maintain: Optional[bool] = None,
+                 retention_days: Optional[int] = None,
+                 compact: Optional[bool] = False,
+                 audit_fingerprints: Optional[bool] = None):
 
         context = PipelineContext(config_filepath=config_path,
                                   read_only=False)
 
-        if run_once is None and (schedule_minutes is None or schedule_minutes < 1):
+        if (run_once is None and maintain is None and audit_fingerprints is None
+                and (schedule_minutes is None or schedule_minutes < 1)):
             raise ArgumentError(message="Error initializing pipeline. Invalid/missing construction parameters!")
 
         self._runner = Runner(config=context.config,
                               db_engine=context.db_engine)
 
-        if run_once:
-            self._runner.run()
-        else:
-            self._runner.start(interval_minutes=schedule_minutes)
+        # Scheduled runs share the database engine (and its connection) until the scheduler stops
+        with context.db_engine:
+            if maintain:
+                self._runner.maintain(retention_days=retention_days,
+                                      compact=compact)
+            elif audit_fingerprints:
+                self._runner.audit_fingerprints()
+            elif run_once:
+                self._runner.run()
+            else:
+                self._runner.start(interval_minutes=schedule_minutes)
 
 
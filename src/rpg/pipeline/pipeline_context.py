@@ -3,7 +3,7 @@ from typing import Dict, Any, Optional
 
 from rpg.utils.logger import Logger
 from rpg.utils.io_util import file_exists
-from rpg.utils.validation_util import validate_string
+from rpg.utils.validation_util import validate_string, validate_int, validate_boolean
 from rpg.db_engine.db_engine_base import DBEngineBase
 from rpg.db_engine.db_engine_factory import load_db_engine
 
@@ -93,6 +93,53 @@ class PipelineContext:
                 raise ValueError(validation_error.message)
             # endregion
 
+            # region inventory_chunk_size (optional)
+            if "inventory_chunk_size" in source_config:
+                valid, validation_error = validate_int(json_value=source_config,
+                                                       field_name="inventory_chunk_size",
+                                                       min_value=1)
+                if not valid:
+                    raise ValueError(validation_error.message)
+            # endregion
+
+            # region reservations_batch_size (optional)
+            if "reservations_batch_size" in source_config:
+                valid, validation_error = validate_int(json_value=source_config,
+                                                       field_name="reservations_batch_size",
+                                                       min_value=1)
+                if not valid:
+                    raise ValueError(validation_error.message)
+            # endregion
+
+            # region validation_engine (optional)
+            if "validation_engine" in source_config:
+                valid, validation_error = validate_string(json_value=source_config,
+                                                          field_name="validation_engine",
+                                                          allow_empty_string=False,
+                                                          allowed_values=["row", "columnar"])
+                if not valid:
+                    raise ValueError(validation_error.message)
+            # endregion
+
+            # region ingestion_mode (optional)
+            if "ingestion_mode" in source_config:
+                valid, validation_error = validate_string(json_value=source_config,
+                                                          field_name="ingestion_mode",
+                                                          allow_empty_string=False,
+                                                          allowed_values=["python", "native"])
+                if not valid:
+                    raise ValueError(validation_error.message)
+            # endregion
+
+            # region max_workers (optional)
+            if "max_workers" in source_config:
+                valid, validation_error = validate_int(json_value=source_config,
+                                                       field_name="max_workers",
+                                                       min_value=1)
+                if not valid:
+                    raise ValueError(validation_error.message)
+            # endregion
+
             # endregion
         elif source_type == "api":
             # region Source Type = API
@@ -147,6 +194,90 @@ class PipelineContext:
             raise ValueError(validation_error.message)
         # endregion
 
+        # region keep_connection_open (optional)
+        if "keep_connection_open" in db_config:
+            valid, validation_error = validate_boolean(json_value=db_config,
+                                                       field_name="keep_connection_open")
+            if not valid:
+                raise ValueError(validation_error.message)
+            if isinstance(db_config["keep_connection_open"], str):
+                db_config["keep_connection_open"] = db_config["keep_connection_open"].strip().lower() == "true"
+        # endregion
+
+        # region shard_count (optional)
+        if "shard_count" in db_config:
+            valid, validation_error = validate_int(json_value=db_config,
+                                                   field_name="shard_count",
+                                                   min_value=1)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region snapshot_path (optional)
+        if "snapshot_path" in db_config:
+            valid, validation_error = validate_string(json_value=db_config,
+                                                      field_name="snapshot_path",
+                                                      allow_empty_string=False)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region retention_days (optional)
+        if "retention_days" in db_config:
+            valid, validation_error = validate_int(json_value=db_config,
+                                                   field_name="retention_days",
+                                                   min_value=0)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region maintenance_interval_hours (optional)
+        if "maintenance_interval_hours" in db_config:
+            valid, validation_error = validate_int(json_value=db_config,
+                                                   field_name="maintenance_interval_hours",
+                                                   min_value=1)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region cluster_tables (optional)
+        if "cluster_tables" in db_config:
+            valid, validation_error = validate_boolean(json_value=db_config,
+                                                       field_name="cluster_tables")
+            if not valid:
+                raise ValueError(validation_error.message)
+            if isinstance(db_config["cluster_tables"], str):
+                db_config["cluster_tables"] = db_config["cluster_tables"].strip().lower() == "true"
+        # endregion
+
+        # region profile_path (optional)
+        if "profile_path" in db_config:
+            valid, validation_error = validate_string(json_value=db_config,
+                                                      field_name="profile_path",
+                                                      allow_empty_string=False)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region profile_slow_query_ms (optional)
+        if "profile_slow_query_ms" in db_config:
+            valid, validation_error = validate_int(json_value=db_config,
+                                                   field_name="profile_slow_query_ms",
+                                                   min_value=0)
+            if not valid:
+                raise ValueError(validation_error.message)
+        # endregion
+
+        # region profile_plans (optional)
+        if "profile_plans" in db_config:
+            valid, validation_error = validate_boolean(json_value=db_config,
+                                                       field_name="profile_plans")
+            if not valid:
+                raise ValueError(validation_error.message)
+            if isinstance(db_config["profile_plans"], str):
+                db_config["profile_plans"] = db_config["profile_plans"].strip().lower() == "true"
+        # endregion
+
         # endregion
 
         # region Archive Path
@@ -169,7 +300,7 @@ class PipelineContext:
         try:
             engine_class = load_db_engine(engine_module=engine_module,
                                           engine_name=engine_name)
-            db_engine = engine_class(database_configuration=db_config)
+            db_engine = engine_class(database_configuration=db_config, read_only=read_only)
             if not read_only:
                 db_engine.initialize_database()
             return db_engine
@@ -1,10 +1,12 @@
+import uuid
 from pathlib import Path
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
 
 from rpg.utils.logger import Logger
 from rpg.pipeline.scheduler import Scheduler
 from rpg.utils.datetime_util import format_datetime
+from rpg.utils.hash_util import FINGERPRINT_BYTES, calculate_row_digest, digest_fingerprint
 from rpg.db_engine.db_engine_base import DBEngineBase
 from rpg.extract.api_extract_engine import ApiExtractEngine
 from rpg.extract.extract_engine_base import ExtractEngineBase
@@ -16,15 +18,111 @@ class Runner:
     def __init__(self, config :Dict[Any, Any], db_engine: DBEngineBase):
         self._config = config
         self._db_engine = db_engine
+        self._last_maintenance_at = None
 
-    def run(self):
-        self._run()
+    def run(self, is_scheduled: Optional[bool] = False):
+        try:
+            # Statements of the run are tagged with the run id and the stage in the query profile
+            with self._db_engine.profiling_stage(stage="ingestion", run_id=uuid.uuid4().hex):
+                if self._run():
+                    # kpi reads the snapshot instead of the database file held by the ingestion
+                    with self._db_engine.profiling_stage(stage="snapshot"):
+                        self._db_engine.publish_snapshot()
+
+            # Scheduled runs maintain the database every maintenance_interval_hours (optional)
+            if is_scheduled and self._is_maintenance_due():
+                self.maintain()
+        finally:
+            # Connection is kept open between scheduled runs unless disabled in db_config. kpi reads the database
+            # file held by the scheduler through the read snapshot (snapshot_path)
+            if not self._config["db_config"].get("keep_connection_open", True):
+                self._db_engine.close()
 
     def start(self, interval_minutes: int):
+        if (self._config["db_config"].get("maintenance_interval_hours") is not None
+                and not self._db_engine.supports_maintenance):
+            Logger.warning(f"Database engine '{type(self._db_engine).__name__}' does not support maintenance, "
+                           f"maintenance_interval_hours is ignored")
         scheduler = Scheduler(interval_minutes=interval_minutes,
-                              runner_func=self.run)
+                              runner_func=lambda: self.run(is_scheduled=True))
         scheduler.start()
 
+    def maintain(self, retention_days: Optional[int] = None, compact: Optional[bool] = False) -> bool:
+        """
+        Archive the superseded reservation versions into the versions archive folder and reclaim their space,
+        re-cluster the fact tables if cluster_tables
+        Returns True if the maintenance succeeded
+        """
+        if not self._db_engine.supports_maintenance:
+            Logger.warning(f"Database engine '{type(self._db_engine).__name__}' does not support maintenance, skipped!")
+            return False
+
+        if retention_days is None:
+            retention_days = int(self._config["db_config"].get("retention_days", 30))
+        archive_path = Path(self._config["archive_path"]) / "versions"
+
+        with self._db_engine.profiling_stage(stage="maintenance", run_id=uuid.uuid4().hex):
+            result = self._db_engine.maintain(archive_path=str(archive_path),
+                                              retention_days=retention_days,
+                                              compact=compact,
+                                              cluster=self._config["db_config"].get("cluster_tables", False))
+        self._last_maintenance_at = datetime.now()
+        return result is not None
+
+    def audit_fingerprints(self) -> int:
+        """
+        Calculate the full SHA-256 hashes of the valid reservations and stay dates of the ingested reservation files
+        (archive success folder) and report the 64-bit fingerprints shared by different rows. Rows with the same
+        fingerprint are stored once, a collision drops the other row. Returns the number of collisions
+        """
+        Logger.info("Auditing reservation fingerprints of the ingested reservation files...")
+        extract_engine = LocalExtractEngine(configuration=self._config)
+        batch_size = self._config["source_config"].get("reservations_batch_size", None)
+        batch_size = int(batch_size) if batch_size is not None else None
+        success_path = Path(self._config["archive_path"]) / "success"
+
+        # Reservation fingerprints are unique keys, stay date fingerprints are unique per reservation
+        reservation_digests = {}
+        stay_date_digests = {}
+        collision_count = 0
+        for filepath in sorted(success_path.glob("*.json")):
+            for valid_rows, _, _ in extract_engine.iter_validated_reservations(filepath=filepath,
+                                                                               batch_size=batch_size):
+                for reservation in valid_rows:
+                    reservation_digest = calculate_row_digest(row=reservation)
+                    reservation_fingerprint = digest_fingerprint(digest=reservation_digest)
+                    if reservation_digests.setdefault(reservation_fingerprint, reservation_digest) != reservation_digest:
+                        collision_count += 1
+                        Logger.warning(f"Reservation fingerprint collision {reservation_fingerprint} "
+                                       f"(reservation_id '{reservation['reservation_id']}', file '{filepath.name}')")
+
+                    for stay_date in reservation["stay_dates"]:
+                        stay_date_digest = calculate_row_digest(row=stay_date)
+                        stay_date_key = (reservation_fingerprint, digest_fingerprint(digest=stay_date_digest))
+                        if stay_date_digests.setdefault(stay_date_key, stay_date_digest) != stay_date_digest:
+                            collision_count += 1
+                            Logger.warning(f"Stay date fingerprint collision {stay_date_key[1]} "
+                                           f"(reservation_id '{reservation['reservation_id']}', "
+                                           f"file '{filepath.name}')")
+
+        # Birthday bound of the reservation fingerprints, n * (n - 1) / 2 pairs of 2^64 values
+        reservation_count = len(reservation_digests)
+        collision_probability = reservation_count * (reservation_count - 1) / 2 ** (FINGERPRINT_BYTES * 8 + 1)
+        message = (f"{reservation_count} reservation version(s) and {len(stay_date_digests)} stay date(s) audited, "
+                   f"{collision_count} fingerprint collision(s) (expected probability {collision_probability:.2e})")
+        if collision_count > 0:
+            Logger.warning(message)
+        else:
+            Logger.success(f"Done! {message}")
+        return collision_count
+
+    def _is_maintenance_due(self) -> bool:
+        maintenance_interval_hours = self._config["db_config"].get("maintenance_interval_hours")
+        if maintenance_interval_hours is None or not self._db_engine.supports_maintenance:
+            return False
+        return (self._last_maintenance_at is None
+                or datetime.now() - self._last_maintenance_at >= timedelta(hours=int(maintenance_interval_hours)))
+
     def _init_extraction_engine(self) -> ExtractEngineBase:
         Logger.info("Initializing extraction engine...")
         source_type = self._config["source_type"]
@@ -35,24 +133,28 @@ class Runner:
         else:
             raise ValueError(f"Source type '{source_type}' not supported!")
 
-    def _run(self):
+    def _run(self) -> bool:
         """
-        Start running ingestion
+        Start running ingestion, returns True if any file is ingested
         """
 
         Logger.info("Ingestion started!")
+
+        # python and native modes calculate different fingerprints, files stay in place if the mode is switched
+        ingestion_mode = self._config["source_config"].get("ingestion_mode", "python")
+        if not self._db_engine.check_ingestion_mode(ingestion_mode=ingestion_mode):
+            raise ValueError(f"Ingestion mode '{ingestion_mode}' does not match the mode of the database!")
+
         extraction_engine = self._init_extraction_engine()
 
         # region Inventory Ingestion
         inventory_extraction_result = extraction_engine.extract_inventory()
+        is_ingested = inventory_extraction_result is not None
         if inventory_extraction_result:
             Logger.info("Processing inventory records...")
             inventory_file_info, df_inventory = inventory_extraction_result
-            pre_query = "UPDATE inventory SET is_active=False"
-            rows = df_inventory.to_dict(orient="records")
-            rows_affected = self._db_engine.insert_rows(table_name="inventory",
-                                                        rows=rows,
-                                                        pre_query=pre_query)
+            with self._db_engine.profiling_stage(stage="inventory"):
+                rows_affected = self._db_engine.ingest_inventory(inventory=df_inventory)
 
             # region Move processed temporary file to success archive folder
             success_archive_path = Path(self._config["archive_path"]) / "success"
@@ -70,79 +172,38 @@ class Runner:
         # endregion
 
         # region Reservations Ingestion
-        reservation_extraction_results = extraction_engine.extract_reservations()
-        if reservation_extraction_results:
-            Logger.info("Processing reservation records...")
-            Logger.info(f"{len(reservation_extraction_results)} batch ingested!")
-            for index,  extraction_result in enumerate(reservation_extraction_results):
-
-                Logger.info(f"Processing Batch #{index + 1} of {len(reservation_extraction_results)}")
-
-                reservations_file_info, df_imports, df_stay_dates, df_rejected_imports = extraction_result
-
-                # region Rejected Rows
-                Logger.info("Processing rejected reservations...")
-                rejected_rows = df_rejected_imports.to_dict(orient="records")
-                self._db_engine.insert_rows(table_name="rejected_imports",
-                                            rows=rejected_rows)
-                Logger.success("Done!")
-                # endregion
-
-                # region Reservations
-                Logger.info("Processing reservations...")
-                reservation_rows = df_imports.to_dict(orient="records")
-                table_name = "reservation_imports"
-                staging_table_name = "staging_reservation_imports"
-                pre_query = f"""
-                CREATE TEMP TABLE {staging_table_name} AS 
-                SELECT * FROM {table_name} WHERE 1=0
-                """
-
-                post_query = f"""
-                INSERT INTO {table_name}
-                SELECT stg.*
-                FROM {staging_table_name} AS stg
-                LEFT JOIN {table_name} AS tbl
-                ON tbl.reservation_hash = stg.reservation_hash
-                WHERE tbl.reservation_hash IS NULL
-                """
-
-                self._db_engine.insert_rows(table_name=staging_table_name,
-                                            pre_query=pre_query,
-                                            post_query=post_query,
-                                            rows=reservation_rows)
-                Logger.success("Done!")
-                # endregion
-
-                # region Reservation Stay Dates
-                Logger.info("Processing reservation stay dates...")
-                stay_date_rows = df_stay_dates.to_dict(orient="records")
-                table_name = "reservation_stay_dates"
-                staging_table_name = "staging_reservation_stay_dates"
-
-                pre_query = f"""
-                CREATE TEMP TABLE {staging_table_name} AS 
-                SELECT * FROM {table_name} WHERE 1=0
-                """
-
-                post_query = f"""
-                INSERT INTO {table_name}
-                SELECT stg.*
-                FROM {staging_table_name} AS stg
-                LEFT JOIN {table_name} AS tbl
-                ON tbl.reservation_hash = stg.reservation_hash
-                AND tbl.stay_date_hash = stg.stay_date_hash
-                WHERE tbl.reservation_hash IS NULL
-                """
-
-                self._db_engine.insert_rows(table_name=staging_table_name,
-                                            pre_query=pre_query,
-                                            post_query=post_query,
-                                            rows=stay_date_rows)
-                Logger.success("Done!")
-                # endregion
-
-                # region Move processed temporary file to success archive folder
+        if ingestion_mode == "native":
+            return self._run_native_reservations_ingestion(extraction_engine=extraction_engine) or is_ingested
+
+        # Batches are consumed one by one as they are extracted, so only one batch is kept in memory
+        batch_count = 0
+        for extraction_result in extraction_engine.iter_reservation_batches():
+
+            batch_count += 1
+            reservations_file_info, df_imports, df_stay_dates, df_rejected_imports = extraction_result
+            Logger.info(f"Processing Batch #{batch_count} "
+                        f"('{reservations_file_info['original_filename']}' "
+                        f"part {reservations_file_info.get('batch_number', 1)})")
+
+            # region Rejected Rows
+            Logger.info("Processing rejected reservations...")
+            with self._db_engine.profiling_stage(stage="rejected_imports"):
+                self._db_engine.bulk_insert(table_name="rejected_imports",
+                                            data=df_rejected_imports)
+            Logger.success("Done!")
+            # endregion
+
+            # region Reservations and Reservation Stay Dates
+            # Already ingested reservations and stay dates are skipped, derived tables are updated
+            Logger.info("Processing reservations and stay dates...")
+            with self._db_engine.profiling_stage(stage="reservations"):
+                self._db_engine.ingest_reservations(reservations=df_imports,
+                                                    stay_dates=df_stay_dates)
+            Logger.success("Done!")
+            # endregion
+
+            # region Move processed temporary file to success archive folder after its last batch
+            if reservations_file_info.get("is_last_batch", True):
                 success_archive_path = Path(self._config["archive_path"]) / "success"
                 success_archive_path.mkdir(parents=True, exist_ok=True)
                 original_filename = Path(reservations_file_info['original_filename'])
@@ -151,11 +212,78 @@ class Runner:
                                                           pattern="%Y%m%d%H%S%M")
                 success_filepath = success_archive_path / f"{original_filename.stem}__{success_filename_suffix}.{original_filename.suffix}"
                 temporary_filepath.rename(success_filepath)
-                # endregion
+            # endregion
 
-                Logger.success("Done!")
+            Logger.success("Done!")
+
+        if batch_count > 0:
+            Logger.success(f"{batch_count} reservation batch(es) ingested!")
 
         # endregion
 
+        return batch_count > 0 or is_ingested
+
+    def _run_native_reservations_ingestion(self, extraction_engine: ExtractEngineBase) -> bool:
+        """
+        Load, validate and write reservation files inside the database engine, file by file. Files are split into
+        chunks of reservations_batch_size reservations (whole file if not set), every chunk is written in its own
+        transaction. Returns True if any file is ingested
+        """
+        if not self._db_engine.supports_native_ingestion:
+            raise ValueError(f"Database engine '{type(self._db_engine).__name__}' "
+                             f"does not support native ingestion mode!")
+
+        batch_size = self._config["source_config"].get("reservations_batch_size", None)
+        batch_size = int(batch_size) if batch_size is not None else None
+
+        file_count = 0
+        for reservations_file_info in extraction_engine.iter_reservation_files():
+
+            file_count += 1
+            original_filename = Path(reservations_file_info["original_filename"])
+            temporary_filepath = Path(reservations_file_info["temporary_filepath"])
+            Logger.info(f"Processing '{original_filename}' with native ingestion...")
+
+            # region Ingest the file chunk by chunk, stop at the first failed chunk
+            row_counts = dict(reservation_imports=0, reservation_stay_dates=0, rejected_imports=0)
+            try:
+                for chunk_filepath in extraction_engine.iter_reservation_chunks(filepath=temporary_filepath,
+                                                                                batch_size=batch_size):
+                    with self._db_engine.profiling_stage(stage="native_reservations"):
+                        chunk_row_counts = self._db_engine.ingest_reservation_file(filepath=str(chunk_filepath),
+                                                                                   source_filename=str(original_filename))
+                    if chunk_row_counts is None:
+                        row_counts = None
+                        break
+                    for table_name, row_count in chunk_row_counts.items():
+                        row_counts[table_name] += row_count
+
+            except KeyError:
+                Logger.error(f"Reservations list not found in JSON file '{original_filename}'")
+                row_counts = None
+
+            except Exception as e:
+                Logger.error(message=f"Error reading '{original_filename}' JSON file",
+                             err=e,
+                             include_stack_trace=True)
+                row_counts = None
+            # endregion
+
+            # region Move processed temporary file to success or error archive folder
+            archive_path = Path(self._config["archive_path"]) / ("success" if row_counts is not None else "error")
+            archive_path.mkdir(parents=True, exist_ok=True)
+            filename_suffix = format_datetime(value=datetime.now(),
+                                              pattern="%Y%m%d%H%S%M")
+            archive_filepath = archive_path / f"{original_filename.stem}__{filename_suffix}.{original_filename.suffix}"
+            temporary_filepath.rename(archive_filepath)
+            # endregion
+
+            if row_counts is not None:
+                Logger.success(f"Done! {row_counts['reservation_imports']} reservation(s), "
+                               f"{row_counts['reservation_stay_dates']} stay date(s), "
+                               f"{row_counts['rejected_imports']} rejected reservation(s)")
 
+        if file_count > 0:
+            Logger.success(f"{file_count} reservation file(s) ingested!")
 
+        return file_count > 0
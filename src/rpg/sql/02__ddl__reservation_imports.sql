@@ -12,4 +12,14 @@ CREATE TABLE IF NOT EXISTS reservation_imports (
     source_filename VARCHAR,
     ingested_at TIMESTAMP DEFAULT now(),
     reservation_hash VARCHAR
-);
\ No newline at end of file
+);
+
+-- Remove duplicated reservation hashes of databases created before the unique key (no-op once the index exists)
+-- Unique key is created by 11__ddl__reservation_unique_keys.sql, after this DELETE is committed
+DELETE FROM reservation_imports
+WHERE rowid IN (
+    SELECT rowid
+    FROM reservation_imports
+    WHERE NOT EXISTS (SELECT 1 FROM duckdb_indexes() WHERE index_name = 'ux_reservation_imports__reservation_hash')
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY reservation_hash ORDER BY ingested_at, rowid) > 1
+);
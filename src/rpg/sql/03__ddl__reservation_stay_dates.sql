@@ -17,4 +17,14 @@ CREATE TABLE IF NOT EXISTS reservation_stay_dates (
     ingested_at TIMESTAMP DEFAULT now(),
     reservation_hash VARCHAR,
     stay_date_hash VARCHAR
-);
\ No newline at end of file
+);
+
+-- Remove duplicated stay date hashes of databases created before the unique key (no-op once the index exists)
+-- Unique key is created by 11__ddl__reservation_unique_keys.sql, after this DELETE is committed
+DELETE FROM reservation_stay_dates
+WHERE rowid IN (
+    SELECT rowid
+    FROM reservation_stay_dates
+    WHERE NOT EXISTS (SELECT 1 FROM duckdb_indexes() WHERE index_name = 'ux_reservation_stay_dates__stay_date_hash')
+    QUALIFY ROW_NUMBER() OVER(PARTITION BY reservation_hash, stay_date_hash ORDER BY ingested_at, rowid) > 1
+);
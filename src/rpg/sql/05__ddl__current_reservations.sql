@@ -0,0 +1,23 @@
+-- Creates current_reservations table if not exists. Latest version of every reservation, maintained by each ingestion
+CREATE TABLE IF NOT EXISTS current_reservations (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    status VARCHAR,
+    arrival_date DATE,
+    departure_date DATE,
+    source_name VARCHAR,
+    source_id VARCHAR,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    source_filename VARCHAR,
+    ingested_at TIMESTAMP,
+    reservation_hash VARCHAR,
+    PRIMARY KEY (hotel_id, reservation_id)
+);
+
+-- Build from the history of databases created before the table (no-op once the table has rows)
+INSERT INTO current_reservations
+SELECT *
+FROM reservation_imports
+WHERE NOT EXISTS (SELECT 1 FROM current_reservations)
+QUALIFY ROW_NUMBER() OVER(PARTITION BY hotel_id, reservation_id ORDER BY updated_at DESC, ingested_at DESC) = 1;
@@ -0,0 +1,31 @@
+-- Creates current_stay_dates table if not exists. Stay dates of the reservation versions in current_reservations
+CREATE TABLE IF NOT EXISTS current_stay_dates (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    start_date DATE,
+    end_date DATE,
+    room_type_id VARCHAR,
+    room_type_name VARCHAR,
+    number_of_adults INTEGER,
+    number_of_children INTEGER,
+    revenue_gross_amount DECIMAL(18, 2),
+    revenue_net_amount DECIMAL(18, 2),
+    fnb_gross_amount DECIMAL(18, 2),
+    fnb_net_amount DECIMAL(18, 2),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP,
+    reservation_hash VARCHAR,
+    stay_date_hash VARCHAR,
+    PRIMARY KEY (hotel_id, reservation_id, stay_date_hash)
+);
+
+-- Build from the history of databases created before the table (no-op once the table has rows)
+INSERT INTO current_stay_dates
+SELECT d.*
+FROM reservation_stay_dates AS d
+SEMI JOIN current_reservations AS r
+ON r.reservation_hash = d.reservation_hash
+AND r.hotel_id = d.hotel_id
+AND r.reservation_id = d.reservation_id
+WHERE NOT EXISTS (SELECT 1 FROM current_stay_dates);
@@ -0,0 +1,51 @@
+-- Creates reservation_nights table if not exists. Nights of the current reservations, maintained by each ingestion
+CREATE TABLE IF NOT EXISTS reservation_nights (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    stay_night DATE,
+    reservation_hash VARCHAR,
+    stay_date_hash VARCHAR,
+    room_type_id VARCHAR,
+    revenue_net_amount DECIMAL(18, 2),
+    -- Reservation status is cancelled
+    is_cancelled BOOLEAN,
+    -- A night of the reservation is covered by more than one stay date
+    is_overlapped BOOLEAN,
+    PRIMARY KEY (hotel_id, reservation_id, stay_night)
+);
+
+-- Build from the current reservations of databases created before the table (no-op once the table has rows)
+INSERT INTO reservation_nights
+SELECT
+    hotel_id,
+    reservation_id,
+    stay_night,
+    reservation_hash,
+    stay_date_hash,
+    room_type_id,
+    revenue_net_amount,
+    is_cancelled,
+    MAX(night_count) OVER(PARTITION BY hotel_id, reservation_id) > 1 AS is_overlapped
+FROM (
+    SELECT
+        r.hotel_id,
+        r.reservation_id,
+        CAST(ds.stay_night AS DATE) AS stay_night,
+        r.reservation_hash,
+        d.stay_date_hash,
+        d.room_type_id,
+        d.revenue_net_amount,
+        IF(LOWER(r.status) = 'cancelled', TRUE, FALSE) AS is_cancelled,
+        COUNT(1) OVER(PARTITION BY r.hotel_id, r.reservation_id, ds.stay_night) AS night_count
+    FROM
+        current_reservations AS r
+    INNER JOIN
+        current_stay_dates AS d
+    ON
+        d.reservation_hash = r.reservation_hash
+    CROSS JOIN
+        GENERATE_SERIES(d.start_date, d.end_date, INTERVAL 1 DAY) AS ds(stay_night)
+    WHERE
+        NOT EXISTS (SELECT 1 FROM reservation_nights)
+)
+QUALIFY ROW_NUMBER() OVER(PARTITION BY hotel_id, reservation_id, stay_night ORDER BY stay_date_hash) = 1;
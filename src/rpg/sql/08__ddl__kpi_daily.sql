@@ -0,0 +1,43 @@
+-- Creates kpi_daily table if not exists. KPI aggregates per hotel and night, maintained by each ingestion
+CREATE TABLE IF NOT EXISTS kpi_daily (
+    hotel_id INTEGER,
+    night_of_stay DATE,
+    -- Reservations of the night (not cancelled, not overlapped, room type in the active inventory)
+    occupied_rooms BIGINT,
+    total_net_revenue DECIMAL(38, 2),
+    -- Sum of the room quantities in the active inventory of the hotel
+    room_count BIGINT,
+    PRIMARY KEY (hotel_id, night_of_stay)
+);
+
+-- Build from reservation_nights of databases created before the table (no-op once the table has rows)
+INSERT INTO kpi_daily
+WITH cte_inventory_room_types AS (
+    SELECT DISTINCT hotel_id, room_type_id FROM inventory WHERE is_active
+),
+cte_inventory_room_count AS (
+    SELECT hotel_id, SUM(quantity) AS room_count FROM inventory WHERE is_active GROUP BY hotel_id
+)
+SELECT
+    n.hotel_id,
+    n.stay_night AS night_of_stay,
+    COUNT(DISTINCT n.reservation_id) AS occupied_rooms,
+    SUM(n.revenue_net_amount) AS total_net_revenue,
+    c.room_count
+FROM
+    reservation_nights AS n
+INNER JOIN
+    cte_inventory_room_types AS i
+ON
+    i.hotel_id = n.hotel_id
+    AND i.room_type_id = n.room_type_id
+INNER JOIN
+    cte_inventory_room_count AS c
+ON
+    c.hotel_id = n.hotel_id
+WHERE
+    NOT n.is_overlapped
+    AND NOT n.is_cancelled
+    AND NOT EXISTS (SELECT 1 FROM kpi_daily)
+GROUP BY
+    n.hotel_id, n.stay_night, c.room_count;
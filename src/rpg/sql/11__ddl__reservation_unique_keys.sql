@@ -0,0 +1,11 @@
+-- Unique keys of the history tables. Created in a separate migration, DuckDB can not create a unique index in the
+-- transaction that deletes the duplicated rows of databases created before the unique keys
+
+-- A reservation version is stored once. Ingestion looks up the fingerprints of the batch in this index to skip
+-- already ingested versions (derived_tables.build_reservation_batch_queries), the key rejects any other duplicate
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reservation_imports__reservation_hash
+ON reservation_imports (reservation_hash);
+
+-- A stay date of a reservation version is stored once, it is written with its reservation version
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reservation_stay_dates__stay_date_hash
+ON reservation_stay_dates (reservation_hash, stay_date_hash);
@@ -0,0 +1,104 @@
+-- Schema v2: integer hotel_id in inventory (type of the reservation tables), ENUM reservation status and lookup tables
+-- of the room type and source names of the current reservation tables. Rewrites the tables created by the previous
+-- files in place, for new databases and for databases created before v2
+
+-- Allowed values of the reservation status validation (schema/reservations.json)
+CREATE TYPE IF NOT EXISTS reservation_status AS ENUM (
+    'provisional',
+    'waiting_list',
+    'confirmed',
+    'cancelled',
+    'no_show',
+    'checked_in',
+    'checked_out'
+);
+
+ALTER TABLE inventory ALTER hotel_id TYPE INTEGER;
+
+-- DuckDB can not alter a table with an index, the unique key of 11__ddl__reservation_unique_keys.sql is created again
+DROP INDEX IF EXISTS ux_reservation_imports__reservation_hash;
+ALTER TABLE reservation_imports ALTER status TYPE reservation_status;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reservation_imports__reservation_hash
+ON reservation_imports (reservation_hash);
+
+-- Lookup tables of the names, maintained by each ingestion
+CREATE SEQUENCE IF NOT EXISTS source_name_ids;
+CREATE TABLE IF NOT EXISTS source_names (
+    source_name_id INTEGER PRIMARY KEY DEFAULT nextval('source_name_ids'),
+    source_name VARCHAR NOT NULL UNIQUE
+);
+
+CREATE SEQUENCE IF NOT EXISTS room_type_name_ids;
+CREATE TABLE IF NOT EXISTS room_type_names (
+    room_type_name_id INTEGER PRIMARY KEY DEFAULT nextval('room_type_name_ids'),
+    room_type_name VARCHAR NOT NULL UNIQUE
+);
+
+INSERT INTO source_names (source_name)
+SELECT DISTINCT source_name
+FROM current_reservations
+WHERE source_name IS NOT NULL
+ORDER BY source_name;
+
+INSERT INTO room_type_names (room_type_name)
+SELECT DISTINCT room_type_name
+FROM current_stay_dates
+WHERE room_type_name IS NOT NULL
+ORDER BY room_type_name;
+
+-- Current reservation tables are created again with the v2 columns (DuckDB can not drop a column before a primary key
+-- column), names are replaced with the ids of the lookup tables
+CREATE TABLE current_reservations_v2 (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    status reservation_status,
+    arrival_date DATE,
+    departure_date DATE,
+    source_name_id INTEGER,
+    source_id VARCHAR,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    source_filename VARCHAR,
+    ingested_at TIMESTAMP,
+    reservation_hash VARCHAR,
+    PRIMARY KEY (hotel_id, reservation_id)
+);
+
+INSERT INTO current_reservations_v2 BY NAME
+SELECT r.* EXCLUDE (source_name), n.source_name_id
+FROM current_reservations AS r
+LEFT JOIN source_names AS n
+ON n.source_name = r.source_name;
+
+DROP TABLE current_reservations;
+ALTER TABLE current_reservations_v2 RENAME TO current_reservations;
+
+CREATE TABLE current_stay_dates_v2 (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    start_date DATE,
+    end_date DATE,
+    room_type_id VARCHAR,
+    room_type_name_id INTEGER,
+    number_of_adults INTEGER,
+    number_of_children INTEGER,
+    revenue_gross_amount DECIMAL(18, 2),
+    revenue_net_amount DECIMAL(18, 2),
+    fnb_gross_amount DECIMAL(18, 2),
+    fnb_net_amount DECIMAL(18, 2),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP,
+    reservation_hash VARCHAR,
+    stay_date_hash VARCHAR,
+    PRIMARY KEY (hotel_id, reservation_id, stay_date_hash)
+);
+
+INSERT INTO current_stay_dates_v2 BY NAME
+SELECT d.* EXCLUDE (room_type_name), n.room_type_name_id
+FROM current_stay_dates AS d
+LEFT JOIN room_type_names AS n
+ON n.room_type_name = d.room_type_name;
+
+DROP TABLE current_stay_dates;
+ALTER TABLE current_stay_dates_v2 RENAME TO current_stay_dates;
@@ -0,0 +1,101 @@
+-- Schema v3: reservation_hash and stay_date_hash are 64-bit row fingerprints (UBIGINT), the first 8 bytes of the
+-- SHA-256 hash of the row (hash_util.calculate_row_fingerprint). Rewrites the SHA-256 hex strings of the tables in
+-- place, converted hashes are the fingerprints of the same rows, so re-ingested rows are still deduplicated
+
+-- Unique keys of 11__ddl__reservation_unique_keys.sql block the type change of their columns in the migration
+-- transaction (also after DROP INDEX), the history tables are created again and their unique keys are created again
+CREATE TABLE reservation_imports_v3 (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    status reservation_status,
+    arrival_date DATE,
+    departure_date DATE,
+    source_name VARCHAR,
+    source_id VARCHAR,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    source_filename VARCHAR,
+    ingested_at TIMESTAMP DEFAULT now(),
+    reservation_hash UBIGINT
+);
+
+INSERT INTO reservation_imports_v3
+SELECT * REPLACE (CAST('0x' || LEFT(reservation_hash, 16) AS UBIGINT) AS reservation_hash)
+FROM reservation_imports;
+
+DROP TABLE reservation_imports;
+ALTER TABLE reservation_imports_v3 RENAME TO reservation_imports;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reservation_imports__reservation_hash
+ON reservation_imports (reservation_hash);
+
+CREATE TABLE reservation_stay_dates_v3 (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    start_date DATE,
+    end_date DATE,
+    room_type_id VARCHAR,
+    room_type_name VARCHAR,
+    number_of_adults INTEGER,
+    number_of_children INTEGER,
+    revenue_gross_amount DECIMAL(18, 2),
+    revenue_net_amount DECIMAL(18, 2),
+    fnb_gross_amount DECIMAL(18, 2),
+    fnb_net_amount DECIMAL(18, 2),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP DEFAULT now(),
+    reservation_hash UBIGINT,
+    stay_date_hash UBIGINT
+);
+
+INSERT INTO reservation_stay_dates_v3
+SELECT * REPLACE (
+    CAST('0x' || LEFT(reservation_hash, 16) AS UBIGINT) AS reservation_hash,
+    CAST('0x' || LEFT(stay_date_hash, 16) AS UBIGINT) AS stay_date_hash
+)
+FROM reservation_stay_dates;
+
+DROP TABLE reservation_stay_dates;
+ALTER TABLE reservation_stay_dates_v3 RENAME TO reservation_stay_dates;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_reservation_stay_dates__stay_date_hash
+ON reservation_stay_dates (reservation_hash, stay_date_hash);
+
+ALTER TABLE current_reservations ALTER reservation_hash TYPE UBIGINT
+USING CAST('0x' || LEFT(reservation_hash, 16) AS UBIGINT);
+
+ALTER TABLE reservation_nights ALTER reservation_hash TYPE UBIGINT
+USING CAST('0x' || LEFT(reservation_hash, 16) AS UBIGINT);
+ALTER TABLE reservation_nights ALTER stay_date_hash TYPE UBIGINT
+USING CAST('0x' || LEFT(stay_date_hash, 16) AS UBIGINT);
+
+-- DuckDB can not change the type of a primary key column, current_stay_dates is created again
+CREATE TABLE current_stay_dates_v3 (
+    hotel_id INTEGER,
+    reservation_id VARCHAR,
+    start_date DATE,
+    end_date DATE,
+    room_type_id VARCHAR,
+    room_type_name_id INTEGER,
+    number_of_adults INTEGER,
+    number_of_children INTEGER,
+    revenue_gross_amount DECIMAL(18, 2),
+    revenue_net_amount DECIMAL(18, 2),
+    fnb_gross_amount DECIMAL(18, 2),
+    fnb_net_amount DECIMAL(18, 2),
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    ingested_at TIMESTAMP,
+    reservation_hash UBIGINT,
+    stay_date_hash UBIGINT,
+    PRIMARY KEY (hotel_id, reservation_id, stay_date_hash)
+);
+
+INSERT INTO current_stay_dates_v3
+SELECT * REPLACE (
+    CAST('0x' || LEFT(reservation_hash, 16) AS UBIGINT) AS reservation_hash,
+    CAST('0x' || LEFT(stay_date_hash, 16) AS UBIGINT) AS stay_date_hash
+)
+FROM current_stay_dates;
+
+DROP TABLE current_stay_dates;
+ALTER TABLE current_stay_dates_v3 RENAME TO current_stay_dates;
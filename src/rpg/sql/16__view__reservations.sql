@@ -0,0 +1,75 @@
+CREATE OR REPLACE VIEW view_reservations AS
+WITH cte_valid_nights AS (
+
+	-- Nights of the latest reservation versions, maintained by the ingestion
+	SELECT
+		*
+	FROM
+		reservation_nights
+	WHERE
+		NOT is_overlapped  -- Exclude overlapped days
+
+),
+
+cte_valid_reservations AS (
+
+	SELECT
+		r.reservation_hash,
+		r.hotel_id,
+		r.reservation_id,
+		r.status,
+		r.arrival_date,
+		r.departure_date,
+		sn.source_name,
+		r.source_id,
+		d.start_date,
+		d.end_date,
+		n.stay_night,
+		d.room_type_id,
+		rn.room_type_name,
+		d.number_of_adults,
+		d.number_of_children,
+		d.revenue_gross_amount,
+		d.revenue_net_amount,
+		d.fnb_gross_amount,
+		d.fnb_net_amount,
+		r.created_at,
+		r.updated_at,
+		r.ingested_at,
+		-- For future reporting requirements, add is_inventory_mismatched flag
+		IF(i.hotel_id IS NULL, TRUE, FALSE) AS is_inventory_mismatched,
+		-- For future reporting requirements, add is_cancelled flag
+		n.is_cancelled
+	FROM
+		cte_valid_nights AS n
+	INNER JOIN
+		current_reservations AS r
+	ON
+		r.hotel_id = n.hotel_id
+		AND r.reservation_id = n.reservation_id
+	INNER JOIN
+		current_stay_dates AS d
+	ON
+		d.hotel_id = n.hotel_id
+		AND d.reservation_id = n.reservation_id
+		AND d.stay_date_hash = n.stay_date_hash
+	LEFT JOIN
+		source_names AS sn
+	ON
+		sn.source_name_id = r.source_name_id
+	LEFT JOIN
+		room_type_names AS rn
+	ON
+		rn.room_type_name_id = d.room_type_name_id
+	LEFT JOIN
+		(SELECT DISTINCT hotel_id, room_type_id FROM inventory WHERE is_active) AS i
+	ON
+		i.hotel_id = n.hotel_id
+		AND i.room_type_id = n.room_type_id
+
+)
+
+SELECT
+	*
+FROM
+	cte_valid_reservations
@@ -0,0 +1,12 @@
+CREATE OR REPLACE VIEW view_kpi AS
+-- KPI aggregates are maintained by the ingestion in kpi_daily
+SELECT
+	k.hotel_id AS HOTEL_ID,
+	k.night_of_stay AS NIGHT_OF_STAY,
+	ROUND(k.occupied_rooms / k.room_count * 100, 2) AS OCCUPANCY_PERCENTAGE,
+	k.total_net_revenue AS TOTAL_NET_REVENUE,
+	ROUND(k.total_net_revenue / k.occupied_rooms) AS ADR
+FROM
+	kpi_daily AS k
+ORDER BY
+	k.hotel_id, k.night_of_stay DESC
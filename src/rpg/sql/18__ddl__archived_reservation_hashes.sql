@@ -0,0 +1,5 @@
+-- Fingerprints of the reservation versions archived by maintain. Ingestion skips them like the versions of the
+-- history tables, so re-sent files do not bring archived versions back
+CREATE TABLE IF NOT EXISTS archived_reservation_hashes (
+    reservation_hash UBIGINT
+);
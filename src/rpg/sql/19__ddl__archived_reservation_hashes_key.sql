@@ -0,0 +1,4 @@
+-- Ingestion looks up the fingerprints of the batch in archived_reservation_hashes, the index keeps the lookups
+-- independent of the number of archived versions
+CREATE INDEX IF NOT EXISTS ix_archived_reservation_hashes__reservation_hash
+ON archived_reservation_hashes (reservation_hash);
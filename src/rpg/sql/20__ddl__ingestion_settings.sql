@@ -0,0 +1,6 @@
+-- Settings of the ingestion recorded in the database. ingestion_mode is recorded by the first run, python and native
+-- modes calculate different fingerprints, so the mode of a database with reservations cannot be switched
+CREATE TABLE IF NOT EXISTS ingestion_settings (
+    setting_name VARCHAR PRIMARY KEY,
+    setting_value VARCHAR
+);
@@ -1,5 +1,64 @@
+import re
+from functools import lru_cache
 from typing import Optional, Union
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+
+# Size of the parsed value caches. Reservation dates repeat heavily (stay dates, arrival/departure)
+PARSE_CACHE_SIZE = 65536
+
+# Fixed formats parsed by fromisoformat instead of strptime. Values are checked against the exact layout first,
+# because strptime also accepts non-padded values (e.g. '2024-1-5') and fromisoformat accepts other ISO layouts
+_ISO_FAST_PATHS = {
+    "%Y-%m-%d": re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}"),
+    "%Y-%m-%d %H:%M:%S": re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}"),
+    "%Y-%m-%d %H:%M:%S.%f": re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}\.[0-9]{1,6}")
+}
+
+# Epoch of numpy datetime64 values
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_datetime(value: str, pattern: str) -> datetime:
+    """
+    Parse a datetime string, equivalent of datetime.strptime with fromisoformat fast path and LRU cache
+    """
+    fast_path = _ISO_FAST_PATHS.get(pattern, None)
+    if fast_path is not None and fast_path.fullmatch(value):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            # Let strptime decide and raise its own error message
+            pass
+    return datetime.strptime(value, pattern)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_date(value: str, pattern: str) -> date:
+    """
+    Parse a date string, equivalent of datetime.strptime(...).date() with fromisoformat fast path and LRU cache
+    """
+    if pattern == "%Y-%m-%d" and _ISO_FAST_PATHS[pattern].fullmatch(value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            pass
+    return parse_datetime(value, pattern).date()
+
+
+def to_epoch_days(value: date) -> int:
+    """
+    Days since 1970-01-01, integer value of numpy datetime64[D]
+    """
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def to_epoch_microseconds(value: datetime) -> int:
+    """
+    Microseconds since 1970-01-01 of a naive datetime, integer value of numpy datetime64[us]
+    """
+    return (value - _EPOCH) // _MICROSECOND
 
 
 def cast_datetime(value: Union[str, datetime, date, None],
@@ -12,7 +71,7 @@ def cast_datetime(value: Union[str, datetime, date, None],
     try:
 
         if isinstance(value, str):
-            return datetime.strptime(value, pattern)
+            return parse_datetime(value, pattern)
 
         if isinstance(value, datetime):
             return value
@@ -39,7 +98,7 @@ def cast_date(value: Union[str, datetime, date, None],
     try:
 
         if isinstance(value, str):
-            return datetime.strptime(value, pattern).date()
+            return parse_date(value, pattern)
 
         if isinstance(value, datetime):
             return value.date()
@@ -3,6 +3,9 @@ import hashlib
 from typing import Any, Dict
 from datetime import date, datetime
 
+# Bytes of the SHA-256 digest kept as row fingerprint (reservation_hash, stay_date_hash)
+FINGERPRINT_BYTES = 8
+
 
 def normalize_value(value: Any) -> Any:
 
@@ -23,12 +26,26 @@ def normalize_value(value: Any) -> Any:
 
     return str(value)
 
-def calculate_row_hash(row: Dict[Any, Any]) -> str:
+def calculate_row_digest(row: Dict[Any, Any]) -> bytes:
     normalized_row = normalize_value(row)
     str_row = json.dumps(
         normalized_row,
         sort_keys=True,
         ensure_ascii=False
     )
-    hash_value = hashlib.sha256(str_row.encode("utf-8")).hexdigest()
-    return hash_value
+    return hashlib.sha256(str_row.encode("utf-8")).digest()
+
+
+def digest_fingerprint(digest: bytes) -> int:
+    """
+    64-bit row fingerprint (UBIGINT), first 8 bytes of the SHA-256 digest as big-endian integer
+    """
+    return int.from_bytes(digest[:FINGERPRINT_BYTES], byteorder="big")
+
+
+def calculate_row_fingerprint(row: Dict[Any, Any]) -> int:
+    return digest_fingerprint(digest=calculate_row_digest(row=row))
+
+
+def calculate_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
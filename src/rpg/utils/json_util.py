@@ -1,6 +1,7 @@
+import re
 import json
 from jsonschema import validate, ValidationError
-from typing import Dict, Any, Union, List, Optional, Tuple
+from typing import Dict, Any, Union, List, Optional, Tuple, Iterator, TextIO
 
 
 def read_json(filepath: str) -> Optional[Union[Dict[Any, Any], List[Dict[Any, Any]]]]:
@@ -23,4 +24,128 @@ def validate_json(json_value: Dict[Any, Any],
         if generate_validation_report:
             return False, ValidationError(message="Unknow validation error!")
         else:
-            return False
\ No newline at end of file
+            return False
+
+class JsonStreamReader:
+    """
+    Minimal incremental JSON reader on top of json.JSONDecoder.raw_decode
+    Keeps only the current read buffer and the value being decoded in memory
+    """
+
+    _WHITESPACE = re.compile(r"[ \t\n\r]*")
+    _NUMBER_CHARACTERS = frozenset("0123456789.eE+-")
+
+    def __init__(self, file: TextIO, buffer_size: Optional[int] = 1024 * 1024):
+        self._file = file
+        self._buffer_size = buffer_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self, min_size: Optional[int] = None) -> bool:
+        """
+        Append the next chunk of the file to the unread part of the buffer
+        """
+        if self._eof:
+            return False
+
+        chunk = self._file.read(max(self._buffer_size, min_size or 0))
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skip whitespaces and return the next character without consuming it. Returns empty string at EOF
+        """
+        while True:
+            self._position = self._WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def expect(self, character: str):
+        """
+        Consume the next non-whitespace character, raise ValueError if it is not the expected one
+        """
+        next_character = self.peek()
+        if next_character != character:
+            raise ValueError(f"Invalid JSON. Expected '{character}' but found '{next_character or 'EOF'}'")
+        self._position += 1
+
+    def decode(self, raw: Optional[bool] = False) -> Any:
+        """
+        Decode and consume the next complete JSON value. If raw, return the JSON text of the value instead
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                # Value is not complete in the buffer yet. Grow the buffer geometrically to keep decoding linear
+                if not self._fill(min_size=len(self._buffer)):
+                    raise
+                continue
+
+            # A number at the end of the buffer might be truncated. Read more and decode it again
+            if (end == len(self._buffer) or self._buffer[end] in self._NUMBER_CHARACTERS) and self._fill():
+                continue
+
+            if raw:
+                value = self._buffer[self._position:end]
+            self._position = end
+            return value
+
+
+def iter_json_array(filepath: str,
+                    key: str,
+                    buffer_size: Optional[int] = 1024 * 1024,
+                    raw: Optional[bool] = False) -> Iterator[Any]:
+    """
+    Stream the items of the array stored under `key` of the top-level JSON object one by one
+    Peak memory depends on the size of a single item, not on the size of the file
+    If raw, yield the JSON text of the items instead of the decoded values
+    Raises KeyError if `key` not found in the top-level object
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+
+        reader = JsonStreamReader(file=f, buffer_size=buffer_size)
+        reader.expect("{")
+
+        if reader.peek() == "}":
+            raise KeyError(key)
+
+        while True:
+
+            name = reader.decode()
+            reader.expect(":")
+
+            if name == key:
+                # region Yield array items
+                reader.expect("[")
+                if reader.peek() == "]":
+                    return
+
+                while True:
+                    yield reader.decode(raw=raw)
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                    else:
+                        reader.expect("]")
+                        return
+                # endregion
+            else:
+                # Skip the values of the other keys
+                reader.decode()
+
+            if reader.peek() == ",":
+                reader.expect(",")
+            else:
+                reader.expect("}")
+                raise KeyError(key)
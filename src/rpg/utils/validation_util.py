@@ -1,8 +1,12 @@
+import json
 import math
+from pathlib import Path
+from functools import lru_cache
 from datetime import datetime, date
-from typing import Optional, Any, Dict, Tuple, List
-from rpg.utils.datetime_util import valid_date, cast_date, valid_datetime, cast_datetime
+from typing import Optional, Any, Dict, Tuple, List, Callable
+from rpg.utils.datetime_util import valid_date, cast_date, valid_datetime, cast_datetime, parse_date, parse_datetime
 
+SCHEMA_PATH = Path(__file__).resolve().parents[1] / "schema"
 
 
 class ValidationError(ValueError):
@@ -339,4 +343,380 @@ def validate_datetime(json_value: Dict[Any, Any],
                                           value=field_value,
                                           metadata=metadata)
 
-    return True, None
\ No newline at end of file
+    return True, None
+
+# region Compiled validation plans
+
+FieldValidator = Callable[[Dict[Any, Any]], Tuple[Optional[ValidationError], Any]]
+
+
+def _compile_int(field_name: str,
+                 min_value: Optional[int] = None,
+                 max_value: Optional[int] = None) -> FieldValidator:
+    """
+    Compile `validate_int` for a single field, returns (error, int value)
+    """
+    metadata = dict(min_value=min_value, max_value=max_value)
+    missing_message = f"{field_name} is missing"
+    type_message = f"{field_name} must be an integer"
+    cast_message = f"{field_name} must be an integer or integer-like string"
+
+    def validator(json_value):
+        if json_value is None:
+            return ValidationError(field_name=field_name, message="Value is NULL!", metadata=metadata), None
+        if field_name not in json_value:
+            return ValidationError(field_name=field_name, message=missing_message, metadata=metadata), None
+
+        field_value = json_value[field_name]
+        if type(field_value) is int:
+            value = field_value
+        elif isinstance(field_value, bool):
+            return ValidationError(field_name=field_name,
+                                   message=type_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+        else:
+            try:
+                if isinstance(field_value, str):
+                    field_value = field_value.strip()
+                    if field_value == "":
+                        raise ValueError("Empty string")
+                value = int(field_value)
+            except (ValueError, TypeError):
+                return ValidationError(field_name=field_name,
+                                       message=cast_message,
+                                       value=field_value,
+                                       metadata=metadata), None
+
+        if min_value is not None and value < min_value:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {value} must be >= {min_value}",
+                                   value=value,
+                                   metadata=metadata), None
+        if max_value is not None and value > max_value:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {value} must be <= {max_value}",
+                                   value=value,
+                                   metadata=metadata), None
+        return None, value
+
+    validator.metadata = metadata
+    return validator
+
+
+def _compile_number(field_name: str,
+                    min_value: Optional[float] = None,
+                    max_value: Optional[float] = None,
+                    allow_int: Optional[bool] = True) -> FieldValidator:
+    """
+    Compile `validate_number` for a single field, returns (error, float value)
+    """
+    metadata = dict(min_value=min_value, max_value=max_value, allow_int=allow_int)
+    missing_message = f"{field_name} is missing"
+    null_message = f"{field_name} is NULL"
+    type_message = f"{field_name} must be a number"
+
+    def validator(json_value):
+        if json_value is None:
+            return ValidationError(field_name=field_name, message="Value is NULL!", metadata=metadata), None
+        if field_name not in json_value:
+            return ValidationError(field_name=field_name, message=missing_message, metadata=metadata), None
+
+        field_value = json_value[field_name]
+        if field_value is None:
+            return ValidationError(field_name=field_name,
+                                   message=null_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+        if isinstance(field_value, bool):
+            return ValidationError(field_name=field_name,
+                                   message=type_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+
+        if isinstance(field_value, (float, int)):
+            value = float(field_value)
+        else:
+            if isinstance(field_value, str):
+                field_value = field_value.strip()
+            try:
+                if field_value == "":
+                    raise ValueError("Empty string")
+                value = float(field_value)
+            except (TypeError, ValueError):
+                return ValidationError(field_name=field_name,
+                                       message=type_message,
+                                       value=field_value,
+                                       metadata=metadata), None
+
+        if not math.isfinite(value):
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} must be finite number",
+                                   value=field_value,
+                                   metadata=metadata), None
+        if not allow_int and value.is_integer():
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} must be non-integer number",
+                                   value=field_value,
+                                   metadata=metadata), None
+        if min_value is not None and value < min_value:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {value} must be >= {min_value}",
+                                   value=value,
+                                   metadata=metadata), None
+        if max_value is not None and value > max_value:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {value} must be <= {max_value}",
+                                   value=value,
+                                   metadata=metadata), None
+        return None, value
+
+    validator.metadata = metadata
+    return validator
+
+
+def _compile_string(field_name: str,
+                    allow_empty_string: Optional[bool] = True,
+                    allowed_values: Optional[List[str]] = None) -> FieldValidator:
+    """
+    Compile `validate_string` for a single field, returns (error, string value)
+    """
+    metadata = dict(allow_empty_string=allow_empty_string, allowed_values=allowed_values)
+    allowed_set = frozenset(allowed_values) if allowed_values is not None else None
+    missing_message = f"{field_name} is missing"
+    type_message = f"{field_name} must be a string"
+    empty_message = f"{field_name} must NOT be empty string"
+    allowed_message = f"{field_name} must be one of {', '.join(allowed_values)}" if allowed_values is not None else None
+
+    def validator(json_value):
+        if json_value is None:
+            return ValidationError(field_name=field_name, message="Value is NULL!", metadata=metadata), None
+        if field_name not in json_value:
+            return ValidationError(field_name=field_name, message=missing_message, metadata=metadata), None
+
+        field_value = json_value[field_name]
+        if not isinstance(field_value, str):
+            return ValidationError(field_name=field_name,
+                                   message=type_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+        if allowed_set is not None:
+            if field_value in allowed_set:
+                return None, field_value
+            if allow_empty_string or field_value.strip() != "":
+                return ValidationError(field_name=field_name,
+                                       message=allowed_message,
+                                       value=field_value,
+                                       metadata=metadata), None
+        if not allow_empty_string and field_value.strip() == "":
+            return ValidationError(field_name=field_name,
+                                   message=empty_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+        return None, field_value
+
+    validator.metadata = metadata
+    return validator
+
+
+def _compile_boolean(field_name: str) -> FieldValidator:
+    """
+    Compile `validate_boolean` for a single field, returns (error, original value)
+    """
+    def validator(json_value):
+        is_valid, validation_error = validate_boolean(json_value=json_value, field_name=field_name)
+        return validation_error, json_value[field_name] if is_valid else None
+
+    validator.metadata = {}
+    return validator
+
+
+def _compile_date(field_name: str,
+                  pattern: Optional[str] = "%d.%m.%Y",
+                  min_date: Optional[date] = None,
+                  max_date: Optional[date] = None) -> FieldValidator:
+    """
+    Compile `validate_date` for a single field, returns (error, date value)
+    """
+    if isinstance(min_date, str):
+        min_date = date.fromisoformat(min_date)
+    if isinstance(max_date, str):
+        max_date = date.fromisoformat(max_date)
+
+    metadata = dict(pattern=pattern,
+                    min_date=min_date.isoformat() if min_date else None,
+                    max_date=max_date.isoformat() if max_date else None)
+    missing_message = f"{field_name} is missing"
+    type_message = f"{field_name} must be a date string or date (not datetime)"
+    invalid_message = f"{field_name} must be valid date value"
+
+    def validator(json_value):
+        if json_value is None:
+            return ValidationError(field_name=field_name, message="Value is NULL!", metadata=metadata), None
+        if field_name not in json_value:
+            return ValidationError(field_name=field_name, message=missing_message, metadata=metadata), None
+
+        field_value = json_value[field_name]
+        if isinstance(field_value, str):
+            try:
+                date_value = parse_date(field_value, pattern)
+            except ValueError:
+                return ValidationError(field_name=field_name,
+                                       message=invalid_message,
+                                       value=field_value,
+                                       metadata=metadata), None
+        elif isinstance(field_value, date) and not isinstance(field_value, datetime):
+            date_value = field_value
+        else:
+            return ValidationError(field_name=field_name,
+                                   message=type_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+
+        if min_date is not None and date_value < min_date:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {date_value} must be >= {min_date}",
+                                   value=field_value,
+                                   metadata=metadata), None
+        if max_date is not None and date_value > max_date:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {date_value} must be <= {max_date}",
+                                   value=field_value,
+                                   metadata=metadata), None
+        return None, date_value
+
+    validator.metadata = metadata
+    return validator
+
+
+def _compile_datetime(field_name: str,
+                      pattern: Optional[str] = "%d.%m.%Y %H:%M:%S",
+                      min_datetime: Optional[datetime] = None,
+                      max_datetime: Optional[datetime] = None) -> FieldValidator:
+    """
+    Compile `validate_datetime` for a single field, returns (error, datetime value)
+    """
+    if isinstance(min_datetime, str):
+        min_datetime = datetime.fromisoformat(min_datetime)
+    if isinstance(max_datetime, str):
+        max_datetime = datetime.fromisoformat(max_datetime)
+
+    metadata = dict(pattern=pattern,
+                    min_date=min_datetime.isoformat() if min_datetime else None,
+                    maxn_date=max_datetime.isoformat() if max_datetime else None)
+    missing_message = f"{field_name} is missing"
+    type_message = f"{field_name} must be a datetime string or datetime"
+    invalid_message = f"{field_name} must be valid datetime value"
+
+    def validator(json_value):
+        if json_value is None:
+            return ValidationError(field_name=field_name, message="Value is NULL!", metadata=metadata), None
+        if field_name not in json_value:
+            return ValidationError(field_name=field_name, message=missing_message, metadata=metadata), None
+
+        field_value = json_value[field_name]
+        if isinstance(field_value, str):
+            try:
+                datetime_value = parse_datetime(field_value, pattern)
+            except ValueError:
+                return ValidationError(field_name=field_name,
+                                       message=invalid_message,
+                                       value=field_value,
+                                       metadata=metadata), None
+        elif isinstance(field_value, datetime):
+            datetime_value = field_value
+        else:
+            return ValidationError(field_name=field_name,
+                                   message=type_message,
+                                   value=field_value,
+                                   metadata=metadata), None
+
+        if min_datetime is not None and datetime_value < min_datetime:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {datetime_value} must be >= {min_datetime}",
+                                   value=field_value,
+                                   metadata=metadata), None
+        if max_datetime is not None and datetime_value > max_datetime:
+            return ValidationError(field_name=field_name,
+                                   message=f"{field_name} field value {datetime_value} must be <= {max_datetime}",
+                                   value=field_value,
+                                   metadata=metadata), None
+        return None, datetime_value
+
+    validator.metadata = metadata
+    return validator
+
+
+FIELD_COMPILERS: Dict[str, Callable[..., FieldValidator]] = dict(
+    int=_compile_int,
+    number=_compile_number,
+    string=_compile_string,
+    boolean=_compile_boolean,
+    date=_compile_date,
+    datetime=_compile_datetime
+)
+
+
+class ValidationPlan:
+    """
+    Declarative field rules compiled once into one specialised validator per field
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self._rules = []
+        self._validators = []
+        for rule in rules:
+            rule = dict(rule)
+            field_name = rule.pop("field")
+            field_type = rule.pop("type")
+            optional = rule.pop("optional", False)
+            if field_type not in FIELD_COMPILERS:
+                raise ValueError(f"Unsupported field type '{field_type}' for field '{field_name}'")
+            validator = FIELD_COMPILERS[field_type](field_name, **rule)
+            self._rules.append((field_name, field_type, rule, optional))
+            self._validators.append((field_name, optional, validator))
+        self._validator_map = {field_name: validator for field_name, _, validator in self._validators}
+
+    @property
+    def rules(self) -> List[Tuple[str, str, Dict[str, Any], bool]]:
+        """
+        (field, type, options, optional) for every field of the plan
+        """
+        return list(self._rules)
+
+    def validator(self, field_name: str) -> FieldValidator:
+        return self._validator_map[field_name]
+
+    def metadata(self, field_name: str) -> Dict[str, Any]:
+        """
+        Metadata of the validation errors of the field, with the defaults of the rule applied
+        """
+        return self._validator_map[field_name].metadata
+
+    def validate(self, json_value: Dict[Any, Any]) -> Tuple[List[ValidationError], Dict[str, Any]]:
+        """
+        Run every field validator, returns the validation errors and the parsed values of the valid fields
+        """
+        validation_errors = []
+        parsed_values = {}
+        for field_name, optional, validator in self._validators:
+            if optional and field_name not in json_value:
+                continue
+            validation_error, value = validator(json_value)
+            if validation_error is None:
+                parsed_values[field_name] = value
+            else:
+                validation_errors.append(validation_error)
+        return validation_errors, parsed_values
+
+
+@lru_cache(maxsize=None)
+def load_validation_plan(schema_name: str, entity: str) -> ValidationPlan:
+    """
+    Load `schema/<schema_name>.json` and compile the rules of the entity, compiled plans are cached
+    """
+    with open(SCHEMA_PATH / f"{schema_name}.json", "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    return ValidationPlan(rules=schema[entity])
+
+# endregion